@@ -0,0 +1,132 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: csvio
+    :platform: Unix
+    :synopsis: Benchmarks the bulk csv readers and writer against the
+        original row by row implementations
+
+.. moduleauthor:: Henry Mortimer <henry@morti.net>
+
+Run from the repository root::
+
+    python benchmarks/csvio.py
+"""
+
+import csv
+import io
+import os
+import sys
+import timeit
+from distutils.util import strtobool
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from satelliteSimulator.utils import readData, readECIData, readGrndTrckData,\
+                                    writeData, flattenTuple
+
+DATADIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+def legacyWriteData(data, csvfile):
+    writer = csv.writer(csvfile)
+    for row in data:
+        writer.writerow(flattenTuple(row))
+
+
+def legacyReadData(csvfile):
+    result = []
+    reader = csv.reader(csvfile)
+    for row in reader:
+        parsedData = []
+        for item in row:
+            parsedData.append(float(item))
+        result.append(parsedData)
+    return result
+
+
+def legacyReadECIData(csvfile):
+    result = []
+    reader = csv.reader(csvfile)
+    for row in reader:
+        R = [float(row[0]), float(row[1]), float(row[2])]
+        V = [float(row[3]), float(row[4]), float(row[5])]
+        time = float(row[6])
+        result.append((R, V, time))
+    return result
+
+
+def legacyReadGrndTrckData(csvfile):
+    results = []
+    reader = csv.reader(csvfile)
+    for row in reader:
+        results.append((float(row[0]), float(row[1]), float(row[2]), strtobool(row[3])))
+    return results
+
+
+def timeRead(func, text, repeat):
+    """Best time in seconds to parse text with func"""
+    return min(timeit.repeat(lambda: func(io.StringIO(text)), number=1, repeat=repeat))
+
+
+def timeWrite(func, data, repeat):
+    """Best time in seconds to write data with func"""
+    return min(timeit.repeat(lambda: func(data, io.StringIO()), number=1, repeat=repeat))
+
+
+def groundTrackText():
+    """Builds a ground track table in the format written by the groundTrack
+    subcommand from the ECI reference data"""
+    with open(os.path.join(DATADIR, 'galileo-rk4-j2-24.csv')) as f:
+        data = readECIData(f)
+    out = io.StringIO()
+    rows = [((r[0][0] / 1000, r[0][1] / 1000, r[0][2]), r[0][0] > 0) for r in data]
+    legacyWriteData(rows, out)
+    return out.getvalue()
+
+
+def main(repeat=5):
+    cases = [
+        ('readECIData', 'galileo-rk4-j2-24.csv', legacyReadECIData, readECIData),
+        ('readECIData', 'jason-rk4.csv', legacyReadECIData, readECIData),
+        ('readECIData', 'kepProp.csv', legacyReadECIData, readECIData),
+        ('readData', 'galileo-diff-rk4-j2.csv', legacyReadData, readData),
+        ('readData', 'galileo-pass-grid.csv', legacyReadData, readData),
+    ]
+
+    print('{0:<18}{1:<26}{2:>8}{3:>12}{4:>12}{5:>9}'.format(
+        'function', 'input', 'rows', 'legacy (s)', 'bulk (s)', 'speedup'))
+
+    def report(name, source, rows, old, new):
+        print('{0:<18}{1:<26}{2:>8}{3:>12.4f}{4:>12.4f}{5:>8.1f}x'.format(
+            name, source, rows, old, new, old / new))
+
+    for name, fname, legacy, bulk in cases:
+        with open(os.path.join(DATADIR, fname)) as f:
+            text = f.read()
+        rows = text.count('\n')
+        report(name, fname, rows, timeRead(legacy, text, repeat), timeRead(bulk, text, repeat))
+
+    text = groundTrackText()
+    report('readGrndTrckData', '(generated)', text.count('\n'),
+           timeRead(legacyReadGrndTrckData, text, repeat),
+           timeRead(readGrndTrckData, text, repeat))
+
+    with open(os.path.join(DATADIR, 'galileo-rk4-j2-24.csv')) as f:
+        text = f.read()
+    rows = text.count('\n')
+    report('writeData', 'galileo-rk4-j2-24.csv', rows,
+           timeWrite(legacyWriteData, legacyReadECIData(io.StringIO(text)), repeat),
+           timeWrite(writeData, readECIData(io.StringIO(text)), repeat))
+
+    with open(os.path.join(DATADIR, 'galileo-diff-rk4-j2.csv')) as f:
+        text = f.read()
+    rows = text.count('\n')
+    report('writeData', 'galileo-diff-rk4-j2.csv', rows,
+           timeWrite(legacyWriteData, legacyReadData(io.StringIO(text)), repeat),
+           timeWrite(writeData, readData(io.StringIO(text)), repeat))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: startup
+    :platform: Unix
+    :synopsis: Measures the start up time of the non plotting subcommands
+
+.. moduleauthor:: Henry Mortimer <henry@morti.net>
+
+Each command is run on a tiny input so the time is dominated by interpreter
+start up and imports. The script exits with an error if the median time of
+any command is over its budget. Run from the repository root::
+
+    python benchmarks/startup.py
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+MAIN = os.path.join(ROOT, 'main.py')
+DATA = os.path.join(ROOT, 'data', 'jason-rk4.csv')
+BUDGET = 0.5  # seconds, median wall time per invocation
+BASELINE = [sys.executable, '-c', 'import numpy']
+
+
+def commands():
+    """The commands to time, each run with a tiny input"""
+    return [
+        ('propogate', [MAIN, 'propogate', 'Jason', 'kep', '0', '--no-cache']),
+        ('difference', [MAIN, 'difference', '--hcl', '-i1', DATA, '-i2', DATA,
+                        '--end', '1450256432.184']),
+        ('groundTrack', [MAIN, 'groundTrack', '-i', DATA, '--end', '1450256432.184',
+                         '0', '0', '5']),
+        ('passTimes', [MAIN, 'passTimes', '-i', DATA, '--end', '1450256432.184',
+                       '0', '0', '5']),
+    ]
+
+
+def timeCommand(argv, repeat, env=None):
+    """Median wall time in seconds to run argv"""
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(argv, check=True, stdout=subprocess.DEVNULL, cwd=ROOT, env=env)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main(repeat=7):
+    print('{0:<14}{1:>12}'.format('command', 'median (s)'))
+    print('{0:<14}{1:>12.3f}'.format('(numpy only)', timeCommand(BASELINE, repeat)))
+
+    over = []
+    # keep the commands away from the user's cache, so they neither fill it
+    # nor are served from it
+    with tempfile.TemporaryDirectory(prefix='pyspace-startup-') as cacheDir:
+        env = dict(os.environ, PYSPACE_CACHE_DIR=cacheDir)
+        for name, argv in commands():
+            elapsed = timeCommand([sys.executable] + argv, repeat, env)
+            print('{0:<14}{1:>12.3f}'.format(name, elapsed))
+            if elapsed > BUDGET:
+                over.append(name)
+
+    if over:
+        print('over the {0}s budget: {1}'.format(BUDGET, ', '.join(over)))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
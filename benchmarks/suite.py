@@ -0,0 +1,262 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: suite
+    :platform: Unix
+    :synopsis: Times every stage of the pipeline and flags regressions
+        against a saved baseline
+
+.. moduleauthor:: Henry Mortimer <henry@morti.net>
+
+Each benchmark runs one stage on the reference satellites in ``data.py`` or
+the reference files in ``data/`` and reports the best time per unit of work
+(a propagation step, a conversion, a row...). Run from the repository
+root::
+
+    python benchmarks/suite.py --save-baseline    # on the reference commit
+    python benchmarks/suite.py                    # later, to compare
+
+Results are written as JSON. When a baseline exists every benchmark more
+than ``--threshold`` slower than it is reported and the script exits with
+an error. Baselines are specific to a machine so they are not committed.
+"""
+
+import argparse
+import fnmatch
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import timeit
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+from satelliteSimulator.data import Jason, GPSIIR, Galileo, Intelsat, BASETIME
+from satelliteSimulator.converters.cart2kep import cart2kep
+from satelliteSimulator.converters.kep2cart import kep2cart
+from satelliteSimulator.converters.eci2ecef import ECI2ECEFArray
+from satelliteSimulator.propogation.keplerianPropogation import propogateOrbit
+from satelliteSimulator.propogation.rk4 import rk4MonoPropogation, rk4j2Propogation
+from satelliteSimulator.analysis.groundTracks import getGroundTracks
+from satelliteSimulator.analysis.visibility import getStationPassTimes, allPassTimes
+from satelliteSimulator.utils import readECIData, readGrndTrckData, readData, writeData, CACHEDIR_ENV
+
+DATADIR = os.path.join(ROOT, 'data')
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+THRESHOLD = 0.25  # fractional slow down that counts as a regression
+SATELLITES = [('Jason', Jason), ('GPSIIR', GPSIIR), ('Galileo', Galileo), ('Intelsat', Intelsat)]
+PROPOGATORS = [('kep', propogateOrbit), ('rk4', rk4MonoPropogation), ('j2', rk4j2Propogation)]
+STEPS = 360  # one hour of 10 second steps
+STATION = (51.5, -0.13, 5)
+
+
+def loadECI(fname):
+    with open(os.path.join(DATADIR, fname)) as f:
+        return readECIData(f)
+
+
+def readText(fname):
+    with open(os.path.join(DATADIR, fname)) as f:
+        return f.read()
+
+
+def propogationCases():
+    """Per step cost of every propagator for every reference satellite"""
+    for satName, sat in SATELLITES:
+        for propName, propogator in PROPOGATORS:
+            yield ('propogate.{0}.{1}'.format(propName, satName), 'step', STEPS,
+                   lambda p=propogator, s=sat: p(s['R'], s['V'], 10, STEPS, s.get('time', BASETIME)))
+
+
+def conversionCases():
+    """Per call cost of the keplerian conversions"""
+    sats = [sat for name, sat in SATELLITES]
+    yield ('convert.cart2kep', 'call', len(sats),
+           lambda: [cart2kep(s['R'], s['V']) for s in sats])
+    yield ('convert.kep2cart', 'call', len(sats),
+           lambda: [kep2cart(s['keplerian']) for s in sats])
+
+
+def analysisCases():
+    """Per row cost of the ECEF conversion, ground tracks and pass searches"""
+    eci = loadECI('galileo-rk4-j2-24.csv')
+    ecef = ECI2ECEFArray(eci)
+    yield ('analysis.eci2ecef', 'row', len(eci), lambda: ECI2ECEFArray(eci))
+    yield ('analysis.groundTracks', 'row', len(ecef),
+           lambda: getGroundTracks(ecef['R'], [STATION]))
+    yield ('analysis.stationPassTimes', 'row', len(ecef),
+           lambda: getStationPassTimes(ecef, STATION))
+    yield ('analysis.allPassTimes', 'row', len(ecef), lambda: allPassTimes(ecef))
+
+
+def ioCases():
+    """Per row cost of reading and writing the csv formats"""
+    eciText = readText('galileo-rk4-j2-24.csv')
+    diffText = readText('galileo-diff-rk4-j2.csv')
+    eci = readECIData(io.StringIO(eciText))
+    ecef = ECI2ECEFArray(eci)
+    grndOut = io.StringIO()
+    writeData(getGroundTracks(ecef['R'], [STATION]), grndOut)
+    grndText = grndOut.getvalue()
+
+    yield ('io.readECIData', 'row', len(eci), lambda: readECIData(io.StringIO(eciText)))
+    yield ('io.readData', 'row', diffText.count('\n'), lambda: readData(io.StringIO(diffText)))
+    yield ('io.readGrndTrckData', 'row', grndText.count('\n'),
+           lambda: readGrndTrckData(io.StringIO(grndText)))
+    yield ('io.writeData', 'row', len(eci), lambda: writeData(eci, io.StringIO()))
+
+
+def plotCases():
+    """Cost of setting up a map, from scratch and from the background cache"""
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+        from satelliteSimulator.plot import initMap
+    except ImportError:
+        return
+
+    def setup(cache):
+        plt.figure()
+        initMap(cache=cache)
+        plt.gcf().canvas.draw()
+        plt.close('all')
+
+    # a cache of our own, so the user's is neither filled nor used
+    previous = os.environ.get(CACHEDIR_ENV)
+    os.environ[CACHEDIR_ENV] = tempfile.mkdtemp(prefix='pyspace-bench-')
+    try:
+        setup(True)  # fill the cache
+        yield ('plot.initMap.uncached', 'map', 1, lambda: setup(False))
+        yield ('plot.initMap.cached', 'map', 1, lambda: setup(True))
+    finally:
+        shutil.rmtree(os.environ[CACHEDIR_ENV], ignore_errors=True)
+        if previous is None:
+            del os.environ[CACHEDIR_ENV]
+        else:
+            os.environ[CACHEDIR_ENV] = previous
+
+
+CASES = [propogationCases, conversionCases, analysisCases, ioCases, plotCases]
+
+
+def runCase(func, repeat):
+    """Best wall time in seconds of several runs of func"""
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def runSuite(pattern='*', repeat=5):
+    """Runs every benchmark with a name matching pattern
+
+    Args:
+        pattern: string: A shell style pattern for the names to run.
+
+        repeat: int: The number of runs, the best is kept.
+
+    Returns:
+        Dict: name: {'seconds', 'unit', 'count', 'perUnit'}.
+    """
+    results = {}
+    for cases in CASES:
+        for name, unit, count, func in cases():
+            if not fnmatch.fnmatch(name, pattern):
+                continue
+            seconds = runCase(func, repeat)
+            results[name] = {'seconds': seconds, 'unit': unit, 'count': count,
+                             'perUnit': seconds/count}
+            sys.stderr.write('{0:<34}{1:>12.3e} s/{2}\n'.format(name, seconds/count, unit))
+    return results
+
+
+def environment():
+    """Describes where the results were measured"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                universal_newlines=True).stdout.strip()
+    except OSError:
+        commit = ''
+    return {'python': platform.python_version(), 'numpy': np.__version__,
+            'machine': platform.machine(), 'platform': platform.platform(),
+            'commit': commit}
+
+
+def compareResults(results, baseline, threshold=THRESHOLD):
+    """Finds benchmarks that got slower than the baseline
+
+    Args:
+        results, baseline: Dict: Benchmark results from runSuite.
+
+        threshold: float: The fractional slow down that is tolerated.
+
+    Returns:
+        Array: (name, baseline per unit, new per unit, ratio) for each
+        regression, worst first.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]['perUnit']
+        ratio = result['perUnit']/old
+        if ratio > 1 + threshold:
+            regressions.append((name, old, result['perUnit'], ratio))
+    return sorted(regressions, key=lambda r: -r[3])
+
+
+def getArgs():
+    parser = argparse.ArgumentParser(description='Benchmarks every pipeline stage')
+    parser.add_argument('-k', '--filter', default='*', help='only run benchmarks matching this pattern')
+    parser.add_argument('-r', '--repeat', type=int, default=5)
+    parser.add_argument('-o', '--outfile', default=None, help='write the results here as JSON')
+    parser.add_argument('-b', '--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='save the results as the baseline')
+    parser.add_argument('-t', '--threshold', type=float, default=THRESHOLD)
+    return parser.parse_args()
+
+
+def main():
+    args = getArgs()
+    report = {'environment': environment(), 'results': runSuite(args.filter, args.repeat)}
+
+    if args.outfile:
+        with open(args.outfile, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print('saved baseline to {0}'.format(args.baseline))
+        return
+
+    if not os.path.exists(args.baseline):
+        print('no baseline at {0}, run with --save-baseline first'.format(args.baseline))
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    print('baseline commit {0}'.format(baseline['environment'].get('commit', '?')))
+    print('{0:<34}{1:>12}{2:>12}{3:>9}'.format('benchmark', 'baseline', 'now', 'ratio'))
+    for name in sorted(report['results']):
+        if name in baseline['results']:
+            old = baseline['results'][name]['perUnit']
+            new = report['results'][name]['perUnit']
+            print('{0:<34}{1:>12.3e}{2:>12.3e}{3:>8.2f}x'.format(name, old, new, new/old))
+
+    regressions = compareResults(report['results'], baseline['results'], args.threshold)
+    for name, old, new, ratio in regressions:
+        print('REGRESSION {0}: {1:.2f}x slower'.format(name, ratio))
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
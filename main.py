@@ -10,55 +10,266 @@
 
 """
 
-from satelliteSimulator.propogation.rk4 import rk4MonoPropogation,\
-                                                rk4j2Propogation
-from satelliteSimulator.propogation.keplerianPropogation import propogateOrbit
-from satelliteSimulator.data import Jason, GPSIIR, Galileo
-from satelliteSimulator.utils import writeData, readECIData, readGrndTrckData,\
-                                    readData
+from satelliteSimulator.data import Jason, GPSIIR, Galileo, Intelsat
+from satelliteSimulator.utils import iterECIData, writeData, alignBlocks, DataWriter
 from satelliteSimulator.analysis.groundTracks import getGroundTracks
-from satelliteSimulator.plot import plotGroundTracks, plotDifferences, plotPassData, plotECI
-from satelliteSimulator.converters.eci2ecef import ECI2ECEF
-from satelliteSimulator.analysis.differences import HCLDiff, ENUDiff
-from satelliteSimulator.analysis.visibility import getStationPassTimes, allPassTimes
+from satelliteSimulator.converters.eci2ecef import ECI2ECEFArray
+from satelliteSimulator.analysis.differences import HCLDiffArray, ENUDiffArray
+from satelliteSimulator.analysis.visibility import PassTracker, gridStations
+from satelliteSimulator.analysis.coverageStats import STATISTICS, constellationSummary,\
+                                                      coverageStatistics
+from satelliteSimulator.analysis.visibilityBits import VisibilityBits
+from satelliteSimulator.analysis.siteSelection import OBJECTIVES, candidateVisibility, selectSites
+from satelliteSimulator.analysis.crosslinks import ATMOSPHERE, linkIntervals, stackPositions
+from satelliteSimulator.analysis.conjunctions import THRESHOLD, screenConjunctions
+from satelliteSimulator.analysis.eclipse import MODELS, EclipseTracker
+from satelliteSimulator.analysis.passProfiles import PassProfiler, passSummary
+from satelliteSimulator.storage.trajectoryStore import TrajectoryStore
+from satelliteSimulator.storage.archive import ARCHIVEEXT
+from satelliteSimulator.storage.passDatabase import PassDatabase, readPasses
+from satelliteSimulator.storage.propogationCache import PropogationCache, propogationBlocks,\
+                                                        MAXBYTES
+from satelliteSimulator.propogation.resume import resumeState, writeCheckpoint
+from satelliteSimulator.profiling import Profiler
+import numpy as np
 import argparse
+import hashlib
 import sys
+import os
 from itertools import zip_longest, islice
 
+# timings for --profile, it records nothing unless started
+profiler = Profiler()
 
-def getArgs():
+
+class DataFileType(argparse.FileType):
+    """Opens trajectory archives in binary mode and anything else as text"""
+
+    def __call__(self, string):
+        if string.endswith(ARCHIVEEXT):
+            return argparse.FileType(self._mode + 'b')(string)
+        return super().__call__(string)
+
+
+def getArgs(argv=None):
     parser = argparse.ArgumentParser()
+    parser.add_argument('--profile', type=str, default=None, metavar='REPORT',
+                        help='write per stage timings as JSON, - for stderr')
+    parser.add_argument('--profile-memory', action='store_true',
+                        help='also trace the memory allocated in each stage, this is much slower')
+    parser.add_argument('--cprofile', type=str, default=None, metavar='FILE',
+                        help='save cProfile stats for the whole run')
     subparsers = parser.add_subparsers(dest='cmd')
 
     prop = subparsers.add_parser('propogate')
     prop.add_argument('satellite', type=str, choices=['Jason', 'GPSIIR', 'Galileo'])
     prop.add_argument('algorithm', type=str, choices=['kep', 'rk4', 'j2'])
     prop.add_argument('days', type=float, default=1)
-    prop.add_argument('-o', '--outfile', nargs='?', type=argparse.FileType('w'), default=sys.stdout)
+    # opened by propogate, as with --resume it is appended to rather than
+    # truncated before the earlier run is read
+    prop.add_argument('-o', '--outfile', nargs='?', type=str, default=None)
+    prop.add_argument('-p', '--precision', type=int, default=None)
+    prop.add_argument('-s', '--step', type=float, default=10, help='timestep in seconds')
+    prop.add_argument('--no-cache', action='store_true', help='always propogate, ignoring the cache')
+    prop.add_argument('--cache-limit', type=float, default=MAXBYTES/2**20,
+                      help='trim the propogation cache to this many MiB')
+    prop.add_argument('--resume', type=str, default=None, metavar='FILE',
+                      help='continue from the end of a trajectory or checkpoint from an earlier run, '
+                           'appending only the new samples to the output, which may be the same file')
+    prop.add_argument('--checkpoint', type=str, default=None, metavar='FILE',
+                      help='save the final state as JSON for a later --resume, a checkpoint '
+                           'named like the trajectory is used when resuming from it')
 
     diff = subparsers.add_parser('difference')
     diffAlg = diff.add_mutually_exclusive_group(required=True)
     diffAlg.add_argument('--hcl', action='store_true')
     diffAlg.add_argument('--enu', nargs=2, metavar=('lat', 'lon'), type=float)
-    diff.add_argument('-i1', '--infile1', nargs='?', type=argparse.FileType('r'), default=sys.stdin)
-    diff.add_argument('-i2', '--infile2', nargs='?', type=argparse.FileType('r'), default=sys.stdin)
+    diff.add_argument('-i1', '--infile1', nargs='?', type=DataFileType('r'), default=sys.stdin)
+    diff.add_argument('-i2', '--infile2', nargs='?', type=DataFileType('r'), default=sys.stdin)
     diff.add_argument('-o', '--outfile', nargs='?', type=argparse.FileType('w'), default=sys.stdout)
+    diff.add_argument('-p', '--precision', type=int, default=None)
+    diff.add_argument('--start', type=float, default=None)
+    diff.add_argument('--end', type=float, default=None)
 
     grndTrck = subparsers.add_parser('groundTrack')
-    grndTrck.add_argument('-i', '--infile', nargs='?', type=argparse.FileType('r'), default=sys.stdin)
+    grndTrck.add_argument('-i', '--infile', nargs='?', type=DataFileType('r'), default=sys.stdin)
     grndTrck.add_argument('-o', '--outfile', nargs='?', type=argparse.FileType('w'), default=sys.stdout)
+    grndTrck.add_argument('-p', '--precision', type=int, default=None)
+    grndTrck.add_argument('--start', type=float, default=None)
+    grndTrck.add_argument('--end', type=float, default=None)
     grndTrck.add_argument('stations', nargs="*", type=float, metavar='lat lon angle')
 
     plot = subparsers.add_parser('plot')
-    plot.add_argument('graph', type=str, choices=['grndtrck', 'diffs', 'passTimes', 'eci'])
+    plot.add_argument('graph', type=str, choices=['grndtrck', 'diffs', 'passTimes', 'eci', 'animate'])
     plot.add_argument('-i', '--infile', nargs='?', type=argparse.FileType('r'), default=sys.stdin)
+    plot.add_argument('--projection', type=str, default='cyl')
+    plot.add_argument('--resolution', type=str, default='c', choices=['c', 'l', 'i', 'h', 'f'])
+    plot.add_argument('--mode', type=str, default='auto', choices=['auto', 'points', 'density'])
+    plot.add_argument('-o', '--output', type=str, default=None)
+    plot.add_argument('--timestep', type=float, default=10, help='seconds between ground track samples')
+    plot.add_argument('--speed', type=float, default=3600, help='simulated seconds per second of animation')
+    plot.add_argument('--fps', type=float, default=25)
+    plot.add_argument('--trail', type=float, default=3600, help='trail length in seconds')
+
+    plotBatch = subparsers.add_parser('plotBatch')
+    plotBatch.add_argument('jobs', nargs='?', type=argparse.FileType('r'), default=sys.stdin)
+    plotBatch.add_argument('-j', '--processes', type=int, default=None)
+    plotBatch.add_argument('--projection', type=str, default='cyl')
+    plotBatch.add_argument('--resolution', type=str, default='c', choices=['c', 'l', 'i', 'h', 'f'])
+    plotBatch.add_argument('--mode', type=str, default='auto', choices=['auto', 'points', 'density'])
 
     passTimes = subparsers.add_parser('passTimes')
-    passTimes.add_argument('-i', '--infile', nargs='?', type=argparse.FileType('r'), default=sys.stdin)
+    passTimes.add_argument('-i', '--infile', nargs='?', type=DataFileType('r'), default=sys.stdin)
     passTimes.add_argument('-o', '--outfile', nargs='?', type=argparse.FileType('w'), default=sys.stdout)
+    passTimes.add_argument('-p', '--precision', type=int, default=None)
+    passTimes.add_argument('--start', type=float, default=None)
+    passTimes.add_argument('--end', type=float, default=None)
+    passTimes.add_argument('--state', type=str, default=None, metavar='FILE',
+                           help='carry on from the state saved here by an earlier run and save it again, '
+                                'so only samples after that run are scanned')
     passTimes.add_argument('stations', nargs='*', type=float, metavar=['lat', 'lon',  'angle'])
 
-    args = parser.parse_args()
+    passDb = subparsers.add_parser('passDb')
+    passDb.add_argument('database', type=str, help='an .npz file, created by --add if needed')
+    passDb.add_argument('--add', nargs=2, action='append', default=[], metavar=('satellite', 'passes'),
+                        help='add the output of passTimes for a satellite')
+    passQuery = passDb.add_mutually_exclusive_group()
+    passQuery.add_argument('--at', type=float, default=None, metavar='time',
+                           help='passes in progress at a time')
+    passQuery.add_argument('--window', nargs=2, type=float, default=None, metavar=('start', 'end'),
+                           help='passes overlapping a window')
+    passQuery.add_argument('--next', type=float, default=None, metavar='time',
+                           help='the first pass to rise after a time')
+    passDb.add_argument('--station', nargs=2, type=float, default=None, metavar=('lat', 'lon'))
+    passDb.add_argument('--satellite', type=str, default=None, help='only for --next')
+    passDb.add_argument('-o', '--outfile', nargs='?', type=argparse.FileType('w'), default=sys.stdout)
+    passDb.add_argument('-p', '--precision', type=int, default=None)
+
+    schedule = subparsers.add_parser('schedule')
+    schedule.add_argument('database', type=str, help='a pass database made by passDb')
+    schedule.add_argument('--slew', type=float, default=0, help='seconds a station needs between contacts')
+    schedule.add_argument('--exact', action='store_true',
+                          help='solve each group of conflicting passes exactly, for small instances')
+    schedule.add_argument('--weight', type=str, default='count', choices=['count', 'duration'])
+    schedule.add_argument('--max-component', type=int, default=None,
+                          help='larger groups of conflicting passes are scheduled greedily')
+    schedule.add_argument('--start', type=float, default=None)
+    schedule.add_argument('--end', type=float, default=None)
+    schedule.add_argument('-o', '--outfile', nargs='?', type=argparse.FileType('w'), default=sys.stdout)
+    schedule.add_argument('-p', '--precision', type=int, default=None)
+
+    coverage = subparsers.add_parser('coverage')
+    coverage.add_argument('-i', '--infile', action='append', type=DataFileType('r'), default=None,
+                          help='a trajectory for each satellite, all with the same times, default stdin')
+    coverage.add_argument('--fold', type=int, default=1,
+                          help='the number of satellites a station must see at once')
+    coverage.add_argument('--save', type=str, default=None, metavar='FILE',
+                          help='save the packed visibility of the constellation as .npz')
+    coverage.add_argument('-o', '--outfile', nargs='?', type=argparse.FileType('w'), default=sys.stdout)
+    coverage.add_argument('-p', '--precision', type=int, default=None)
+    coverage.add_argument('stations', nargs='*', type=float, metavar='lat lon angle',
+                          help='default the 10 degree grid')
+
+    revisit = subparsers.add_parser('revisit')
+    revisit.add_argument('-i', '--infile', action='append', type=DataFileType('r'), default=None,
+                         help='a trajectory for each satellite, all with the same times, default stdin')
+    revisit.add_argument('--fold', type=int, default=1,
+                         help='the number of satellites a station must see at once')
+    revisit.add_argument('--stat', type=str, default=None, choices=STATISTICS,
+                         help='write only this statistic, to map with plot passTimes')
+    revisit.add_argument('-o', '--outfile', nargs='?', type=argparse.FileType('w'), default=sys.stdout)
+    revisit.add_argument('-p', '--precision', type=int, default=None)
+    revisit.add_argument('stations', nargs='*', type=float, metavar='lat lon angle',
+                         help='default the 10 degree grid')
+
+    sites = subparsers.add_parser('sites')
+    sites.add_argument('-i', '--infile', action='append', type=DataFileType('r'), default=None,
+                       help='a trajectory for each satellite, all with the same times, default stdin')
+    sites.add_argument('-k', '--count', type=int, default=1, help='the number of sites to choose')
+    sites.add_argument('--objective', type=str, default='coverage', choices=OBJECTIVES)
+    sites.add_argument('--existing', nargs='+', type=float, default=[], metavar='lat lon angle',
+                       help='stations already in the network')
+    sites.add_argument('--bits', type=str, default=None, metavar='FILE',
+                       help='reuse the visibility saved here, or save it here when it does not exist')
+    sites.add_argument('-o', '--outfile', nargs='?', type=argparse.FileType('w'), default=sys.stdout)
+    sites.add_argument('-p', '--precision', type=int, default=None)
+    sites.add_argument('candidates', nargs='*', type=float, metavar='lat lon angle',
+                       help='default the 10 degree grid')
+
+    crosslinks = subparsers.add_parser('crosslinks')
+    crosslinks.add_argument('-i', '--infile', action='append', type=DataFileType('r'), required=True,
+                            help='a trajectory for each satellite, all with the same times')
+    crosslinks.add_argument('--max-range', type=float, default=None, help='the longest link in km')
+    crosslinks.add_argument('--margin', type=float, default=ATMOSPHERE,
+                            help='the height above the Earth a link has to clear in km')
+    crosslinks.add_argument('-o', '--outfile', nargs='?', type=argparse.FileType('w'), default=sys.stdout)
+    crosslinks.add_argument('-p', '--precision', type=int, default=None)
+
+    conjunctions = subparsers.add_parser('conjunctions')
+    conjunctions.add_argument('-i', '--infile', action='append', type=DataFileType('r'), required=True,
+                              help='a trajectory for each object, all with the same times')
+    conjunctions.add_argument('--threshold', type=float, default=THRESHOLD,
+                              help='report approaches closer than this in km')
+    conjunctions.add_argument('-o', '--outfile', nargs='?', type=argparse.FileType('w'), default=sys.stdout)
+    conjunctions.add_argument('-p', '--precision', type=int, default=None)
+
+    eclipse = subparsers.add_parser('eclipse')
+    eclipse.add_argument('-i', '--infile', nargs='?', type=DataFileType('r'), default=sys.stdin)
+    eclipse.add_argument('-o', '--outfile', nargs='?', type=argparse.FileType('w'), default=sys.stdout)
+    eclipse.add_argument('-p', '--precision', type=int, default=None)
+    eclipse.add_argument('--model', type=str, default='conical', choices=MODELS)
+    eclipse.add_argument('--start', type=float, default=None)
+    eclipse.add_argument('--end', type=float, default=None)
+
+    profiles = subparsers.add_parser('passProfiles')
+    profiles.add_argument('-d', '--outdir', type=str, required=True,
+                          help='write the profile of each pass here as <pass>.csv')
+    profiles.add_argument('-i', '--infile', nargs='?', type=DataFileType('r'), default=sys.stdin)
+    profiles.add_argument('-o', '--outfile', nargs='?', type=argparse.FileType('w'), default=sys.stdout,
+                          help='the pass number, station, rise and set times, highest elevation and '
+                               'shortest range of each pass')
+    profiles.add_argument('-p', '--precision', type=int, default=None)
+    profiles.add_argument('-f', '--frequency', type=float, default=0, help='carrier frequency in Hz')
+    profiles.add_argument('--start', type=float, default=None)
+    profiles.add_argument('--end', type=float, default=None)
+    profiles.add_argument('stations', nargs='*', type=float, metavar='lat lon angle')
+
+    store = subparsers.add_parser('store')
+    store.add_argument('path', type=str)
+    store.add_argument('satellite', type=str)
+    store.add_argument('-i', '--infile', nargs='?', type=DataFileType('r'), default=sys.stdin)
+    store.add_argument('--replace', action='store_true')
+
+    query = subparsers.add_parser('query')
+    query.add_argument('path', type=str)
+    query.add_argument('satellite', type=str)
+    window = query.add_mutually_exclusive_group(required=True)
+    window.add_argument('--range', nargs=2, type=float, metavar=('start', 'end'))
+    window.add_argument('--at', nargs='+', type=float, metavar='time')
+    query.add_argument('-o', '--outfile', nargs='?', type=DataFileType('w'), default=sys.stdout)
+    query.add_argument('-p', '--precision', type=int, default=None)
+
+    tune = subparsers.add_parser('tune')
+    tune.add_argument('satellites', nargs='*', type=str, metavar='satellite',
+                      help='Jason, GPSIIR, Galileo or Intelsat, default all')
+    tune.add_argument('-a', '--algorithms', nargs='+', type=str, default=['kep', 'rk4', 'j2'],
+                      choices=['kep', 'rk4', 'j2'])
+    tune.add_argument('--days', type=float, default=1)
+    tune.add_argument('--steps', nargs='+', type=float, default=None, help='step sizes in seconds')
+    tune.add_argument('--target', type=float, default=None,
+                      help='recommend the cheapest step with at most this error (km)')
+    tune.add_argument('-o', '--outfile', nargs='?', type=argparse.FileType('w'), default=sys.stdout)
+    tune.add_argument('-p', '--precision', type=int, default=None)
+
+    scenario = subparsers.add_parser('scenario')
+    scenario.add_argument('file', type=str, help='a JSON or TOML scenario')
+    scenario.add_argument('-o', '--outdir', type=str, default=None,
+                          help='defaults to the output in the scenario, or its file name')
+    scenario.add_argument('-j', '--processes', type=int, default=None)
+    scenario.add_argument('-n', '--dry-run', action='store_true', help='list the tasks that would run')
+    scenario.add_argument('--force', action='store_true', help='rerun every task')
+
+    args = parser.parse_args(argv)
     if not args.cmd:
         parser.print_usage()
         sys.exit(-1)
@@ -74,34 +285,82 @@ def propogate(args):
     else:
         sat = Galileo
 
-    if args.algorithm == 'kep':
-        alg = propogateOrbit
-    elif args.algorithm == 'rk4':
-        alg = rk4MonoPropogation
-    else:
-        alg = rk4j2Propogation
-
-    data = alg(sat['R'], sat['V'], 10, int(8640*args.days), sat['time'])
-
-    writeData(data, args.outfile)
+    R, V, start = sat['R'], sat['V'], 0
+    if args.resume is not None:
+        with profiler.stage('read'):
+            R, V, start = resumeState(args.resume, args.algorithm, args.step, sat['time'])
+    steps = max(int(round(86400*args.days/args.step)) - start, 0)
+
+    cache = None
+    if not args.no_cache:
+        cache = PropogationCache(maxBytes=int(args.cache_limit*2**20))
+    blocks = propogationBlocks(args.algorithm, R, V, args.step, steps, sat['time'], cache, start)
+    if args.resume is not None:
+        # the first sample is the end of the earlier run
+        blocks = dropFirstRow(blocks)
+
+    # write each block as soon as it is propogated (or read from the cache)
+    # so that the next command in a pipe can start on it
+    append = args.resume is not None
+    outfile = openOutput(args.outfile, append)
+    try:
+        try:
+            writer = DataWriter(outfile, args.precision, append)
+        except ValueError as e:
+            sys.exit('cannot append to {0}: {1}'.format(args.outfile, e))
+        last = None
+        for block in profiler.iterate('compute', blocks):
+            with profiler.stage('write', len(block)):
+                writer.write(block)
+            last = block[-1]
+        with profiler.stage('write'):
+            writer.close()
+    finally:
+        if outfile is not sys.stdout:
+            outfile.close()
+
+    if args.checkpoint is not None:
+        if last is not None:
+            R, V, start = last['R'], last['V'], steps + start
+        with open(args.checkpoint, 'w') as f:
+            writeCheckpoint(f, args.algorithm, R, V, args.step, start, sat['time'])
+
+
+def openOutput(path, append=False):
+    if path is None or path == '-':
+        return sys.stdout
+    if path.endswith(ARCHIVEEXT):
+        # an archive is extended in place, see ArchiveWriter.extend
+        return open(path, 'r+b' if append and os.path.exists(path) else 'wb')
+    return open(path, 'a' if append else 'w')
+
+
+def dropFirstRow(blocks):
+    first = True
+    for block in blocks:
+        if first:
+            block = block[1:]
+            first = False
+        if len(block):
+            yield block
 
 
 def difference(args):
-    set1 = readECIData(args.infile1)
-    set2 = readECIData(args.infile2)
-
-    diffs = []
+    set1 = iterECIData(args.infile1, args.start, args.end)
+    set2 = iterECIData(args.infile2, args.start, args.end)
+    writer = DataWriter(args.outfile, args.precision)
 
-    if args.hcl:
-        for r, k in zip(set1, set2):
-            diff = HCLDiff((r[0], r[1]), (k[0], k[1]))
-            diffs.append([r[2]] + diff)
-    else:
-        for r, k in zip(set1, set2):
-            diff = ENUDiff((r[0], r[1]), (k[0], k[1]), args.enu, r[2])
-            diffs.append([r[2]] + diff)
+    for block1, block2 in profiler.iterate('read', alignBlocks(set1, set2)):
+        with profiler.stage('compute', len(block1)):
+            if args.hcl:
+                diffs = HCLDiffArray(block1, block2)
+            else:
+                diffs = ENUDiffArray(block1, block2, args.enu)
+        with profiler.stage('write', len(diffs)):
+            writer.write(diffs)
 
-    writeData(diffs, args.outfile)
+    with profiler.stage('write'):
+        writer.close()
 
 
 def triples(lst):
@@ -110,52 +369,402 @@ def triples(lst):
 
 
 def groundTracks(args):
-    data = readECIData(args.infile)
-    ecefData = []
-
-    for step in data:
-        ecefData.append(ECI2ECEF(step[0], step[1], step[2]))
-
     stations = list(triples(args.stations))
-    groundTracks = getGroundTracks([x[0] for x in ecefData], stations)
+    writer = DataWriter(args.outfile, args.precision)
+
+    for block in profiler.iterate('read', iterECIData(args.infile, args.start, args.end)):
+        with profiler.stage('convert', len(block)):
+            ecefData = ECI2ECEFArray(block)
+        with profiler.stage('compute', len(block)):
+            tracks = getGroundTracks(ecefData['R'], stations)
+        with profiler.stage('write', len(tracks)):
+            writer.write(tracks)
 
-    writeData(groundTracks, args.outfile)
+    with profiler.stage('write'):
+        writer.close()
 
 
 def plot(args):
-    if args.graph == 'grndtrck':
-        data = readGrndTrckData(args.infile)
-        plotGroundTracks(data)
-    elif args.graph == 'diffs':
-        data = readData(args.infile)
-        plotDifferences(data)
-    elif args.graph == 'passTimes':
-        data = readData(args.infile)
-        plotPassData(data)
-    elif args.graph == 'eci':
-        data = readData(args.infile)
-        plotECI(data)
+    if args.output is not None:
+        # render without a display
+        import matplotlib
+        matplotlib.use('Agg')
+    # matplotlib and basemap take longer to import than most commands take
+    # to run, so they are only loaded when plotting
+    from satelliteSimulator.plot import renderPlot
+
+    renderPlot(args.graph, args.infile, args.output, args.projection, args.resolution, args.mode,
+               {'timestep': args.timestep, 'speed': args.speed, 'fps': args.fps,
+                'trail': args.trail})
+
+
+def plotBatch(args):
+    import matplotlib
+    matplotlib.use('Agg')  # no display is needed, even for jobs rendered here
+    from satelliteSimulator.batchPlot import readJobs, renderBatch
+
+    failed = 0
+    for output, seconds, error in renderBatch(readJobs(args.jobs), args.processes,
+                                              projection=args.projection,
+                                              resolution=args.resolution,
+                                              mode=args.mode):
+        if error is None:
+            print('{0},{1:.3f}'.format(output, seconds))
+        else:
+            failed += 1
+            sys.stderr.write('{0}: {1}\n'.format(output, error))
+    if failed:
+        sys.exit(1)
 
 
 def passTimes(args):
-    data = readECIData(args.infile)
-    ecefData = []
-
-    for step in data:
-        ecefData.append(ECI2ECEF(step[0], step[1], step[2]))
-
-    if args.stations is None:
-        passTimes = allPassTimes(ecefData)
+    grid = not args.stations
+    stations = gridStations() if grid else list(triples(args.stations))
+    start = args.start
+    if args.state is not None and os.path.exists(args.state):
+        with open(args.state) as f:
+            tracker = PassTracker.loadState(f)
+        if not np.array_equal(tracker.stations, np.reshape(stations, (-1, 3)).astype(float)):
+            sys.exit('the stations do not match those saved in {0}'.format(args.state))
+        if tracker.lastTime is not None:
+            # archives can skip straight to the new samples
+            start = tracker.lastTime if start is None else max(start, tracker.lastTime)
     else:
-        passTimes = []
-        for station in list(triples(args.stations)):
-            passTimes += getStationPassTimes(ecefData, station)
-
-    writeData(passTimes, args.outfile)
+        tracker = PassTracker(stations)
+    writer = DataWriter(args.outfile, args.precision)
+
+    # passes still open at the end of a block stay open in the tracker and
+    # are written once they set in a later block
+    for block in profiler.iterate('read', iterECIData(args.infile, start, args.end)):
+        with profiler.stage('convert', len(block)):
+            ecefData = ECI2ECEFArray(block)
+        with profiler.stage('compute', len(block)):
+            closed = tracker.update(ecefData)
+        if not grid:
+            with profiler.stage('write', len(closed)):
+                writer.write(closed)
+
+    with profiler.stage('write'):
+        if grid:
+            writer.write(tracker.totals())
+        writer.close()
+
+    if args.state is not None:
+        with open(args.state + '.tmp', 'w') as f:
+            tracker.saveState(f)
+        os.replace(args.state + '.tmp', args.state)
+
+
+def passDatabase(args):
+    if os.path.exists(args.database):
+        with profiler.stage('read'):
+            db = PassDatabase.load(args.database)
+    elif args.add:
+        db = PassDatabase()
+    else:
+        sys.exit('no pass database at {0}'.format(args.database))
+
+    if args.add:
+        with profiler.stage('read'):
+            files = [(name, open(path)) for name, path in args.add]
+            try:
+                added = readPasses(files)
+            finally:
+                for name, f in files:
+                    f.close()
+        with profiler.stage('compute', len(added)):
+            db = PassDatabase(np.concatenate([db.passes, added.passes]))
+        with profiler.stage('write', len(db)):
+            db.save(args.database)
+
+    with profiler.stage('compute'):
+        if args.at is not None:
+            passes = db.at(args.at, args.station)
+        elif args.window is not None:
+            passes = db.overlapping(args.window[0], args.window[1], args.station)
+        elif args.next is not None:
+            found = db.nextPass(args.next, args.station, args.satellite)
+            passes = db.passes[:0] if found is None else found[None]
+        else:
+            return
+    with profiler.stage('write', len(passes)):
+        writeData(passes, args.outfile, args.precision)
+
+
+def scheduleContacts(args):
+    from satelliteSimulator.analysis.scheduling import greedySchedule, exactSchedule,\
+                                                       scheduleSummary, MAXCOMPONENT
+
+    with profiler.stage('read'):
+        db = PassDatabase.load(args.database)
+    passes = db.passes
+    if args.start is not None or args.end is not None:
+        # only passes entirely inside the window can be scheduled
+        start = -np.inf if args.start is None else args.start
+        end = np.inf if args.end is None else args.end
+        passes = passes[(passes['rise'] >= start) & (passes['set'] <= end)]
+    profiler.count('read', len(passes))
+
+    with profiler.stage('compute', len(passes)):
+        if args.exact:
+            chosen, greedy = exactSchedule(passes, args.slew, args.weight,
+                                           args.max_component or MAXCOMPONENT)
+            if greedy:
+                sys.stderr.write('{0} passes in large conflict groups were scheduled greedily\n'.format(greedy))
+        else:
+            chosen = greedySchedule(passes, args.slew)
+    with profiler.stage('write', int(chosen.sum())):
+        writeData(passes[chosen], args.outfile, args.precision)
+    summary = scheduleSummary(passes, chosen, args.weight)
+    sys.stderr.write('scheduled {scheduled} of {candidates} passes, {contactTime:.0f} s of contact\n'.format(**summary))
+
+
+def coverage(args):
+    from satelliteSimulator.analysis.visibilityBits import combineSatellites
+
+    stations = list(triples(args.stations)) if args.stations else gridStations()
+    satellites = []
+    for infile in args.infile or [sys.stdin]:
+        blocks = profiler.iterate('read', iterECIData(infile))
+        with profiler.stage('compute'):
+            satellites.append(VisibilityBits.fromBlocks(blocks, stations))
+    with profiler.stage('compute'):
+        bits = combineSatellites(satellites, args.fold)
+        fractions = bits.stationCoverage()
+        maxGaps = []
+        for row in bits.words:
+            starts, ends = bits.gaps(row)
+            maxGaps.append(float((ends - starts).max()) if len(starts) else 0.0)
+        anyStarts, anyEnds = bits.gaps()
+
+    with profiler.stage('write', len(stations)):
+        writeData([(lat, lon, fraction, gap) for (lat, lon, angle), fraction, gap
+                   in zip(stations, fractions, maxGaps)], args.outfile, args.precision)
+    if args.save is not None:
+        bits.save(args.save)
+    sys.stderr.write('covered by any station {0:.2%} of the time, longest gap {1:.0f} s\n'.format(
+        bits.coverage(), float((anyEnds - anyStarts).max()) if len(anyStarts) else 0.0))
+
+
+def revisitStatistics(args):
+    stations = list(triples(args.stations)) if args.stations else gridStations()
+    satellites = [profiler.iterate('read', iterECIData(f)) for f in args.infile or [sys.stdin]]
+    with profiler.stage('compute'):
+        rows = coverageStatistics(satellites, stations, args.fold)
+        summary = constellationSummary(rows)
+    if args.stat is not None:
+        # lat, lon and one value, the layout plotPassData maps
+        column = 2 + STATISTICS.index(args.stat)
+        rows = [(row[0], row[1], row[column]) for row in rows]
+    with profiler.stage('write', len(rows)):
+        writeData(rows, args.outfile, args.precision)
+    sys.stderr.write('covered {coverage:.2%} of the time, mean revisit {meanRevisit:.0f} s, '
+                     'longest revisit {maxRevisit:.0f} s, longest gap {maxGap:.0f} s\n'.format(**summary))
+
+
+def hashedBlocks(blocks, digest):
+    for block in blocks:
+        digest.update(block.tobytes())
+        yield block
+
+
+def chooseSites(args):
+    candidates = list(triples(args.candidates)) if args.candidates else gridStations()
+    existing = list(triples(args.existing))
+    bits = None
+    if args.bits is not None and os.path.exists(args.bits):
+        with profiler.stage('read'):
+            bits = VisibilityBits.load(args.bits)
+        if not np.array_equal(bits.stations, np.reshape(candidates, (-1, 3)).astype(float)):
+            sys.exit('the candidates do not match those saved in {0}'.format(args.bits))
+
+    # the trajectories are always read, to check saved bits against them, but
+    # visibility is only found for the stations that need it, with the
+    # existing stations after the candidates
+    stations = (candidates if bits is None else []) + existing
+    digest = hashlib.sha256()
+    satellites = [hashedBlocks(profiler.iterate('read', iterECIData(f)), digest)
+                  for f in args.infile or [sys.stdin]]
+    with profiler.stage('compute'):
+        found = candidateVisibility(satellites, stations)
+    if bits is not None and (bits.source != digest.hexdigest() or
+                             not np.array_equal(bits.times, found.times)):
+        sys.exit('the trajectories do not match those saved in {0}'.format(args.bits))
+
+    covered = None
+    if existing:
+        covered = VisibilityBits(found.words[-len(existing):], found.times, existing).anyStation()
+    if bits is None:
+        bits = VisibilityBits(found.words[:len(candidates)], found.times, candidates, digest.hexdigest())
+        if args.bits is not None:
+            bits.save(args.bits)
+
+    with profiler.stage('compute'):
+        sites = selectSites(bits, args.count, args.objective, covered)
+    with profiler.stage('write', len(sites)):
+        writeData(sites, args.outfile, args.precision)
+
+
+def crosslinkIntervals(args):
+    with profiler.stage('read'):
+        try:
+            R, times = stackPositions([np.concatenate(list(iterECIData(f))) for f in args.infile])
+        except ValueError as e:
+            sys.exit('cannot find crosslinks: {0}'.format(e))
+    with profiler.stage('compute', R.shape[0]*R.shape[1]):
+        links = linkIntervals(R, times, args.max_range, args.margin)
+    with profiler.stage('write', len(links)):
+        writeData(links, args.outfile, args.precision)
+
+
+def screenCatalogue(args):
+    with profiler.stage('read'):
+        trajectories = [np.concatenate(list(iterECIData(f))) for f in args.infile]
+        try:
+            R, times = stackPositions(trajectories)
+        except ValueError as e:
+            sys.exit('cannot screen the catalogue: {0}'.format(e))
+        V = np.stack([eci['V'] for eci in trajectories])
+    with profiler.stage('compute', R.shape[0]*R.shape[1]):
+        approaches = screenConjunctions(R, V, times, args.threshold)
+    with profiler.stage('write', len(approaches)):
+        writeData(approaches, args.outfile, args.precision)
+
+
+def eclipses(args):
+    tracker = EclipseTracker(args.model)
+    writer = DataWriter(args.outfile, args.precision)
+
+    # eclipses in progress at the end of a block are written once they end
+    for block in profiler.iterate('read', iterECIData(args.infile, args.start, args.end)):
+        with profiler.stage('compute', len(block)):
+            found = tracker.update(block)
+        with profiler.stage('write', len(found)):
+            writer.write(found)
+    with profiler.stage('compute'):
+        found = tracker.close()
+    with profiler.stage('write', len(found)):
+        writer.write(found)
+        writer.close()
+
+
+def passProfiles(args):
+    stations = list(triples(args.stations)) if args.stations else gridStations()
+    tracker = PassProfiler(stations, args.frequency)
+    index = DataWriter(args.outfile, args.precision)
+    os.makedirs(args.outdir, exist_ok=True)
+
+    def writePasses(passes, number):
+        for s, profile in passes:
+            with open(os.path.join(args.outdir, '{0}.csv'.format(number)), 'w') as f:
+                writeData(profile, f, args.precision)
+            index.write(passSummary(number, stations[s], profile))
+            number += 1
+        return number
+
+    number = 0
+    for block in profiler.iterate('read', iterECIData(args.infile, args.start, args.end)):
+        with profiler.stage('convert', len(block)):
+            ecefData = ECI2ECEFArray(block)
+        with profiler.stage('compute', len(block)):
+            passes = tracker.update(ecefData)
+        with profiler.stage('write', len(passes)):
+            number = writePasses(passes, number)
+    with profiler.stage('compute'):
+        passes = tracker.close()
+    with profiler.stage('write', len(passes)):
+        writePasses(passes, number)
+        index.close()
+
+
+def storeTrajectory(args):
+    store = TrajectoryStore(args.path)
+
+    if args.replace:
+        store.remove(args.satellite)
+    for block in profiler.iterate('read', iterECIData(args.infile)):
+        with profiler.stage('write', len(block)):
+            store.append(args.satellite, block)
+
+
+def query(args):
+    store = TrajectoryStore(args.path)
+
+    with profiler.stage('read'):
+        if args.range:
+            data = store.range(args.satellite, args.range[0], args.range[1])
+        else:
+            data = store.at(args.satellite, args.at)
+        profiler.count('read', len(data))
+
+    with profiler.stage('write', len(data)):
+        writeData(data, args.outfile, args.precision)
+
+
+def tuneSteps(args):
+    from satelliteSimulator.propogation.tuning import tune, recommend, STEPSIZES
+
+    satellites = {'Jason': Jason, 'GPSIIR': GPSIIR, 'Galileo': Galileo, 'Intelsat': Intelsat}
+    names = args.satellites or ['Jason', 'GPSIIR', 'Galileo', 'Intelsat']
+    for name in names:
+        if name not in satellites:
+            sys.exit('unknown satellite {0}, choose from {1}'.format(name, ', '.join(satellites)))
+    with profiler.stage('compute'):
+        results = tune([(name, satellites[name]) for name in names], args.algorithms,
+                       86400*args.days, args.steps or STEPSIZES)
+    with profiler.stage('write', len(results)):
+        writeData(results, args.outfile, args.precision)
+        if args.target is not None:
+            # recommendations follow the table after a blank line
+            args.outfile.write('\n')
+            writeData(recommend(results, args.target), args.outfile, args.precision)
+
+
+def scenarioCommand(args):
+    from satelliteSimulator.scenario import loadScenario, buildTasks, runScenario
+
+    scenario = loadScenario(args.file)
+    outdir = args.outdir
+    if outdir is None:
+        # relative to the scenario file, not wherever it is run from
+        default = os.path.splitext(os.path.basename(args.file))[0]
+        outdir = os.path.join(os.path.dirname(args.file), scenario.get('output', default))
+    tasks = buildTasks(scenario)
+
+    failed = 0
+    for name, status, seconds, error in runScenario(tasks, outdir, getArgs, runCommand,
+                                                    args.processes, args.force, args.dry_run):
+        print('{0},{1},{2:.3f}'.format(name, status, seconds))
+        if error is not None:
+            sys.stderr.write('{0}: {1}\n'.format(name, error))
+        if status in ('failed', 'skipped'):
+            failed += 1
+    if failed:
+        sys.exit(1)
 
 
 def main():
     args = getArgs()
+    if args.profile is not None:
+        profiler.start(args.profile_memory)
+    if args.cprofile is not None:
+        import cProfile
+        cprof = cProfile.Profile()
+        cprof.enable()
+    try:
+        runCommand(args)
+    finally:
+        if args.cprofile is not None:
+            cprof.disable()
+            cprof.dump_stats(args.cprofile)
+        if args.profile == '-':
+            profiler.write(sys.stderr, args.cmd)
+        elif args.profile is not None:
+            with open(args.profile, 'w') as f:
+                profiler.write(f, args.cmd)
+
+
+def runCommand(args):
     if args.cmd == 'propogate':
         propogate(args)
     elif args.cmd == 'difference':
@@ -164,8 +773,36 @@ def main():
         groundTracks(args)
     elif args.cmd == 'plot':
         plot(args)
+    elif args.cmd == 'plotBatch':
+        plotBatch(args)
     elif args.cmd == 'passTimes':
         passTimes(args)
+    elif args.cmd == 'passDb':
+        passDatabase(args)
+    elif args.cmd == 'schedule':
+        scheduleContacts(args)
+    elif args.cmd == 'coverage':
+        coverage(args)
+    elif args.cmd == 'revisit':
+        revisitStatistics(args)
+    elif args.cmd == 'sites':
+        chooseSites(args)
+    elif args.cmd == 'crosslinks':
+        crosslinkIntervals(args)
+    elif args.cmd == 'conjunctions':
+        screenCatalogue(args)
+    elif args.cmd == 'eclipse':
+        eclipses(args)
+    elif args.cmd == 'passProfiles':
+        passProfiles(args)
+    elif args.cmd == 'store':
+        storeTrajectory(args)
+    elif args.cmd == 'query':
+        query(args)
+    elif args.cmd == 'tune':
+        tuneSteps(args)
+    elif args.cmd == 'scenario':
+        scenarioCommand(args)
 
 
 if __name__ == '__main__':
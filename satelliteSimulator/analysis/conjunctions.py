@@ -0,0 +1,224 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: conjunctions
+    :platform: Unix
+    :synopsis: Screens a catalogue of trajectories for close approaches
+
+.. moduleauthor:: Henry Mortimer <henry@morti.net>
+
+Checking the distance between every pair of N objects at T epochs takes
+O(N²T) work. Screening cuts this down in three stages.
+
+1. The range of orbital radii of each object is found from its samples. Two
+   objects whose ranges are further apart than the threshold can never meet,
+   and an object that overlaps no other is dropped entirely.
+2. At each epoch the remaining objects are hashed into a grid of cubes a
+   little larger than the distance either object can close in one step, so
+   that any pair that comes within the threshold before the next epoch is in
+   the same or a neighbouring cube. Only those pairs are checked.
+3. A close approach is where the range rate of a pair changes from negative
+   to positive. The samples either side are interpolated with the cubic
+   hermite spline, and the time and distance of closest approach refined by
+   searching ever smaller brackets.
+
+Approaches at the very start or end of the trajectories, where the pair is
+already moving apart or still closing, are not reported.
+"""
+
+from ..interpolation import hermite
+import numpy as np
+
+THRESHOLD = 5  # km
+REFINESAMPLES = 17  # samples per bracket when refining an approach
+REFINEROUNDS = 4
+
+CONJUNCTION_DTYPE = np.dtype([('first', np.int64),
+                              ('second', np.int64),
+                              ('time', np.float64),
+                              ('distance', np.float64),
+                              ('speed', np.float64)])
+
+# half of the neighbouring cubes, so that each pair of cubes is visited once
+NEIGHBOURS = np.array([(x, y, z) for x in (-1, 0, 1) for y in (-1, 0, 1) for z in (-1, 0, 1)
+                       if (x, y, z) > (0, 0, 0)])
+CELLBITS = 21  # bits of each packed cube coordinate
+
+
+def radiusRanges(R):
+    """Finds the smallest and largest orbital radius of each object
+
+    Args:
+        R: Array (float): ECI positions (km), shape (objects, epochs, 3).
+
+    Returns:
+        Tuple: Arrays (float) of the smallest and largest radii.
+    """
+    radius = np.sqrt(np.einsum('...i,...i->...', R, R))
+    return radius.min(axis=1), radius.max(axis=1)
+
+
+def overlappingShells(low, high, threshold=THRESHOLD):
+    """Finds the objects whose radii come within the threshold of another's
+
+    Args:
+        low, high: Array (float): The radius ranges from radiusRanges.
+
+        threshold: float: The screening distance (km).
+
+    Returns:
+        Array (bool): True for objects that could approach another.
+    """
+    order = np.argsort(low, kind='stable')
+    low, high = low[order], high[order]
+    # an earlier shell reaching this one, or the next shell starting inside it
+    reach = np.maximum.accumulate(high)
+    before = np.concatenate([[False], reach[:-1] >= low[1:] - threshold])
+    after = np.concatenate([low[1:] - threshold <= high[:-1], [False]])
+    found = np.empty(len(order), dtype=bool)
+    found[order] = before | after
+    return found
+
+
+def packCells(cells):
+    """Packs integer cube coordinates into one key
+
+    Args:
+        cells: Array (int): Shape (..., 3).
+
+    Returns:
+        Array (int64): The keys.
+    """
+    offset = 1 << (CELLBITS - 1)
+    cells = cells.astype(np.int64) + offset
+    return (cells[..., 0] << (2*CELLBITS)) | (cells[..., 1] << CELLBITS) | cells[..., 2]
+
+
+def neighbourPairs(R, size):
+    """Finds the pairs of objects in the same or neighbouring cubes
+
+    Args:
+        R: Array (float): Positions (km), shape (objects, 3).
+
+        size: float: The length of a cube edge (km).
+
+    Returns:
+        Tuple: Arrays (int) of the first and second object of each pair,
+        first < second.
+    """
+    keys = packCells(np.floor(R/size))
+    order = np.argsort(keys, kind='stable')
+    sortedKeys = keys[order]
+    position = np.arange(len(order))
+
+    firsts, seconds = [], []
+    # pairs within a cube, from later in the sorted order
+    last = np.searchsorted(sortedKeys, sortedKeys, 'right')
+    counts = last - position - 1
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    first = np.repeat(position, counts)
+    firsts.append(order[first])
+    seconds.append(order[first + 1 + offsets])
+    # packing is linear, so the keys of a neighbouring cube are the keys plus
+    # a constant and stay sorted, which keeps the searches fast
+    for delta in packCells(NEIGHBOURS) - packCells(np.zeros(3)):
+        other = sortedKeys + delta
+        lo = np.searchsorted(sortedKeys, other, 'left')
+        counts = np.searchsorted(sortedKeys, other, 'right') - lo
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        firsts.append(order[np.repeat(position, counts)])
+        seconds.append(order[np.repeat(lo, counts) + offsets])
+    first = np.concatenate(firsts)
+    second = np.concatenate(seconds)
+    return np.minimum(first, second), np.maximum(first, second)
+
+
+def refineApproaches(t0, R0, V0, t1, R1, V1):
+    """Finds the closest approach of pairs between two samples
+
+    Args:
+        t0, t1: Array (float): The sample times (seconds).
+
+        R0, V0, R1, V1: Array (float): The relative position (km) and
+        velocity (km/s) of each pair at t0 and t1, shape (pairs, 3).
+
+    Returns:
+        Tuple: Arrays (float) of the time, distance and relative speed of
+        the closest approach.
+    """
+    low, high = np.zeros(len(t0)), np.ones(len(t0))
+    steps = np.linspace(0, 1, REFINESAMPLES)
+    for i in range(REFINEROUNDS):
+        s = low[:, None] + (high - low)[:, None]*steps
+        t = t0[:, None] + (t1 - t0)[:, None]*s
+        R = hermite(t0[:, None], R0[:, None], V0[:, None], t1[:, None], R1[:, None], V1[:, None], t)[0]
+        best = np.argmin(np.einsum('...i,...i->...', R, R), axis=1)
+        spacing = (high - low)/(REFINESAMPLES - 1)
+        centre = low + spacing*best
+        low, high = np.maximum(centre - spacing, 0), np.minimum(centre + spacing, 1)
+    s = (low + high)/2
+    t = t0 + (t1 - t0)*s
+    R, V = hermite(t0, R0, V0, t1, R1, V1, t)
+    return t, np.linalg.norm(R, axis=1), np.linalg.norm(V, axis=1)
+
+
+def screenConjunctions(R, V, times, threshold=THRESHOLD):
+    """Finds every close approach between a catalogue of objects
+
+    Args:
+        R, V: Array (float): ECI positions (km) and velocities (km/s),
+        shape (objects, epochs, 3).
+
+        times: Array (float): The time of each epoch (seconds).
+
+        threshold: float: Report approaches closer than this (km).
+
+    Returns:
+        Array: CONJUNCTION_DTYPE records ordered by time.
+    """
+    R = np.asarray(R, dtype=float)
+    V = np.asarray(V, dtype=float)
+    times = np.asarray(times, dtype=float)
+    low, high = radiusRanges(R)
+    active = np.flatnonzero(overlappingShells(low, high, threshold))
+    if len(active) < 2 or len(times) < 2:
+        return np.empty(0, dtype=CONJUNCTION_DTYPE)
+
+    # two objects close at most this much between epochs
+    speed = np.sqrt(np.einsum('...i,...i->...', V[active], V[active])).max()
+    size = threshold + 2*speed*np.diff(times).max()
+
+    found = []
+    for k in range(len(times) - 1):
+        first, second = neighbourPairs(R[active, k], size)
+        first, second = active[first], active[second]
+        keep = (low[first] - threshold <= high[second]) & (low[second] - threshold <= high[first])
+        first, second = first[keep], second[keep]
+
+        dR0 = R[second, k] - R[first, k]
+        keep = np.einsum('...i,...i->...', dR0, dR0) <= size**2
+        first, second, dR0 = first[keep], second[keep], dR0[keep]
+        dV0 = V[second, k] - V[first, k]
+        dR1 = R[second, k + 1] - R[first, k + 1]
+        dV1 = V[second, k + 1] - V[first, k + 1]
+        # closing at the start of the step and opening by its end
+        keep = (np.einsum('...i,...i->...', dR0, dV0) < 0) & (np.einsum('...i,...i->...', dR1, dV1) >= 0)
+        if not keep.any():
+            continue
+
+        count = int(keep.sum())
+        t, distance, relative = refineApproaches(np.full(count, times[k]), dR0[keep], dV0[keep],
+                                                 np.full(count, times[k + 1]), dR1[keep], dV1[keep])
+        close = distance <= threshold
+        records = np.zeros(int(close.sum()), dtype=CONJUNCTION_DTYPE)
+        records['first'] = first[keep][close]
+        records['second'] = second[keep][close]
+        records['time'] = t[close]
+        records['distance'] = distance[close]
+        records['speed'] = relative[close]
+        found.append(records)
+    if not found:
+        return np.empty(0, dtype=CONJUNCTION_DTYPE)
+    records = np.concatenate(found)
+    return records[np.lexsort((records['second'], records['first'], records['time']))]
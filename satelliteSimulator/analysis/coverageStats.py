@@ -0,0 +1,219 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: coverageStats
+    :platform: Unix
+    :synopsis: Revisit time and coverage gap statistics for a grid of
+        stations
+
+.. moduleauthor:: Henry Mortimer <henry@morti.net>
+
+A station is covered while it sees at least some number of the satellites
+in a constellation. Like PassTracker, coverage is a series of intervals that
+start on the first sample a station is covered and end on the first sample
+it is not, so gaps run from the end of one interval to the start of the
+next. The revisit time is the time between the starts of two intervals.
+
+The statistics are gathered in one pass over blocks of samples. Within a
+block the starts and ends of every station's intervals are found together
+and each is paired with the event before it, which may have been carried
+over from an earlier block. Nothing is kept per interval, so the memory used
+depends only on the number of stations.
+"""
+
+from .visibility import visibilityMatrix
+from ..converters.eci2ecef import ECI2ECEFArray
+import numpy as np
+
+STATISTICS = ('coverage', 'meanRevisit', 'maxRevisit', 'maxGap')
+
+
+def groupEnds(keys):
+    """Marks the first and last of each run of equal keys
+
+    Args:
+        keys: Array (int): Grouped keys.
+
+    Returns:
+        Tuple: Arrays (bool) that are True for the first and for the last
+        element of each group.
+    """
+    change = keys[1:] != keys[:-1]
+    edge = np.ones(min(len(keys), 1), dtype=bool)
+    return np.concatenate([edge, change]), np.concatenate([change, edge])
+
+
+class CoverageTracker(object):
+    """Gathers coverage statistics for stations from visibility that arrives
+    in blocks.
+
+    Args:
+        stations: Array (tuple): A list of station latitudes, longitudes
+        and masking angles (degrees).
+    """
+
+    def __init__(self, stations):
+        self.stations = np.asarray(stations, dtype=float).reshape(-1, 3)
+        count = len(self.stations)
+        self.open = np.zeros(count, dtype=bool)
+        self.lastEvent = np.zeros(count)  # start of the current interval or gap
+        self.lastRise = np.full(count, np.nan)
+        self.covered = np.zeros(count)
+        self.revisits = np.zeros(count, dtype=np.int64)
+        self.revisitSum = np.zeros(count)
+        self.revisitMax = np.full(count, np.nan)
+        self.gapMax = np.zeros(count)
+        self.firstTime = None
+        self.lastTime = None
+
+    def update(self, times, vis):
+        """Processes the next block of samples
+
+        Args:
+            times: Array (float): The sample times (seconds).
+
+            vis: Array (bool): Shape (len(times), stations), True where a
+            station is covered.
+        """
+        times = np.asarray(times, dtype=float)
+        if len(times) == 0:
+            return
+        if self.firstTime is None:
+            self.firstTime = self.lastTime = float(times[0])
+            self.lastEvent[:] = times[0]
+
+        prev = np.vstack([self.open[None, :], vis[:-1]])
+        changed = vis != prev
+        station, step = np.nonzero(changed.T)  # grouped by station, in time order
+        if len(station):
+            rises = vis[step, station]
+            eventTimes = times[step]
+            # the event before each one, carried over for the first of a station
+            first, last = groupEnds(station)
+            before = np.where(first, self.lastEvent[station], np.roll(eventTimes, 1))
+            lengths = eventTimes - before
+            np.add.at(self.covered, station[~rises], lengths[~rises])
+            np.maximum.at(self.gapMax, station[rises], lengths[rises])
+
+            riseStation, riseTimes = station[rises], eventTimes[rises]
+            firstRise, lastRise = groupEnds(riseStation)
+            before = np.where(firstRise, self.lastRise[riseStation], np.roll(riseTimes, 1))
+            revisit = riseTimes - before
+            known = ~np.isnan(revisit)
+            np.add.at(self.revisits, riseStation[known], 1)
+            np.add.at(self.revisitSum, riseStation[known], revisit[known])
+            np.fmax.at(self.revisitMax, riseStation[known], revisit[known])
+
+            self.lastEvent[station[last]] = eventTimes[last]
+            self.lastRise[riseStation[lastRise]] = riseTimes[lastRise]
+
+        self.open = vis[-1].copy()
+        self.lastTime = float(times[-1])
+
+    def statistics(self):
+        """Gets the statistics of the samples so far, counting the interval
+        or gap still open at the last sample up to its time
+
+        Returns:
+            Array: A list of station latitudes and longitudes with the
+            fraction of the time covered, the mean and maximum revisit time
+            and the maximum gap (seconds). Revisit times are nan for
+            stations covered fewer than twice.
+        """
+        span = 0.0 if self.firstTime is None else self.lastTime - self.firstTime
+        tail = 0.0 if self.lastTime is None else self.lastTime - self.lastEvent
+        covered = self.covered + np.where(self.open, tail, 0.0)
+        gapMax = np.where(self.open, self.gapMax, np.maximum(self.gapMax, tail))
+        fraction = covered/span if span > 0 else self.open.astype(float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            meanRevisit = np.where(self.revisits > 0, self.revisitSum/self.revisits, np.nan)
+        return [tuple(float(x) for x in row) for row in zip(
+            self.stations[:, 0], self.stations[:, 1], fraction, meanRevisit, self.revisitMax, gapMax)]
+
+
+def mergeVisibility(satellites, stations, fold=1):
+    """Combines the visibility of a constellation block by block
+
+    Args:
+        satellites: Array: An iterable of ECI data blocks for each satellite,
+        e.g. from iterECIData, all with the same sample times. The blocks
+        need not be the same sizes.
+
+        stations: Array (tuple): The stations.
+
+        fold: int: The number of satellites a station must see at once.
+
+    Yields:
+        Tuple: The sample times and the coverage of each station, shape
+        (samples, stations).
+    """
+    stations = np.asarray(stations, dtype=float).reshape(-1, 3)
+    sources = [iter(blocks) for blocks in satellites]
+    pending = [None]*len(sources)
+    while True:
+        for i, source in enumerate(sources):
+            while pending[i] is None or len(pending[i][0]) == 0:
+                block = next(source, None)
+                if block is None:
+                    if any(p is not None and len(p[0]) for p in pending) or \
+                       any(next(other, None) is not None for other in sources):
+                        raise ValueError('the trajectories have different numbers of samples')
+                    return
+                vis = visibilityMatrix(ECI2ECEFArray(block)['R'], stations)
+                pending[i] = (np.asarray(block['time'], dtype=float), vis)
+        count = min(len(p[0]) for p in pending)
+        times = pending[0][0][:count]
+        seen = np.zeros((count, len(stations)), dtype=np.int64)
+        for i, (t, vis) in enumerate(pending):
+            if not np.array_equal(t[:count], times):
+                raise ValueError('the trajectories must have the same sample times')
+            seen += vis[:count]
+            pending[i] = (t[count:], vis[count:])
+        yield times, seen >= fold
+
+
+def coverageStatistics(satellites, stations, fold=1):
+    """Gathers coverage statistics for a constellation
+
+    Args:
+        satellites: Array: An iterable of ECI data blocks for each
+        satellite, see mergeVisibility.
+
+        stations: Array (tuple): The stations.
+
+        fold: int: The number of satellites a station must see at once.
+
+    Returns:
+        Array: The statistics of each station, see
+        CoverageTracker.statistics.
+    """
+    tracker = CoverageTracker(stations)
+    for times, vis in mergeVisibility(satellites, stations, fold):
+        tracker.update(times, vis)
+    return tracker.statistics()
+
+
+def constellationSummary(statistics):
+    """Summarises the statistics of a grid of stations
+
+    Args:
+        statistics: Array: Rows returned by CoverageTracker.statistics.
+
+    Returns:
+        Dict: The mean coverage and mean revisit time weighted by the
+        cosine of latitude, the area each grid point stands for, and the
+        worst maximum revisit time and gap.
+    """
+    rows = np.asarray(statistics, dtype=float).reshape(-1, 6)
+    weights = np.cos(np.radians(rows[:, 0]))
+    revisited = ~np.isnan(rows[:, 3])
+
+    def weighted(values, mask):
+        total = weights[mask].sum()
+        return float((values[mask]*weights[mask]).sum()/total) if total > 0 else float('nan')
+
+    return {'coverage': weighted(rows[:, 2], np.ones(len(rows), dtype=bool)),
+            'meanRevisit': weighted(rows[:, 3], revisited),
+            'maxRevisit': float(rows[revisited, 4].max()) if revisited.any() else float('nan'),
+            'maxGap': float(rows[:, 5].max()) if len(rows) else float('nan')}
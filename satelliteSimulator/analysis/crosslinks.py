@@ -0,0 +1,139 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: crosslinks
+    :platform: Unix
+    :synopsis: Finds when pairs of satellites can link to each other
+
+.. moduleauthor:: Henry Mortimer <henry@morti.net>
+
+Two satellites have a line of sight when the straight line between them
+stays clear of the Earth and a margin of atmosphere above it, and a link
+when they also are within range of each other. The point of the line
+closest to the centre of the Earth is found by projecting the centre onto
+it, clamped to the ends, so a pair on the same side of the Earth is never
+blocked.
+
+The positions of a constellation are held as one (satellites, epochs, 3)
+array. The pairs in the upper triangle are taken in chunks, so that only a
+chunk's worth of (pairs, epochs) arrays is in memory at once, and the link
+intervals of a whole chunk are found together. As with station passes, an
+interval starts on the first epoch with a link and ends on the first without
+one, or on the last epoch if the link is still up at the end.
+"""
+
+from ..data import EARTHRADIUS
+from .visibilityBits import runs
+import numpy as np
+
+ATMOSPHERE = 100  # km, the height a line of sight has to clear
+PAIRCHUNK = 64  # pairs evaluated at once
+
+LINK_DTYPE = np.dtype([('first', np.int64),
+                       ('second', np.int64),
+                       ('start', np.float64),
+                       ('end', np.float64),
+                       ('duration', np.float64)])
+
+
+def lineOfSight(first, second, margin=ATMOSPHERE):
+    """Checks whether the Earth blocks the line between pairs of positions
+
+    Args:
+        first, second: Array (float): ECI positions (km), shape (..., 3).
+
+        margin: float: The height above EARTHRADIUS the line has to clear
+        (km).
+
+    Returns:
+        Array (bool): True where the line is clear.
+    """
+    d = second - first
+    length2 = np.einsum('...i,...i->...', d, d)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = -np.einsum('...i,...i->...', first, d)/length2
+    t = np.clip(np.nan_to_num(t), 0, 1)
+    closest = first + t[..., None]*d
+    return np.einsum('...i,...i->...', closest, closest) > (EARTHRADIUS + margin)**2
+
+
+def linkMatrix(R, pairs, maxRange=None, margin=ATMOSPHERE):
+    """Finds the epochs each pair of satellites can link
+
+    Args:
+        R: Array (float): ECI positions (km), shape (satellites, epochs, 3).
+
+        pairs: Tuple: Arrays (int) of the first and second satellite of each
+        pair.
+
+        maxRange: float: The longest link (km), unlimited by default.
+
+        margin: float: See lineOfSight.
+
+    Returns:
+        Array (bool): Shape (pairs, epochs).
+    """
+    first, second = R[pairs[0]], R[pairs[1]]
+    links = lineOfSight(first, second, margin)
+    if maxRange is not None:
+        d = second - first
+        links &= np.einsum('...i,...i->...', d, d) <= maxRange**2
+    return links
+
+
+def linkIntervals(R, times, maxRange=None, margin=ATMOSPHERE, chunk=PAIRCHUNK):
+    """Finds every interval in which a pair of satellites can link
+
+    Args:
+        R: Array (float): ECI positions (km), shape (satellites, epochs, 3).
+
+        times: Array (float): The time of each epoch (seconds).
+
+        maxRange: float: The longest link (km), unlimited by default.
+
+        margin: float: See lineOfSight.
+
+        chunk: int: The number of pairs evaluated at once.
+
+    Returns:
+        Array: LINK_DTYPE records ordered by pair and then by start time.
+    """
+    R = np.asarray(R, dtype=float)
+    times = np.asarray(times, dtype=float)
+    first, second = np.triu_indices(len(R), 1)
+    found = []
+    for start in range(0, len(first), chunk):
+        pairs = (first[start:start + chunk], second[start:start + chunk])
+        links = linkMatrix(R, pairs, maxRange, margin)
+        # runs of a whole chunk at once, with a False column between pairs
+        flat = np.concatenate([links, np.zeros((len(links), 1), dtype=bool)], axis=1).reshape(-1)
+        rises, sets = runs(flat)
+        pair, rises = np.divmod(rises, len(times) + 1)
+        sets = sets - pair*(len(times) + 1)
+
+        records = np.zeros(len(pair), dtype=LINK_DTYPE)
+        records['first'] = pairs[0][pair]
+        records['second'] = pairs[1][pair]
+        records['start'] = times[rises]
+        records['end'] = times[np.minimum(sets, len(times) - 1)]
+        records['duration'] = records['end'] - records['start']
+        found.append(records)
+    return np.concatenate(found) if found else np.empty(0, dtype=LINK_DTYPE)
+
+
+def stackPositions(satellites):
+    """Gathers the positions of a constellation into one array
+
+    Args:
+        satellites: Array: ECI data for each satellite, all with the same
+        sample times.
+
+    Returns:
+        Tuple: The positions, shape (satellites, epochs, 3), and the times.
+    """
+    times = np.asarray(satellites[0]['time'], dtype=float)
+    for eci in satellites[1:]:
+        if not np.array_equal(eci['time'], times):
+            raise ValueError('the trajectories must have the same sample times')
+    return np.stack([eci['R'] for eci in satellites]), times
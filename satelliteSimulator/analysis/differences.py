@@ -13,7 +13,7 @@
 import numpy as np
 from numpy import linalg as LA
 from ..converters.latlong2enu import calculateENUBasis
-from ..converters.eci2ecef import ECI2ECEF
+from ..converters.eci2ecef import ECI2ECEF, ECI2ECEFArray
 
 
 def calculateVectorDiff(X1, X2):
@@ -154,3 +154,48 @@ def ENUDiff(X1, X2, station, time):
 
     diff = calculateVectorDiff(X1ecef[0], X2ecef[0])
     return projectOntoBasis(e, n, u, diff)
+
+
+def HCLDiffArray(X1, X2):
+    """Calculates HCLDiff for many pairs of samples at once.
+
+    Args:
+        X1, X2: Array: ECI data as returned by readECIData. The basis is
+        taken from X1.
+
+    Returns:
+        Array (float): Shape (N, 4), the time of X1 followed by the
+        difference vectors in an HCL basis.
+    """
+    diff = X2['R'] - X1['R']
+    H = X1['R']/LA.norm(X1['R'], axis=1)[:, None]
+    C = np.cross(X1['R'], X1['V'])
+    C /= LA.norm(C, axis=1)[:, None]
+    L = np.cross(C, H)
+
+    return np.column_stack([X1['time'],
+                            np.sum(H*diff, axis=1),
+                            np.sum(C*diff, axis=1),
+                            np.sum(L*diff, axis=1)])
+
+
+def ENUDiffArray(X1, X2, station):
+    """Calculates ENUDiff for many pairs of samples at once.
+
+    Args:
+        X1, X2: Array: ECI data as returned by readECIData. Both are rotated
+        into ECEF using the times of X1.
+
+        station: Tuple (float): The latitude and longitude of the station
+        (degrees).
+
+    Returns:
+        Array (float): Shape (N, 4), the time of X1 followed by the
+        difference vectors in an ENU basis.
+    """
+    e, n, u = calculateENUBasis(station[0], station[1])
+    X2 = X2.copy()
+    X2['time'] = X1['time']
+    diff = ECI2ECEFArray(X2)['R'] - ECI2ECEFArray(X1)['R']
+
+    return np.column_stack([X1['time'], diff @ e, diff @ n, diff @ u])
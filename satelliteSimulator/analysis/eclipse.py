@@ -0,0 +1,199 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: eclipse
+    :platform: Unix
+    :synopsis: Finds when a satellite is in the Earth's shadow
+
+.. moduleauthor:: Henry Mortimer <henry@morti.net>
+
+Seen from the satellite, the Sun and the Earth are discs with angular radii
+a and b and centres c apart. The satellite is in sunlight while
+c >= a + b, in umbra while c <= b - a, and in penumbra between. The
+cylindrical model ignores the size of the Sun: the satellite is in umbra
+when it is behind the Earth and closer than EARTHRADIUS to the line from
+the Earth to the Sun, and there is no penumbra.
+
+Each model gives two margins, one for each edge of the shadow, that are
+positive outside it. Where a margin changes sign between two samples the
+crossing is refined by bisection, interpolating the trajectory with the
+cubic hermite spline and moving the Sun to each trial time. A year of
+10 second samples is about 3 million epochs, which numpy handles in a few
+seconds, while there are only a few thousand crossings to refine.
+"""
+
+from ..data import EARTHRADIUS, SUNRADIUS
+from ..interpolation import hermite
+from ..sun import sunPosition
+import numpy as np
+
+MODELS = ('conical', 'cylindrical')
+SUNLIGHT, PENUMBRA, UMBRA = 0, 1, 2
+BISECTIONS = 30  # halvings of a step when refining a crossing
+
+ECLIPSE_DTYPE = np.dtype([('shadow', np.int64),
+                          ('start', np.float64),
+                          ('end', np.float64),
+                          ('duration', np.float64)])
+
+
+def shadowMargins(R, sun, model='conical'):
+    """Measures how far positions are outside each edge of the shadow
+
+    Args:
+        R: Array (float): ECI positions (km), shape (..., 3).
+
+        sun: Array (float): The Sun's ECI positions (km), the same shape.
+
+        model: string: 'conical' or 'cylindrical'.
+
+    Returns:
+        Tuple: Arrays (float) that are positive outside the penumbra and
+        outside the umbra.
+    """
+    radius = np.sqrt(np.einsum('...i,...i->...', R, R))
+    if model == 'conical':
+        toSun = sun - R
+        distance = np.sqrt(np.einsum('...i,...i->...', toSun, toSun))
+        a = np.arcsin(SUNRADIUS/distance)
+        b = np.arcsin(np.minimum(EARTHRADIUS/radius, 1))
+        cosc = -np.einsum('...i,...i->...', R, toSun)/(radius*distance)
+        c = np.arccos(np.clip(cosc, -1, 1))
+        return c - (a + b), c - (b - a)
+    if model == 'cylindrical':
+        unit = sun/np.sqrt(np.einsum('...i,...i->...', sun, sun))[..., None]
+        along = np.einsum('...i,...i->...', R, unit)
+        across = np.sqrt(np.maximum(radius**2 - along**2, 0))
+        margin = np.where(along < 0, across - EARTHRADIUS, radius)
+        return margin, margin
+    raise ValueError('unknown model {0!r}, choose from {1}'.format(model, ', '.join(MODELS)))
+
+
+def shadowState(R, sun, model='conical'):
+    """Classifies positions as in sunlight, penumbra or umbra
+
+    Args:
+        R: Array (float): ECI positions (km), shape (..., 3).
+
+        sun: Array (float): The Sun's ECI positions (km), the same shape.
+
+        model: string: 'conical' or 'cylindrical'.
+
+    Returns:
+        Array (int): SUNLIGHT, PENUMBRA or UMBRA.
+    """
+    penumbra, umbra = shadowMargins(R, sun, model)
+    return np.where(umbra <= 0, UMBRA, np.where(penumbra <= 0, PENUMBRA, SUNLIGHT))
+
+
+def refineCrossings(t0, R0, V0, t1, R1, V1, edge, model='conical'):
+    """Finds when a margin changes sign between samples by bisection
+
+    Args:
+        t0, t1: Array (float): The times of the samples either side
+        (seconds).
+
+        R0, V0, R1, V1: Array (float): The ECI positions (km) and velocities
+        (km/s) at t0 and t1.
+
+        edge: int: 0 for the edge of the penumbra, 1 for the umbra.
+
+        model: string: 'conical' or 'cylindrical'.
+
+    Returns:
+        Array (float): The times of the crossings.
+    """
+    def margin(t):
+        R = hermite(t0, R0, V0, t1, R1, V1, t)[0]
+        return shadowMargins(R, sunPosition(t), model)[edge]
+
+    low, high = np.array(t0, dtype=float), np.array(t1, dtype=float)
+    outside = margin(low) > 0
+    for i in range(BISECTIONS):
+        middle = (low + high)/2
+        same = (margin(middle) > 0) == outside
+        low = np.where(same, middle, low)
+        high = np.where(same, high, middle)
+    return (low + high)/2
+
+
+class EclipseTracker(object):
+    """Finds eclipses in ECI data that arrives in blocks.
+
+    The last sample of each block, and the start of any eclipse still in
+    progress, are kept so that a crossing between blocks is refined and an
+    eclipse that spans blocks is reported once, when it ends.
+
+    Args:
+        model: string: 'conical' or 'cylindrical'.
+    """
+
+    def __init__(self, model='conical'):
+        if model not in MODELS:
+            raise ValueError('unknown model {0!r}, choose from {1}'.format(model, ', '.join(MODELS)))
+        self.model = model
+        self.last = None
+        self.starts = [None, None]  # start of an eclipse in progress, for each edge
+
+    def update(self, eciData):
+        """Processes the next block of samples
+
+        Args:
+            eciData: Array: ECI data following on from the previous block.
+
+        Returns:
+            Array: ECLIPSE_DTYPE records for the eclipses that ended during
+            this block, in order of end time. Shadow is PENUMBRA for the
+            time in any part of the shadow and UMBRA for the time in umbra.
+        """
+        if len(eciData) == 0:
+            return np.empty(0, dtype=ECLIPSE_DTYPE)
+        if self.last is not None:
+            eciData = np.concatenate([self.last, eciData])
+        times = eciData['time']
+        margins = shadowMargins(eciData['R'], sunPosition(times), self.model)
+
+        found = []
+        for edge, shadow in ((0, PENUMBRA), (1, UMBRA)):
+            inside = margins[edge] <= 0
+            if self.last is None and inside[0]:
+                self.starts[edge] = float(times[0])
+            k = np.flatnonzero(inside[1:] != inside[:-1])
+            if len(k) == 0:
+                continue
+            crossings = refineCrossings(times[k], eciData['R'][k], eciData['V'][k],
+                                        times[k + 1], eciData['R'][k + 1], eciData['V'][k + 1],
+                                        edge, self.model)
+            entering = inside[k + 1]
+            starts = crossings[entering].tolist()
+            ends = crossings[~entering].tolist()
+            if self.starts[edge] is not None:
+                starts.insert(0, self.starts[edge])
+            self.starts[edge] = starts.pop() if len(starts) > len(ends) else None
+            for start, end in zip(starts, ends):
+                found.append((shadow, start, end, end - start))
+
+        self.last = eciData[-1:].copy()
+        records = np.array(found, dtype=float).reshape(-1, 4)
+        records = records[np.argsort(records[:, 2], kind='stable')]
+        res = np.zeros(len(records), dtype=ECLIPSE_DTYPE)
+        for i, name in enumerate(ECLIPSE_DTYPE.names):
+            res[name] = records[:, i]
+        return res
+
+    def close(self):
+        """Ends any eclipse still in progress at the last sample
+
+        Returns:
+            Array: ECLIPSE_DTYPE records.
+        """
+        res = np.zeros(sum(start is not None for start in self.starts), dtype=ECLIPSE_DTYPE)
+        i = 0
+        for start, shadow in zip(self.starts, (PENUMBRA, UMBRA)):
+            if start is not None:
+                end = float(self.last['time'][0])
+                res[i] = (shadow, start, end, end - start)
+                i += 1
+        self.starts = [None, None]
+        return res
@@ -10,24 +10,30 @@
 
 """
 
-from ..converters.ecef2latlong import ecef2latlong
-from .visibility import stationVisibility
+from ..converters.ecef2latlong import ecef2latlongArray
+from ..utils import GRNDTRCK_DTYPE
+from .visibility import visibilityMatrix
+import numpy as np
 
 
 def getGroundTracks(ecefPos, stations):
     """Gets the ground track for an array of ECEF positions
 
     Args:
-        ecefPos: Array: An array of position and velocity vectors (km)
+        ecefPos: Array: An array of ECEF position vectors with shape (N, 3)
+        (km)
         
         stations: Array (Tuple): List of tuples of lat lon and masking angle
 
     Returns
-        Array: An array of latitudes and longitudes (degrees)
+        Array: A structured array of latitudes and longitudes (degrees),
+        heights (km) and whether any station can see the satellite.
     """
-    result = []
-    for step in ecefPos:
-        visible = stationVisibility(step, stations)
-        res = ecef2latlong(step)
-        result.append((res, visible))
+    ecefPos = np.asarray(ecefPos, dtype=float).reshape(-1, 3)
+    result = np.empty(len(ecefPos), dtype=GRNDTRCK_DTYPE)
+    result['lat'], result['lon'], result['height'] = ecef2latlongArray(ecefPos)
+    if len(stations):
+        result['visible'] = visibilityMatrix(ecefPos, stations).any(axis=1)
+    else:
+        result['visible'] = False
     return result
@@ -0,0 +1,158 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: passProfiles
+    :platform: Unix
+    :synopsis: Range, range rate and Doppler shift through station passes
+
+.. moduleauthor:: Henry Mortimer <henry@morti.net>
+
+Stations are fixed in ECEF space, so the ECEF velocity of the satellite
+(from calculateECEFVel, or ECI2ECEFArray for many samples) is its velocity
+relative to the station. For every sample of a pass the station to
+satellite vector r and that velocity v give
+
+* range ``|r|``
+* range rate ``r.v/|r|``, positive while the satellite moves away
+* Doppler shift ``-f*rangeRate/c`` for a carrier frequency f
+* elevation and azimuth from r projected onto the station's ENU basis
+
+all worked out for the visible samples of a station in one array
+operation. Passes are found the same way as by PassTracker, and one that
+spans blocks is returned once, when it sets.
+"""
+
+from .visibility import stationVectors, visibilityMatrix
+from .visibilityBits import runs
+from ..data import SPEEDOFLIGHT
+import numpy as np
+
+PROFILE_DTYPE = np.dtype([('time', np.float64),
+                          ('range', np.float64),
+                          ('rangeRate', np.float64),
+                          ('doppler', np.float64),
+                          ('elevation', np.float64),
+                          ('azimuth', np.float64)])
+
+SUMMARY_DTYPE = np.dtype([('pass', np.int64),
+                          ('lat', np.float64),
+                          ('lon', np.float64),
+                          ('rise', np.float64),
+                          ('set', np.float64),
+                          ('maxElevation', np.float64),
+                          ('minRange', np.float64)])
+
+
+def passSummary(number, station, profile):
+    """Summarises a pass for an index of pass profiles
+
+    Args:
+        number: int: The pass number.
+
+        station: Tuple: The station latitude, longitude and masking angle
+        (degrees).
+
+        profile: Array: The PROFILE_DTYPE records of the pass.
+
+    Returns:
+        Array: One SUMMARY_DTYPE record. The set time is that of the last
+        sample of the pass.
+    """
+    return np.array([(number, station[0], station[1], profile['time'][0], profile['time'][-1],
+                      profile['elevation'].max(), profile['range'].min())], dtype=SUMMARY_DTYPE)
+
+
+def passProfile(ecefData, station, frequency=0):
+    """Works out the range, range rate, Doppler shift and look angles of
+    samples from a station
+
+    Args:
+        ecefData: Array: ECEF data, e.g. from ECI2ECEFArray.
+
+        station: Tuple: The station latitude, longitude and masking angle
+        (degrees).
+
+        frequency: float: The carrier frequency (Hz).
+
+    Returns:
+        Array: PROFILE_DTYPE records, the Doppler shift in Hz.
+    """
+    Rp, e, n, u = (x[0] for x in stationVectors([station]))
+    r = ecefData['R'] - Rp
+    distance = np.sqrt(np.einsum('ij,ij->i', r, r))
+    enu = r @ np.stack([e, n, u]).T
+
+    profile = np.empty(len(ecefData), dtype=PROFILE_DTYPE)
+    profile['time'] = ecefData['time']
+    profile['range'] = distance
+    profile['rangeRate'] = np.einsum('ij,ij->i', r, ecefData['V'])/distance
+    profile['doppler'] = -frequency*profile['rangeRate']/SPEEDOFLIGHT
+    profile['elevation'] = np.degrees(np.arcsin(np.clip(enu[:, 2]/distance, -1, 1)))
+    profile['azimuth'] = np.degrees(np.arctan2(enu[:, 0], enu[:, 1])) % 360
+    return profile
+
+
+class PassProfiler(object):
+    """Builds the profile of each station pass in ECEF data that arrives in
+    blocks.
+
+    Args:
+        stations: Array (tuple): A list of station latitudes, longitudes
+        and masking angles (degrees).
+
+        frequency: float: The carrier frequency (Hz).
+    """
+
+    def __init__(self, stations, frequency=0):
+        self.stations = np.asarray(stations, dtype=float).reshape(-1, 3)
+        self.frequency = frequency
+        self.open = [None]*len(self.stations)  # profile blocks of passes in progress
+
+    def update(self, ecefData):
+        """Processes the next block of samples
+
+        Args:
+            ecefData: Array: ECEF data following on from the previous block.
+
+        Returns:
+            Array: The passes that set during this block, in order of set
+            time, each as a tuple of the station index and its
+            PROFILE_DTYPE records.
+        """
+        if len(ecefData) == 0:
+            return []
+        vis = visibilityMatrix(ecefData['R'], self.stations)
+        res = []
+        for s in np.flatnonzero(~vis[0]):
+            if self.open[s] is not None:
+                # set on the first sample of this block
+                res.append((ecefData['time'][0], s, np.concatenate(self.open[s])))
+                self.open[s] = None
+
+        for s in np.flatnonzero(vis.any(axis=0)):
+            starts, ends = runs(vis[:, s])
+            profile = passProfile(ecefData[vis[:, s]], self.stations[s], self.frequency)
+            bounds = np.cumsum(ends - starts)[:-1]
+            for start, end, part in zip(starts, ends, np.split(profile, bounds)):
+                parts = [part]
+                if start == 0 and self.open[s] is not None:
+                    parts = self.open[s] + parts
+                if end == len(ecefData):
+                    self.open[s] = parts
+                else:
+                    res.append((ecefData['time'][end], s, np.concatenate(parts)))
+                    self.open[s] = None
+
+        res.sort(key=lambda p: (p[0], p[1]))
+        return [(int(s), part) for t, s, part in res]
+
+    def close(self):
+        """Ends the passes still in progress at the last sample
+
+        Returns:
+            Array: Tuples of the station index and PROFILE_DTYPE records.
+        """
+        res = [(s, np.concatenate(parts)) for s, parts in enumerate(self.open) if parts is not None]
+        self.open = [None]*len(self.stations)
+        return res
@@ -0,0 +1,315 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: scheduling
+    :platform: Unix
+    :synopsis: Assigns station passes to contacts
+
+.. moduleauthor:: Henry Mortimer <henry@morti.net>
+
+Each station has one antenna, which tracks one satellite at a time and
+needs a slew time between the end of one contact and the start of the
+next. Each satellite talks to one station at a time. Two passes conflict if
+they break either rule, and a schedule is a set of passes with no conflicts
+between them.
+
+The greedy scheduler takes passes in order of set time and keeps each one
+that is free of the passes already kept. With a single station this
+maximises the number of contacts, and it is fast enough for tens of
+thousands of passes. The exact scheduler is for small instances. It splits
+the conflict graph into connected components, as passes only conflict with
+passes close to them in time. A component at a single station is a set of
+intervals, solved exactly by dynamic programming. Any other component is
+solved by branch and bound, bounding each branch by covering the remaining
+passes with cliques of mutually conflicting passes, at most one of which can
+be kept. On dense random passes components of MAXCOMPONENT passes take
+under 0.1 s. Components larger than that are scheduled greedily.
+"""
+
+import numpy as np
+
+MAXCOMPONENT = 40  # passes, the largest component solved exactly
+WEIGHTS = ('count', 'duration')
+
+
+def stationKeys(passes):
+    """Numbers the stations and satellites of some passes
+
+    Args:
+        passes: Array: PASS_DTYPE records.
+
+    Returns:
+        Tuple: Arrays (int) with the station and the satellite of each pass.
+    """
+    stations = np.unique(passes[['lat', 'lon']], return_inverse=True)[1].reshape(-1)
+    satellites = np.unique(passes['satellite'], return_inverse=True)[1].reshape(-1)
+    return stations, satellites
+
+
+def conflictGraph(passes, slew=0):
+    """Finds every pair of passes that cannot both be scheduled
+
+    Args:
+        passes: Array: PASS_DTYPE records.
+
+        slew: float: The time a station needs between contacts (seconds).
+
+    Returns:
+        Tuple: The conflicts as a sparse adjacency matrix in compressed row
+        form: for pass i the conflicting passes are
+        indices[indptr[i]:indptr[i + 1]].
+    """
+    stations, satellites = stationKeys(passes)
+    firsts, seconds = [], []
+    for keys, gap in ((stations, slew), (satellites, 0)):
+        for key in np.unique(keys):
+            group = np.flatnonzero(keys == key)
+            group = group[np.argsort(passes['rise'][group], kind='stable')]
+            rise = passes['rise'][group]
+            # later passes in the group that rise before this one is free
+            last = np.searchsorted(rise, passes['set'][group] + gap, 'left')
+            counts = np.maximum(last - np.arange(len(group)) - 1, 0)
+            first = np.repeat(np.arange(len(group)), counts)
+            offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            firsts.append(group[first])
+            seconds.append(group[first + 1 + offsets])
+
+    count = len(passes)
+    if not firsts:
+        return np.zeros(count + 1, dtype=np.int64), np.empty(0, dtype=np.int64)
+    # both directions of every pair, sorted and without the pairs that
+    # clash on both station and satellite twice
+    first = np.concatenate(firsts + seconds).astype(np.int64)
+    second = np.concatenate(seconds + firsts).astype(np.int64)
+    pairs = np.unique(first*count + second)
+    first, second = np.divmod(pairs, count)
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(first, minlength=count))])
+    return indptr, second
+
+
+def passWeights(passes, weight='count'):
+    """Gets the value of scheduling each pass
+
+    Args:
+        passes: Array: PASS_DTYPE records.
+
+        weight: string: 'count' to value every contact equally or
+        'duration' to value contact time.
+
+    Returns:
+        Array (float): The weights.
+    """
+    if weight == 'count':
+        return np.ones(len(passes))
+    if weight == 'duration':
+        return passes['duration'].astype(float)
+    raise ValueError('unknown weight {0!r}, choose from {1}'.format(weight, ', '.join(WEIGHTS)))
+
+
+def greedySchedule(passes, slew=0):
+    """Schedules passes in order of set time
+
+    Args:
+        passes: Array: PASS_DTYPE records.
+
+        slew: float: The time a station needs between contacts (seconds).
+
+    Returns:
+        Array (bool): True for the passes scheduled.
+    """
+    stations, satellites = stationKeys(passes)
+    # in set time order the last contact kept for a station or satellite is
+    # the only one a new pass can clash with
+    stationFree = np.full(stations.max() + 1 if len(passes) else 0, -np.inf)
+    satelliteFree = np.full(satellites.max() + 1 if len(passes) else 0, -np.inf)
+    chosen = np.zeros(len(passes), dtype=bool)
+    rises = passes['rise'].tolist()
+    sets = passes['set'].tolist()
+    for i in np.lexsort((passes['rise'], passes['set'])).tolist():
+        st, sat = stations[i], satellites[i]
+        if rises[i] >= stationFree[st] and rises[i] >= satelliteFree[sat]:
+            chosen[i] = True
+            stationFree[st] = sets[i] + slew
+            satelliteFree[sat] = sets[i]
+    return chosen
+
+
+def components(indptr, indices):
+    """Splits a graph into connected components
+
+    Args:
+        indptr, indices: Array (int): The graph as returned by conflictGraph.
+
+    Returns:
+        Array (int): The component number of each node.
+    """
+    count = len(indptr) - 1
+    label = np.full(count, -1)
+    current = 0
+    for start in range(count):
+        if label[start] != -1:
+            continue
+        label[start] = current
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            for other in indices[indptr[node]:indptr[node + 1]].tolist():
+                if label[other] == -1:
+                    label[other] = current
+                    stack.append(other)
+        current += 1
+    return label
+
+
+def intervalSchedule(starts, ends, weights):
+    """Finds the heaviest set of intervals that do not overlap, by dynamic
+    programming in O(n log n)
+
+    Args:
+        starts, ends: Array (float): The intervals, [start, end).
+
+        weights: Array (float): The weight of each interval.
+
+    Returns:
+        Array (bool): True for the intervals chosen.
+    """
+    order = np.argsort(ends, kind='stable')
+    starts, ends, weights = starts[order], ends[order], np.asarray(weights, dtype=float)[order]
+    # the number of intervals that end before each one starts
+    free = np.searchsorted(ends, starts, 'right').tolist()
+    best = [0.0]
+    for i, w in enumerate(weights.tolist()):
+        best.append(max(best[i], best[free[i]] + w))
+
+    chosen = np.zeros(len(order), dtype=bool)
+    i = len(order)
+    while i > 0:
+        if best[i] == best[i - 1]:
+            i -= 1
+        else:
+            chosen[order[i - 1]] = True
+            i = free[i - 1]
+    return chosen
+
+
+def maxWeightIndependentSet(weights, neighbours):
+    """Finds the heaviest set of nodes with no edges between them by branch
+    and bound
+
+    Args:
+        weights: Array (float): The weight of each node.
+
+        neighbours: Array (int): A bit mask of each node's neighbours.
+
+    Returns:
+        int: A bit mask of the chosen nodes.
+    """
+    count = len(weights)
+    best = [-1.0, 0]
+
+    def bound(candidates):
+        # at most one node of a clique can be chosen, so covering the
+        # candidates with cliques and adding the heaviest node of each gives
+        # an upper bound
+        total = 0.0
+        while candidates:
+            low = candidates & -candidates
+            v = low.bit_length() - 1
+            clique, heaviest = low, weights[v]
+            common = candidates & neighbours[v]
+            while common:
+                other = common & -common
+                u = other.bit_length() - 1
+                clique |= other
+                heaviest = max(heaviest, weights[u])
+                common &= neighbours[u]
+            total += heaviest
+            candidates &= ~clique
+        return total
+
+    def search(candidates, weight, chosen):
+        if weight + bound(candidates) <= best[0]:
+            return
+        if not candidates:
+            best[0], best[1] = weight, chosen
+            return
+        low = candidates & -candidates
+        v = low.bit_length() - 1
+        search(candidates & ~neighbours[v] & ~low, weight + weights[v], chosen | low)
+        search(candidates & ~low, weight, chosen)
+
+    search((1 << count) - 1, 0.0, 0)
+    return best[1]
+
+
+def exactSchedule(passes, slew=0, weight='count', maxComponent=MAXCOMPONENT):
+    """Schedules passes to maximise the total weight
+
+    Args:
+        passes: Array: PASS_DTYPE records.
+
+        slew: float: The time a station needs between contacts (seconds).
+
+        weight: string: 'count' or 'duration', see passWeights.
+
+        maxComponent: int: Groups of conflicting passes larger than this
+        are scheduled greedily instead.
+
+    Returns:
+        Tuple: An array (bool) that is True for the passes scheduled and the
+        number of passes that were scheduled greedily.
+    """
+    weights = passWeights(passes, weight)
+    indptr, indices = conflictGraph(passes, slew)
+    labels = components(indptr, indices)
+    stations = stationKeys(passes)[0]
+    chosen = np.zeros(len(passes), dtype=bool)
+    greedy = 0
+
+    order = np.argsort(labels, kind='stable')
+    bounds = np.flatnonzero(np.diff(labels[order])) + 1
+    for nodes in np.split(order, bounds) if len(order) else []:
+        if len(nodes) == 1:
+            chosen[nodes] = True
+        elif (stations[nodes] == stations[nodes[0]]).all():
+            # one antenna: passes conflict exactly when they overlap once
+            # the slew is added, whatever the satellites
+            chosen[nodes] = intervalSchedule(passes['rise'][nodes], passes['set'][nodes] + slew,
+                                             weights[nodes])
+        elif len(nodes) > maxComponent:
+            chosen[nodes] = greedySchedule(passes[nodes], slew)
+            greedy += len(nodes)
+        else:
+            # branch on passes in time order so that the bound tightens quickly
+            nodes = nodes[np.argsort(passes['rise'][nodes], kind='stable')]
+            position = {node: i for i, node in enumerate(nodes.tolist())}
+            neighbours = []
+            for node in nodes.tolist():
+                mask = 0
+                for other in indices[indptr[node]:indptr[node + 1]].tolist():
+                    mask |= 1 << position[other]
+                neighbours.append(mask)
+            mask = maxWeightIndependentSet(weights[nodes].tolist(), neighbours)
+            chosen[nodes] = [bool(mask >> i & 1) for i in range(len(nodes))]
+    return chosen, greedy
+
+
+def scheduleSummary(passes, chosen, weight='count'):
+    """Describes a schedule
+
+    Args:
+        passes: Array: PASS_DTYPE records.
+
+        chosen: Array (bool): The scheduled passes.
+
+        weight: string: The weight the schedule maximised.
+
+    Returns:
+        Dict: The number of candidate and scheduled passes, the total
+        contact time and the total weight.
+    """
+    return {'candidates': int(len(passes)),
+            'scheduled': int(chosen.sum()),
+            'contactTime': float(passes['duration'][chosen].sum()),
+            'weight': float(passWeights(passes, weight)[chosen].sum())}
@@ -0,0 +1,185 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: siteSelection
+    :platform: Unix
+    :synopsis: Chooses where to put new ground stations
+
+.. moduleauthor:: Henry Mortimer <henry@morti.net>
+
+The visibility of every candidate site is found once, as packed bits (see
+visibilityBits), and the sites are then chosen one at a time without going
+back to the trajectories.
+
+Coverage, the number of epochs seen by at least one chosen site, is
+submodular: a site never adds more to a larger network than to a smaller
+one. So the lazy greedy method can keep the gain each candidate had when it
+was last scored in a heap and only rescore the top of the heap. If the top
+is still best after rescoring it is chosen, and most candidates are scored
+only a few times however many sites are picked.
+
+The longest gap is not submodular, so for that objective every step scores
+the candidates on the current longest gap only: each is scored by the
+longest part of that gap it leaves uncovered, and ties are broken by the
+coverage each would add. Only the words of the gap are unpacked.
+"""
+
+from .visibilityBits import VisibilityBits, combineSatellites, popcount, unpackBits, WORDBITS
+import numpy as np
+import heapq
+
+OBJECTIVES = ('coverage', 'gap')
+
+
+def candidateVisibility(satellites, candidates):
+    """Finds when each candidate site sees a constellation
+
+    Args:
+        satellites: Array: An iterable of ECI data blocks for each
+        satellite, all with the same sample times.
+
+        candidates: Array (tuple): The candidate latitudes, longitudes and
+        masking angles (degrees).
+
+    Returns:
+        VisibilityBits: A site's bit is set when it sees any satellite.
+    """
+    return combineSatellites([VisibilityBits.fromBlocks(blocks, candidates) for blocks in satellites])
+
+
+def lazyGreedyCoverage(bits, k, covered=None):
+    """Chooses sites to cover the most epochs
+
+    Args:
+        bits: VisibilityBits: The candidate sites.
+
+        k: int: The number of sites to choose.
+
+        covered: Array (uint64): Packed epochs already covered by existing
+        stations.
+
+    Returns:
+        Array (tuple): The index of each site chosen, in order, and the
+        number of epochs it added. Fewer than k are chosen if no other site
+        would add anything.
+    """
+    covered = np.zeros(bits.words.shape[1], dtype=np.uint64) if covered is None else covered.copy()
+    # (-gain, site, the number of sites chosen when it was scored)
+    heap = [(-popcount(row & ~covered), site, 0) for site, row in enumerate(bits.words)]
+    heapq.heapify(heap)
+    chosen = []
+    while heap and len(chosen) < k:
+        gain, site, scored = heapq.heappop(heap)
+        if scored < len(chosen):
+            heapq.heappush(heap, (-popcount(bits.words[site] & ~covered), site, len(chosen)))
+            continue
+        if gain == 0:
+            break
+        chosen.append((site, -gain))
+        covered |= bits.words[site]
+    return chosen
+
+
+def longestRuns(flags):
+    """Finds the longest run of False in each row of booleans
+
+    Args:
+        flags: Array (bool): Shape (rows, length).
+
+    Returns:
+        Tuple: Arrays (int) with the start and length of each row's run.
+    """
+    rows, length = flags.shape
+    # every True plus one before the start and one after the end of each row
+    row, col = np.nonzero(flags)
+    row = np.concatenate([np.arange(rows), row, np.arange(rows)])
+    col = np.concatenate([np.full(rows, -1), col, np.full(rows, length)])
+    order = np.lexsort((col, row))
+    row, col = row[order], col[order]
+    runs = np.diff(col) - 1
+    runs[row[1:] != row[:-1]] = -1
+    starts = col[:-1] + 1
+
+    best = np.zeros(rows, dtype=np.int64)
+    np.maximum.at(best, row[:-1], runs)
+    # the first run of each row with the longest length
+    isBest = runs == best[row[:-1]]
+    first = np.full(rows, length, dtype=np.int64)
+    np.minimum.at(first, row[:-1][isBest], starts[isBest])
+    return first, best
+
+
+def greedyMaxGap(bits, k, covered=None):
+    """Chooses sites to shorten the longest gap in coverage
+
+    Args:
+        bits: VisibilityBits: The candidate sites.
+
+        k: int: The number of sites to choose.
+
+        covered: Array (uint64): Packed epochs already covered by existing
+        stations.
+
+    Returns:
+        Array (tuple): The index of each site chosen, in order, and the
+        number of epochs it added. Fewer than k are chosen if there are no
+        gaps left.
+    """
+    covered = np.zeros(bits.words.shape[1], dtype=np.uint64) if covered is None else covered.copy()
+    chosen = []
+    for step in range(min(k, len(bits.words))):
+        flags = unpackBits(covered, len(bits))
+        start, length = longestRuns(flags[None, :])
+        start, length = int(start[0]), int(length[0])
+        if length == 0:
+            break
+        first, last = start//WORDBITS, -(-(start + length)//WORDBITS)
+        window = unpackBits(bits.words[:, first:last], (last - first)*WORDBITS)
+        offset = start - first*WORDBITS
+        left = longestRuns(window[:, offset:offset + length])[1]
+
+        gains = np.array([popcount(row & ~covered) for row in bits.words])
+        left[[site for site, gain in chosen]] = length + 1
+        site = int(np.lexsort((-gains, left))[0])
+        chosen.append((site, int(gains[site])))
+        covered |= bits.words[site]
+    return chosen
+
+
+def selectSites(bits, k, objective='coverage', covered=None):
+    """Chooses sites for new stations
+
+    Args:
+        bits: VisibilityBits: The candidate sites, e.g. from
+        candidateVisibility.
+
+        k: int: The number of sites to choose.
+
+        objective: string: 'coverage' to cover the most epochs or 'gap' to
+        shorten the longest gap.
+
+        covered: Array (uint64): Packed epochs already covered by existing
+        stations.
+
+    Returns:
+        Array (tuple): The latitude, longitude and masking angle of each
+        site, in the order chosen, with the fraction of epochs covered and
+        the longest gap (seconds) once it is added.
+    """
+    if objective == 'coverage':
+        chosen = lazyGreedyCoverage(bits, k, covered)
+    elif objective == 'gap':
+        chosen = greedyMaxGap(bits, k, covered)
+    else:
+        raise ValueError('unknown objective {0!r}, choose from {1}'.format(objective, ', '.join(OBJECTIVES)))
+
+    covered = np.zeros(bits.words.shape[1], dtype=np.uint64) if covered is None else covered.copy()
+    res = []
+    for site, gain in chosen:
+        covered |= bits.words[site]
+        starts, ends = bits.gaps(covered)
+        lat, lon, angle = bits.stations[site]
+        res.append((float(lat), float(lon), float(angle), bits.coverage(covered),
+                    float((ends - starts).max()) if len(starts) else 0.0))
+    return res
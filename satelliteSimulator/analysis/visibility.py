@@ -13,11 +13,13 @@
 from ..converters.ecef2latlong import ecef2latlong
 from ..converters.latlong2enu import calculateENUBasis, calculateU
 from ..data import EARTHRADIUS
-from ..utils import normalisedAtan2
+from ..utils import normalisedAtan2, ECI_DTYPE
 from numpy import linalg as LA
 import numpy as np
+import json
 import math
-import progressbar
+
+PASSBLOCK = 1000  # samples per block when scanning the whole station grid
 
 
 def getBasis(R):
@@ -140,35 +142,235 @@ def stationVisibility(Rs, stations):
     return False
 
 
+def stationVectors(stations):
+    """Calculates the position and ENU basis of many tracking stations
+
+    Args:
+        stations: Array (tuple): A list of station latitudes, longitudes
+        and masking angles (degrees).
+
+    Returns:
+        Tuple: Arrays with shape (S, 3) of the ECEF station positions (km)
+        and the e, n and u unit vectors.
+    """
+    stations = np.asarray(stations, dtype=float).reshape(-1, 3)
+    lat = np.radians(stations[:, 0])
+    lon = np.radians(stations[:, 1])
+
+    e = np.stack([-np.sin(lon), np.cos(lon), np.zeros_like(lon)], axis=1)
+    n = np.stack([-np.cos(lon)*np.sin(lat), -np.sin(lon)*np.sin(lat), np.cos(lat)], axis=1)
+    u = np.stack([np.cos(lon)*np.cos(lat), np.sin(lon)*np.cos(lat), np.sin(lat)], axis=1)
+
+    return (u*EARTHRADIUS, e, n, u)
+
+
+def lookAngles(Rs, stations):
+    """Calculates the elevation and azimuth of many satellite positions from
+    many tracking stations at once.
+
+    Args:
+        Rs: Array (float): Satellite positions in ECEF space with shape
+        (T, 3) (km).
+
+        stations: Array (tuple): A list of station latitudes, longitudes
+        and masking angles (degrees).
+
+    Returns:
+        Tuple: Arrays with shape (T, S) of θ the elevation angle and α the
+        angle from north (degrees).
+    """
+    Rp, e, n, u = stationVectors(stations)
+    Rs = np.asarray(Rs, dtype=float).reshape(-1, 3)
+
+    # project the station to satellite vectors onto each station's basis
+    # with matrix products rather than building a (T, S, 3) array
+    rsse = Rs @ e.T - np.sum(Rp*e, axis=1)
+    rssn = Rs @ n.T - np.sum(Rp*n, axis=1)
+    rssu = Rs @ u.T - np.sum(Rp*u, axis=1)
+    norm = np.sqrt(rsse**2 + rssn**2 + rssu**2)
+    rsse /= norm
+    rssn /= norm
+    rssu /= norm
+
+    θ = np.degrees(np.arcsin(np.clip(rssu, -1, 1)))
+    α = np.degrees(np.arctan2(rsse, rssn)) % 360
+    return (θ, α)
+
+
+def visibilityMatrix(Rs, stations):
+    """Determines which stations can see each satellite position
+
+    Args:
+        Rs: Array (float): Satellite positions in ECEF space with shape
+        (T, 3) (km).
+
+        stations: Array (tuple): A list of station latitudes, longitudes
+        and masking angles (degrees).
+
+    Returns:
+        Array (bool): Shape (T, S), True where station s can see sample t.
+    """
+    stations = np.asarray(stations, dtype=float).reshape(-1, 3)
+    θ, α = lookAngles(Rs, stations)
+    return θ - stations[:, 2] > 0
+
+
+class PassTracker(object):
+    """Finds station passes in ECEF data that arrives in blocks.
+
+    Whether each station currently sees the satellite, and the rise time and
+    angles of any open pass, are kept between blocks so that a pass which
+    spans a block boundary is reported once, when it sets. The state, with
+    the total pass time of each station so far, can be saved and loaded
+    again to carry on when the trajectory is extended, rather than scanning
+    it from the start.
+
+    Args:
+        stations: Array (tuple): A list of station latitudes, longitudes
+        and masking angles (degrees).
+    """
+
+    def __init__(self, stations):
+        self.stations = np.asarray(stations, dtype=float).reshape(-1, 3)
+        count = len(self.stations)
+        self.open = np.zeros(count, dtype=bool)
+        self.riseTime = np.zeros(count)
+        self.riseθ = np.zeros(count)
+        self.riseα = np.zeros(count)
+        self.total = np.zeros(count)
+        self.lastTime = None
+
+    def update(self, ecefData):
+        """Processes the next block of samples
+
+        Args:
+            ecefData: Array: ECEF data (e.g. from ECI2ECEFArray) following on
+            from the previous block. Samples at or before the last one
+            already processed are skipped, so a whole extended trajectory
+            can be given after loading a saved state.
+
+        Returns:
+            Array: A list of the passes that set during this block, grouped
+            by station. Each pass is a tuple of the station latitude and
+            longitude, the rise time, set time and duration and the rise
+            elevation and azimuth.
+        """
+        if self.lastTime is not None and len(ecefData) and ecefData['time'][0] <= self.lastTime:
+            ecefData = ecefData[ecefData['time'] > self.lastTime]
+        if len(ecefData) == 0:
+            return []
+        times = ecefData['time']
+        θ, α = lookAngles(ecefData['R'], self.stations)
+        vis = θ - self.stations[:, 2] > 0
+
+        prev = np.vstack([self.open[None, :], vis[:-1]])
+        rises = vis & ~prev
+        sets = ~vis & prev
+
+        res = []
+        for s in np.flatnonzero(rises.any(axis=0) | sets.any(axis=0)):
+            lat, lon = self.stations[s, 0], self.stations[s, 1]
+            events = np.flatnonzero(rises[:, s] | sets[:, s])
+            for t in events:
+                if rises[t, s]:
+                    self.riseTime[s] = times[t]
+                    self.riseθ[s] = θ[t, s]
+                    self.riseα[s] = α[t, s]
+                else:
+                    self.total[s] += times[t] - self.riseTime[s]
+                    res.append(tuple(float(x) for x in (
+                        lat, lon, self.riseTime[s], times[t],
+                        times[t] - self.riseTime[s], self.riseθ[s], self.riseα[s])))
+
+        self.open = vis[-1].copy()
+        self.lastTime = float(times[-1])
+        return res
+
+    def totals(self, passes=None):
+        """Adds up the pass durations for each station
+
+        Args:
+            passes: Array: Passes as returned by update. Defaults to every
+            pass the tracker has closed, including those before its state
+            was saved.
+
+        Returns:
+            Array: A list of station latitudes, longitudes and the total
+            time the satellite was visible.
+        """
+        if passes is None:
+            return [(float(lat), float(lon), float(t))
+                    for (lat, lon, angle), t in zip(self.stations, self.total)]
+        total = {}
+        for p in passes:
+            total[(p[0], p[1])] = total.get((p[0], p[1]), 0) + p[4]
+        return [(float(lat), float(lon), total.get((lat, lon), 0.0))
+                for lat, lon, angle in self.stations]
+
+    def saveState(self, fileobj):
+        """Saves the stations and the state after the last sample as JSON
+
+        Args:
+            fileobj: A text file handle.
+        """
+        # json writes the shortest repr of each float, which reads back exactly
+        json.dump({'stations': self.stations.tolist(),
+                   'open': self.open.tolist(),
+                   'riseTime': self.riseTime.tolist(),
+                   'riseθ': self.riseθ.tolist(),
+                   'riseα': self.riseα.tolist(),
+                   'total': self.total.tolist(),
+                   'lastTime': self.lastTime}, fileobj)
+        fileobj.write('\n')
+
+    @classmethod
+    def loadState(cls, fileobj):
+        """Loads a tracker saved by saveState
+
+        Args:
+            fileobj: A text file handle.
+
+        Returns:
+            PassTracker: Ready to carry on from the sample after the last
+            one it processed.
+        """
+        state = json.load(fileobj)
+        tracker = cls(state['stations'])
+        tracker.open = np.array(state['open'], dtype=bool)
+        for name in ('riseTime', 'riseθ', 'riseα', 'total'):
+            setattr(tracker, name, np.array(state[name], dtype=float))
+        tracker.lastTime = state['lastTime']
+        return tracker
+
+
 def getStationPassTimes(ecefData, station):
     """Gets a list of pass times for a station 
     
     Args:
-        ecefData: Array: A list of ecef positions
+        ecefData: Array: ECEF data, either a structured array or a list
+        of (position, velocity, time) tuples.
         
         station: Tuple: The lat lon and masking angle of the station
         
     Returns:
-        Array: A list of stations with the rise time, set time,
-        rise angle and set angle
+        Array: A list of passes with the station lat and lon, rise time,
+        set time, duration and the rise elevation and azimuth
+    """
+    tracker = PassTracker([station])
+    return tracker.update(np.asarray(ecefData, dtype=ECI_DTYPE))
+
+
+def gridStations():
+    """Creates a grid of stations set 10 degrees apart
+
+    Returns:
+        Array: A list of station latitudes, longitudes and masking angles.
     """
-    seenPrev = False
-    res = []
-    currStartTime = 0
-    θ = 0
-    α = 0
-    for step in ecefData:
-        vis = isVisible(step[0], station[0], station[1], station[2])
-        if vis and not seenPrev:
-            currStartTime = step[2]
-            seenPrev = True
-            Rp = latLon2ecef(station[0], station[1])
-            rsse, rssn, rssu = getS2TSVector(step[0], Rp)
-            θ, α = calculateAngle(rsse, rssn, rssu)
-        elif not vis and seenPrev:
-            res.append((station[0], station[1], currStartTime, step[2], step[2]-currStartTime, θ, α))
-            seenPrev = False
-    return res
+    stations = []
+    for lat in range(19):
+        for lon in range(37):
+            stations.append(((lat-9)*10, (lon-18)*10, 5)) # All stations have a masking angle of 5 degrees.
+    return stations
 
 
 def allPassTimes(ecefData):
@@ -176,26 +378,22 @@ def allPassTimes(ecefData):
     total time the satellite is visible from each station
     
     Args:
-        ecefData: Array: List of ecef positions
+        ecefData: Array: ECEF data, either a structured array or a list
+        of (position, velocity, time) tuples.
        
     Returns:
         Array: A list of station postions and the total time the 
         satellite is visible.
     """
-    stations = []
-    for lat in range(19):
-        for lon in range(37):
-            stations.append(((lat-9)*10, (lon-18)*10, 5)) # All stations have a masking angle of 5 degrees.
-    res = []
-    bar = progressbar.ProgressBar(redirect_stdout=True, max_value=len(stations)) # This takes a while so progress bar is reassuring
-    stationsProcessed = 0
-    for station in stations:
-        passTimes = getStationPassTimes(ecefData, station)
-        totalPassTime = 0
-        for step in passTimes:
-            totalPassTime += step[1] - step[0]
-        res.append((station[0], station[1], totalPassTime))
-        stationsProcessed += 1
-        bar.update(stationsProcessed)
-
-    return res
+    import progressbar  # only needed here, and slow to import
+
+    ecefData = np.asarray(ecefData, dtype=ECI_DTYPE)
+    tracker = PassTracker(gridStations())
+    blocks = range(0, len(ecefData), PASSBLOCK)
+    bar = progressbar.ProgressBar(redirect_stdout=True, max_value=len(blocks)) # This takes a while so progress bar is reassuring
+    passes = []
+    for i, start in enumerate(blocks):
+        passes += tracker.update(ecefData[start:start + PASSBLOCK])
+        bar.update(i + 1)
+
+    return tracker.totals(passes)
@@ -0,0 +1,319 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: visibilityBits
+    :platform: Unix
+    :synopsis: Stores station visibility as packed bits for coverage
+        queries
+
+.. moduleauthor:: Henry Mortimer <henry@morti.net>
+
+Visibility is held as one row of bits per station with one bit per epoch,
+packed with ``np.packbits`` into 64 bit words. A year of 10 second epochs
+takes 394 KB per station rather than the 3.2 MB of a boolean array.
+Unions, intersections and N-fold coverage across stations or satellites
+are bitwise operations on whole words, and coverage is a population count,
+so they never expand the bits again. Only finding gaps unpacks a single row.
+"""
+
+from .visibility import visibilityMatrix
+from ..converters.eci2ecef import ECI2ECEFArray
+import numpy as np
+
+WORDBITS = 64
+
+if hasattr(np, 'bitwise_count'):
+    def popcount(words):
+        """Counts the set bits in an array of words
+
+        Args:
+            words: Array (uint64): Packed bits.
+
+        Returns:
+            int: The number of bits set.
+        """
+        return int(np.bitwise_count(words).sum())
+else:  # numpy < 2.0
+    POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def popcount(words):
+        """Counts the set bits in an array of words
+
+        Args:
+            words: Array (uint64): Packed bits.
+
+        Returns:
+            int: The number of bits set.
+        """
+        return int(POPCOUNT[np.ascontiguousarray(words).view(np.uint8)].sum(dtype=np.int64))
+
+
+def packBits(flags):
+    """Packs booleans along the last axis into 64 bit words
+
+    Args:
+        flags: Array (bool): Shape (..., T).
+
+    Returns:
+        Array (uint64): Shape (..., ceil(T/64)). Bit t of a row is bit t % 64
+        of word t // 64, and the bits after T are zero.
+    """
+    flags = np.asarray(flags, dtype=bool)
+    words = -(-flags.shape[-1]//WORDBITS)
+    packed = np.packbits(flags, axis=-1, bitorder='little')
+    pad = [(0, 0)]*(flags.ndim - 1) + [(0, words*8 - packed.shape[-1])]
+    return np.ascontiguousarray(np.pad(packed, pad)).view('<u8')
+
+
+def unpackBits(words, count):
+    """Expands packed words back into booleans
+
+    Args:
+        words: Array (uint64): Shape (..., W) from packBits.
+
+        count: int: The number of epochs T.
+
+    Returns:
+        Array (bool): Shape (..., T).
+    """
+    bytes_ = np.ascontiguousarray(words).view(np.uint8)
+    return np.unpackbits(bytes_, axis=-1, count=count, bitorder='little').astype(bool)
+
+
+def runs(flags):
+    """Finds the runs of True in a row of booleans
+
+    Args:
+        flags: Array (bool): One row.
+
+    Returns:
+        Tuple: Arrays (int) of the first index of each run and the index
+        after its end.
+    """
+    edges = np.diff(np.concatenate([[0], flags.view(np.int8), [0]]))
+    return (np.flatnonzero(edges == 1), np.flatnonzero(edges == -1))
+
+
+def atLeast(rows, n):
+    """Finds the bits set in at least n of several rows, with a saturating
+    bit sliced counter so that only whole words are touched
+
+    Args:
+        rows: Iterable: Arrays of packed bits, all the same shape.
+
+        n: int: The number of rows, at least 1.
+
+    Returns:
+        Array (uint64): Packed bits.
+    """
+    ge = None
+    for row in rows:
+        if ge is None:
+            # ge[k] holds the bits set in at least k + 1 of the rows so far
+            ge = [np.zeros_like(row) for k in range(n)]
+        for k in range(n - 1, 0, -1):
+            ge[k] |= ge[k - 1] & row
+        ge[0] |= row
+    if ge is None:
+        raise ValueError('no rows to count')
+    return ge[n - 1]
+
+
+def combineSatellites(satellites, n=1):
+    """Combines the visibility of a constellation
+
+    Args:
+        satellites: Array (VisibilityBits): One per satellite, for the same
+        epochs and stations.
+
+        n: int: The number of satellites a station must see at once.
+
+    Returns:
+        VisibilityBits: A station's bit is set when it sees at least n of
+        the satellites.
+    """
+    first = satellites[0]
+    for other in satellites[1:]:
+        if not np.array_equal(first.times, other.times) or not np.array_equal(first.stations, other.stations):
+            raise ValueError('visibility must be for the same epochs and stations')
+    return VisibilityBits(atLeast([sat.words for sat in satellites], n), first.times, first.stations)
+
+
+class VisibilityBits(object):
+    """Packed visibility of one or more satellites from a set of stations.
+
+    Args:
+        words: Array (uint64): Shape (S, W), see packBits.
+
+        times: Array (float): The time of each epoch (seconds).
+
+        stations: Array (tuple): The station latitudes, longitudes and
+        masking angles (degrees).
+
+        source: string: Identifies the trajectories the bits were found
+        from, e.g. a digest, so that saved bits can be checked before reuse.
+    """
+
+    def __init__(self, words, times, stations, source=''):
+        self.words = np.asarray(words, dtype=np.uint64)
+        self.times = np.asarray(times, dtype=float)
+        self.stations = np.asarray(stations, dtype=float).reshape(-1, 3)
+        self.source = source
+
+    @classmethod
+    def fromBlocks(cls, blocks, stations):
+        """Builds the bits from ECI data arriving in blocks
+
+        Args:
+            blocks: Iterable: Blocks of ECI data, e.g. from iterECIData.
+
+            stations: Array (tuple): The stations.
+
+        Returns:
+            VisibilityBits.
+        """
+        stations = np.asarray(stations, dtype=float).reshape(-1, 3)
+        parts, times = [], []
+        carry = np.zeros((len(stations), 0), dtype=bool)
+        for block in blocks:
+            vis = visibilityMatrix(ECI2ECEFArray(block)['R'], stations).T
+            vis = np.concatenate([carry, vis], axis=1)
+            # pack whole words and keep the rest for the next block
+            whole = vis.shape[1] - vis.shape[1] % WORDBITS
+            if whole:
+                parts.append(packBits(vis[:, :whole]))
+            carry = vis[:, whole:]
+            times.append(np.asarray(block['time'], dtype=float))
+        if carry.shape[1]:
+            parts.append(packBits(carry))
+        words = np.concatenate(parts, axis=1) if parts else np.zeros((len(stations), 0), np.uint64)
+        return cls(words, np.concatenate(times) if times else np.empty(0), stations)
+
+    def __len__(self):
+        return len(self.times)
+
+    def union(self, other):
+        """Combines two satellites, a station sees the pair when it sees
+        either
+
+        Args:
+            other: VisibilityBits: For the same epochs and stations.
+
+        Returns:
+            VisibilityBits.
+        """
+        return combineSatellites([self, other], 1)
+
+    def intersection(self, other):
+        """Combines two satellites, a station sees the pair when it sees
+        both
+
+        Args:
+            other: VisibilityBits: For the same epochs and stations.
+
+        Returns:
+            VisibilityBits.
+        """
+        return combineSatellites([self, other], 2)
+
+    def anyStation(self):
+        """Gets the epochs when at least one station sees the satellite
+
+        Returns:
+            Array (uint64): Packed bits.
+        """
+        return np.bitwise_or.reduce(self.words, axis=0)
+
+    def allStations(self):
+        """Gets the epochs when every station sees the satellite
+
+        Returns:
+            Array (uint64): Packed bits.
+        """
+        return np.bitwise_and.reduce(self.words, axis=0) & self.validMask()
+
+    def atLeast(self, n):
+        """Gets the epochs when at least n stations see the satellite
+
+        Args:
+            n: int: The fold of coverage.
+
+        Returns:
+            Array (uint64): Packed bits.
+        """
+        if n <= 0:
+            return self.validMask()
+        return atLeast(self.words, n)
+
+    def validMask(self):
+        """Gets a row with a bit set for every epoch
+
+        Returns:
+            Array (uint64): Packed bits.
+        """
+        return packBits(np.ones(len(self), dtype=bool))
+
+    def coverage(self, words=None):
+        """Gets the fraction of epochs that are covered
+
+        Args:
+            words: Array (uint64): Packed bits, by default anyStation.
+
+        Returns:
+            float: Between 0 and 1.
+        """
+        if words is None:
+            words = self.anyStation()
+        if len(self) == 0:
+            return 0.0
+        return popcount(words)/len(self)
+
+    def stationCoverage(self):
+        """Gets the fraction of epochs each station sees the satellite
+
+        Returns:
+            Array (float): One value per station.
+        """
+        if len(self) == 0:
+            return np.zeros(len(self.stations))
+        return np.array([popcount(row) for row in self.words])/len(self)
+
+    def gaps(self, words=None):
+        """Finds the spans with no coverage
+
+        Args:
+            words: Array (uint64): Packed bits, by default anyStation.
+
+        Returns:
+            Tuple: Arrays (float) of the time of the first uncovered epoch
+            of each gap and of the covered epoch that ends it, or of the
+            last epoch for a gap that runs to the end.
+        """
+        if words is None:
+            words = self.anyStation()
+        starts, ends = runs(~unpackBits(words, len(self)))
+        return (self.times[starts], self.times[np.minimum(ends, len(self) - 1)])
+
+    def save(self, fileobj):
+        """Saves the bits
+
+        Args:
+            fileobj: A binary file handle or path.
+        """
+        np.savez_compressed(fileobj, words=self.words, times=self.times, stations=self.stations,
+                            source=np.array(self.source))
+
+    @classmethod
+    def load(cls, fileobj):
+        """Loads bits saved by save
+
+        Args:
+            fileobj: A binary file handle or path.
+
+        Returns:
+            VisibilityBits.
+        """
+        with np.load(fileobj) as data:
+            source = str(data['source']) if 'source' in data.files else ''
+            return cls(data['words'], data['times'], data['stations'], source)
@@ -0,0 +1,114 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: batchPlot
+    :platform: Unix
+    :synopsis: Renders many plots to image files in parallel
+
+.. moduleauthor:: Henry Mortimer <henry@morti.net>
+
+A batch is a csv file with one job per line::
+
+    graph,input file,output image
+
+Jobs are shared between a pool of worker processes that draw with the Agg
+backend, so no display is needed. Map backgrounds are rendered to the cache
+before the pool starts and each worker loads a background only once.
+"""
+
+import csv
+import multiprocessing
+import time
+
+MAPGRAPHS = ('grndtrck', 'passTimes', 'animate')
+
+
+def readJobs(jobfile):
+    """Reads a batch of plot jobs
+
+    Args:
+        jobfile: A file handle. Blank lines and lines starting with # are
+        skipped.
+
+    Returns:
+        Array: (graph, input, output) for each job.
+    """
+    jobs = []
+    for row in csv.reader(jobfile):
+        if not row or not row[0].strip() or row[0].lstrip().startswith('#'):
+            continue
+        if len(row) != 3:
+            raise ValueError('plot jobs need a graph, input and output: {0}'.format(','.join(row)))
+        jobs.append(tuple(item.strip() for item in row))
+    return jobs
+
+
+def initWorker():
+    """Selects the Agg backend before pyplot is imported"""
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def renderJob(job, options):
+    """Renders a single plot to a file
+
+    Args:
+        job: Tuple: The graph, input path and output path.
+
+        options: Dict: Keyword arguments for plot.renderPlot.
+
+    Returns:
+        Tuple: The output path, the time taken (seconds) and an error
+        message or None.
+    """
+    from .plot import renderPlot
+
+    graph, infile, outfile = job
+    start = time.time()
+    try:
+        with open(infile) as f:
+            renderPlot(graph, f, outfile, **options)
+    except Exception as e:
+        return (outfile, time.time() - start, '{0}: {1}'.format(type(e).__name__, e))
+    return (outfile, time.time() - start, None)
+
+
+def renderBatch(jobs, processes=None, **options):
+    """Renders plot jobs across a pool of processes
+
+    Args:
+        jobs: Array: (graph, input, output) for each job.
+
+        processes: int: The number of workers. Defaults to the number of
+        cpus. With 1 the jobs are rendered in this process, with whichever
+        backend it already uses.
+
+        options: Keyword arguments for plot.renderPlot.
+
+    Returns:
+        Generator: (output, seconds, error) for each job as it finishes.
+    """
+    from .plot import loadBackground, mapParams
+
+    if any(job[0] in MAPGRAPHS for job in jobs):
+        # render the background once here rather than in every worker
+        loadBackground(mapParams(options.get('projection', 'cyl')),
+                       options.get('resolution', 'c'))
+
+    if processes == 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield renderJob(job, options)
+        return
+
+    pool = multiprocessing.Pool(processes, initializer=initWorker)
+    try:
+        for result in pool.imap_unordered(_renderJob, [(job, options) for job in jobs]):
+            yield result
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _renderJob(args):
+    return renderJob(*args)
@@ -12,6 +12,7 @@
 
 from ..utils import normalisedAtan2
 from ..data import EARTHRADIUS
+import numpy as np
 import math
 
 
@@ -59,3 +60,21 @@ def ecef2latlong(R):
     lon, lat = calculateLatLon(R)
     height = calulateHeight(R)
     return (lat, lon, height)
+
+
+def ecef2latlongArray(R):
+    """Converts many ECEF points to latitude, longitude and height at once.
+
+    Args:
+        R: Array (float): Positions in ECEF space with shape (N, 3) (km).
+
+    Returns:
+        Tuple: Arrays of the latitudes and longitudes (degrees) and heights
+        (km).
+    """
+    R = np.asarray(R, dtype=float)
+    horizontal = np.hypot(R[:, 0], R[:, 1])
+    lat = np.degrees(np.arctan(R[:, 2]/horizontal))
+    lon = np.degrees(np.arctan2(R[:, 1], R[:, 0]))
+    height = np.sqrt(horizontal**2 + R[:, 2]**2) - EARTHRADIUS
+    return (lat, lon, height)
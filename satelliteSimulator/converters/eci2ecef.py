@@ -11,6 +11,7 @@
 """
 
 from ..data import BASETIME, EARTHRR
+import numpy as np
 import math
 
 
@@ -90,3 +91,32 @@ def ECI2ECEF(R, V, time):
     vel = calculateECEFVel(R, V, Θ)
 
     return (pos, vel, time)
+
+
+def ECI2ECEFArray(data):
+    """Converts many position and velocity vectors from ECI to ECEF at once.
+
+    Args:
+        data: Array: ECI data as returned by readECIData.
+
+    Returns:
+        Array: A structured array of the same dtype holding the ECEF position
+        and velocity vectors and the time.
+    """
+    time = data['time']
+    R = data['R']
+    V = data['V']
+    Θ = np.radians(280.4606 + 360.9856473662*((time - BASETIME)/(60*60*24)))
+    cos = np.cos(Θ)
+    sin = np.sin(Θ)
+
+    result = np.empty(len(data), dtype=data.dtype)
+    result['time'] = time
+    result['R'][:, 0] = cos*R[:, 0] + sin*R[:, 1]
+    result['R'][:, 1] = -sin*R[:, 0] + cos*R[:, 1]
+    result['R'][:, 2] = R[:, 2]
+    result['V'][:, 0] = -EARTHRR*(sin*R[:, 0] - cos*R[:, 1]) + cos*V[:, 0] + sin*V[:, 1]
+    result['V'][:, 1] = -EARTHRR*(cos*R[:, 0] + sin*R[:, 1]) - sin*V[:, 0] + cos*V[:, 1]
+    result['V'][:, 2] = V[:, 2]
+
+    return result
@@ -69,3 +69,6 @@ EARTHRR = math.pi*2 / 86400  # rotation rate of earth in radians/s
 EARTHRADIUS = 6367  # km
 C20 = -0.4841653711736e-3
 AEGMA96 = 6378.1363  # km
+AU = 149597870.7  # km
+SUNRADIUS = 696000  # km
+SPEEDOFLIGHT = 299792.458  # km/s
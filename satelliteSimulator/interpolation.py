@@ -0,0 +1,51 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: interpolation
+    :platform: Unix
+    :synopsis: Interpolates satellite states between samples
+
+.. moduleauthor:: Henry Mortimer <henry@morti.net>
+
+"""
+
+import numpy as np
+
+
+def hermite(t0, R0, V0, t1, R1, V1, t):
+    """Interpolates position and velocity with a cubic hermite spline.
+
+    The spline matches both the positions and the velocities at the two
+    samples so it is far more accurate than linear interpolation for the
+    10 second steps used by the propogators. All arguments can be arrays
+    so that many queries are evaluated at once.
+
+    Args:
+        t0, t1: Array (float): The times of the samples either side of t
+        (seconds).
+
+        R0, R1: Array (float): The position vectors at t0 and t1 (km), with
+        shape (N, 3).
+
+        V0, V1: Array (float): The velocity vectors at t0 and t1 (km/s), with
+        shape (N, 3).
+
+        t: Array (float): The times to interpolate at (seconds).
+
+    Returns:
+        Tuple: The interpolated position and velocity vectors.
+    """
+    h = np.asarray(t1, dtype=float) - t0
+    s = (np.asarray(t, dtype=float) - t0)/h
+    h = h[..., None]
+    s = s[..., None]
+    s2 = s*s
+    s3 = s2*s
+
+    R = (2*s3 - 3*s2 + 1)*R0 + (s3 - 2*s2 + s)*h*V0\
+        + (3*s2 - 2*s3)*R1 + (s3 - s2)*h*V1
+    V = (6*s2 - 6*s)/h*R0 + (3*s2 - 4*s + 1)*V0\
+        + (6*s - 6*s2)/h*R1 + (3*s2 - 2*s)*V1
+
+    return (R, V)
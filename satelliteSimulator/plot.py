@@ -8,117 +8,642 @@
 
 .. moduleauthor:: Henry Mortimer <henry@morti.net>
 
+Drawing the coastlines, continents and grid of a map takes far longer than
+plotting data over it, so each map background is rendered once per
+projection and resolution and cached as a PNG next to a JSON file holding
+the projection parameters. Later plots rebuild the projection without any
+boundary data and show the cached image underneath the data.
 """
 
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
+from matplotlib import animation
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import matplotlib
 from mpl_toolkits.basemap import Basemap
+from PIL import Image
+from .utils import getCacheDir, readGrndTrckData, readData, GRNDTRCK_DTYPE
 import numpy as np
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+
+MAPCACHEVERSION = 1
+MAPWIDTH = 2048  # pixels
+MAPINCHES = 5.0  # the width of the map in a default figure, so lines keep their weight
+LAND = '#209101'
+WATER = '#0A369D'
+GLOBE = dict(llcrnrlat=-90, urcrnrlat=90, llcrnrlon=-180, urcrnrlon=180)
+RECTANGULAR = ('cyl', 'merc', 'mill', 'gall', 'cea')
+PSEUDOCYLINDRICAL = ('robin', 'moll', 'hammer', 'kav7', 'eck4')
+PROJECTIONS = RECTANGULAR + PSEUDOCYLINDRICAL
+RESOLUTIONS = ('c', 'l', 'i', 'h', 'f')
+MODES = ('auto', 'points', 'density')
+DENSITYPOINTS = 50000  # auto mode bins anything larger than this
+MINALPHA = 0.35  # so a bin holding a single point is still visible
+GRAPHS = ('grndtrck', 'diffs', 'passTimes', 'eci', 'animate')
+
+# backgrounds already loaded by this process, so batches of plots only read
+# each cached image once
+BACKGROUNDS = {}
+
+
+def showPlot(outfile=None):
+    """Shows the current figure, or saves it when a file is given
+
+    Args:
+        outfile: string: The image path. The format is taken from the
+        extension.
+    """
+    if outfile is None:
+        plt.show()
+    else:
+        plt.savefig(outfile)
+        plt.close()
 
 
-def plotECI(data):
+def plotECI(data, outfile=None):
     """Plots ECI co-ordinates in 3d
 
     Args:
         data: Array: A list of XYZ coordinates (km)
 
+        outfile: string: Save the figure here instead of showing it.
+
     Returns
         Nothing.
     """
-    x = [row[0] for row in data]
-    y = [row[1] for row in data]
-    z = [row[2] for row in data]
+    data = np.asarray(data, dtype=float)
 
     fig = plt.figure()
     ax = fig.add_subplot(111, projection='3d')
 
-    ax.plot(x, y, z, c='r', marker='o')
+    ax.plot(data[:, 0], data[:, 1], data[:, 2], c='r', marker='o')
+
+    showPlot(outfile)
 
-    plt.show()
 
+def mapParams(projection):
+    """Gets the Basemap arguments for a whole earth projection
+
+    Args:
+        projection: string: One of PROJECTIONS.
+
+    Returns:
+        Dict: Keyword arguments for Basemap.
+    """
+    if projection not in PROJECTIONS:
+        raise ValueError('unsupported projection {0!r}'.format(projection))
+    params = {'projection': projection}
+    if projection in RECTANGULAR:
+        params.update(GLOBE)
+        if projection == 'merc':
+            # mercator cannot reach the poles
+            params.update(llcrnrlat=-80, urcrnrlat=80)
+    else:
+        params['lon_0'] = 0
+    return params
+
+
+def drawBackground(m):
+    """Draws the coastlines, continents and grid of a map
 
-def initMap():
-    m = Basemap(projection='cyl', llcrnrlat=-90, urcrnrlat=90,
-                llcrnrlon=-180, urcrnrlon=180)
+    Args:
+        m: A Basemap projection object.
+    """
     m.drawcoastlines()
-    m.fillcontinents(color='#209101', lake_color='#0A369D')
+    m.fillcontinents(color=LAND, lake_color=WATER)
 
     # draw parallels and meridians.
     m.drawparallels(np.arange(-90., 91., 30.))
     m.drawmeridians(np.arange(-180., 181., 60.))
-    m.drawmapboundary(fill_color='#0A369D')
+    m.drawmapboundary(fill_color=WATER)
+
+
+def mapCachePaths(params, resolution):
+    """Gets the files a map background is cached in
+
+    Args:
+        params: Dict: The Basemap arguments.
+
+        resolution: string: The Basemap boundary resolution.
 
+    Returns:
+        Tuple: The image and metadata paths.
+    """
+    key = json.dumps([MAPCACHEVERSION, params, resolution, MAPWIDTH, LAND, WATER],
+                     sort_keys=True)
+    name = '{0}-{1}-{2}'.format(params['projection'], resolution,
+                                hashlib.sha1(key.encode('utf-8')).hexdigest()[:12])
+    directory = getCacheDir('maps')
+    return (os.path.join(directory, name + '.png'),
+            os.path.join(directory, name + '.json'))
+
+
+def renderBackground(params, resolution, imagePath, metaPath):
+    """Renders a map background to the cache
+
+    Args:
+        params: Dict: The Basemap arguments.
+
+        resolution: string: The Basemap boundary resolution.
+
+        imagePath, metaPath: string: Where to save the image and metadata.
+    """
+    m = Basemap(resolution=resolution, **params)
+    extent = [m.llcrnrx, m.urcrnrx, m.llcrnry, m.urcrnry]
+    height = int(round(MAPWIDTH*(extent[3] - extent[2])/(extent[1] - extent[0])))
+
+    dpi = MAPWIDTH/MAPINCHES
+    fig = plt.figure(figsize=(MAPINCHES, height/dpi), dpi=dpi)
+    fig.patch.set_alpha(0)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.set_xticks([])
+    ax.set_yticks([])
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+    if params['projection'] not in RECTANGULAR:
+        # leave the corners outside of the globe see through
+        ax.patch.set_alpha(0)
+    m.ax = ax
+    drawBackground(m)
+    ax.set_xlim(extent[0], extent[1])
+    ax.set_ylim(extent[2], extent[3])
+
+    # write then rename so a half written file is never read back, even
+    # when several processes render the same map at once
+    tmp = '.{0}.tmp'.format(os.getpid())
+    fig.savefig(imagePath + tmp, dpi=dpi, facecolor='none', format='png')
+    plt.close(fig)
+    os.replace(imagePath + tmp, imagePath)
+
+    with open(metaPath + tmp, 'w') as f:
+        json.dump({'version': MAPCACHEVERSION, 'params': params,
+                   'resolution': resolution, 'extent': extent,
+                   'size': [MAPWIDTH, height]}, f)
+    os.replace(metaPath + tmp, metaPath)
+
+
+def initMap(projection='cyl', resolution='c', cache=True):
+    """Sets up a map of earth on the current axes
+
+    Args:
+        projection: string: One of PROJECTIONS.
+
+        resolution: string: The Basemap boundary resolution, one of
+        RESOLUTIONS.
+
+        cache: bool: Use the cached background, rendering it first if
+        needed. When False the background is drawn from scratch.
+
+    Returns:
+        A Basemap projection object.
+    """
+    params = mapParams(projection)
+    if not cache:
+        m = Basemap(resolution=resolution, **params)
+        drawBackground(m)
+        return m
+
+    m, image = loadBackground(params, resolution)
+    m.imshow(image, origin='upper', interpolation='bilinear')
     return m
 
 
-def plotGroundTracks(data):
-    """Plots ground tracks on a 2d projection of earth.
+def loadBackground(params, resolution):
+    """Gets a cached map background, rendering it first if needed
 
     Args:
-        data: Array: A list of latitudes and longitude in degrees
+        params: Dict: The Basemap arguments.
 
-        colour: string: A matplotlib colour code for the colour of the
-        points plotted
+        resolution: string: The Basemap boundary resolution.
 
-        m: A Basemap projection object.
+    Returns:
+        Tuple: A Basemap projection object without boundary data and the
+        background image.
+    """
+    imagePath, metaPath = mapCachePaths(params, resolution)
+    if imagePath in BACKGROUNDS:
+        return BACKGROUNDS[imagePath]
+
+    if not (os.path.exists(imagePath) and os.path.exists(metaPath)):
+        renderBackground(params, resolution, imagePath, metaPath)
+    with open(metaPath) as f:
+        meta = json.load(f)
+
+    # no boundary data is needed as it is already in the image
+    m = Basemap(resolution=None, **meta['params'])
+    BACKGROUNDS[imagePath] = (m, plt.imread(imagePath))
+    return BACKGROUNDS[imagePath]
+
+
+def chooseMode(mode, npoints):
+    """Picks how to render a scatter plot
+
+    Args:
+        mode: string: One of MODES.
+
+        npoints: int: The number of points to draw.
 
     Returns:
-        None.
+        string: 'points' or 'density'.
+    """
+    if mode not in MODES:
+        raise ValueError('unsupported mode {0!r}'.format(mode))
+    if npoints == 0:
+        return 'points'
+    if mode == 'auto':
+        return 'density' if npoints > DENSITYPOINTS else 'points'
+    return mode
+
+
+def axesPixels(ax):
+    """Gets the size of an axes on screen
+
+    Args:
+        ax: A matplotlib axes.
+
+    Returns:
+        Tuple: The width and height in pixels.
     """
-    m = initMap()
+    bbox = ax.get_window_extent()
+    return (max(int(round(bbox.width)), 1), max(int(round(bbox.height)), 1))
 
-    vlats = [x[0] for x in data if x[3]]
-    vlons = [x[1] for x in data if x[3]]
-    hlats = [x[0] for x in data if not x[3]]
-    hlons = [x[1] for x in data if not x[3]]
 
-    vx, vy = m(vlons, vlats)
-    hx, hy = m(hlons, hlats)
+def binPoints(x, y, extent, shape):
+    """Counts the points falling in each cell of a regular grid.
+
+    Each point is assigned to its cell directly, so the cost is linear in
+    the number of points. Points outside of the extent are dropped.
+
+    Args:
+        x, y: Array (float): The point coordinates.
+
+        extent: Tuple: The left, right, bottom and top of the grid.
+
+        shape: Tuple: The number of columns and rows.
+
+    Returns:
+        Array (int): The counts with one row per grid row, bottom first.
+    """
+    width, height = shape
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    spanX = (extent[1] - extent[0]) or 1.0
+    spanY = (extent[3] - extent[2]) or 1.0
+    col = np.floor((x - extent[0])*(width/spanX)).astype(np.int64)
+    row = np.floor((y - extent[2])*(height/spanY)).astype(np.int64)
+    # points exactly on the right or top edge belong to the last cell
+    col[x == extent[1]] = width - 1
+    row[y == extent[3]] = height - 1
+    inside = (col >= 0) & (col < width) & (row >= 0) & (row < height)
+    counts = np.bincount(row[inside]*width + col[inside], minlength=width*height)
+    return counts.reshape(height, width)
+
+
+def densityImage(counts, colour):
+    """Colours a grid of counts. Empty cells are transparent and the opacity
+    of the rest grows with the log of their count.
+
+    Args:
+        counts: Array (int): Counts from binPoints.
+
+        colour: A matplotlib colour.
+
+    Returns:
+        Array (float): An RGBA image.
+    """
+    image = np.zeros(counts.shape + (4,))
+    image[..., :3] = matplotlib.colors.to_rgb(colour)
+    peak = counts.max() if counts.size else 0
+    if peak:
+        level = np.log1p(counts)/np.log1p(peak)
+        image[..., 3] = np.where(counts > 0, MINALPHA + (1 - MINALPHA)*level, 0)
+    return image
+
+
+def drawDensity(ax, layers, extent, zorder=5):
+    """Draws sets of points as one image per set, binned at screen resolution
+
+    Args:
+        ax: A matplotlib axes.
 
-    m.plot(vx, vy, marker='o', linestyle='None', markersize=0.5,  color='y')
-    m.plot(hx, hy, marker='o', linestyle='None', markersize=0.5,  color='k')
+        layers: Array: (x, y, colour) for each set of points, bottom first.
+
+        extent: Tuple: The left, right, bottom and top of the plotted area.
+
+        zorder: int: The matplotlib zorder of the images.
+    """
+    shape = axesPixels(ax)
+    for x, y, colour in layers:
+        image = densityImage(binPoints(x, y, extent, shape), colour)
+        ax.imshow(image, extent=extent, origin='lower', interpolation='nearest',
+                  aspect=ax.get_aspect(), zorder=zorder)
+
+
+def plotGroundTracks(data, projection='cyl', resolution='c', mode='auto', outfile=None):
+    """Plots ground tracks on a 2d projection of earth.
+
+    Args:
+        data: Array: A list of latitudes and longitude in degrees
+
+        projection: string: A Basemap projection name.
+
+        resolution: string: The Basemap boundary resolution.
+
+        mode: string: 'points' draws a marker per sample and 'density' bins
+        the samples into an image at screen resolution. 'auto' picks density
+        for large data sets.
+
+        outfile: string: Save the figure here instead of showing it.
+
+    Returns:
+        None.
+    """
+    m = initMap(projection, resolution)
+
+    data = np.asarray(data, dtype=GRNDTRCK_DTYPE)
+    visible = data['visible']
+    x, y = m(data['lon'], data['lat'])
+    x = np.asarray(x)
+    y = np.asarray(y)
+
+    if chooseMode(mode, len(data)) == 'density':
+        extent = (m.llcrnrx, m.urcrnrx, m.llcrnry, m.urcrnry)
+        drawDensity(plt.gca(), [(x[~visible], y[~visible], 'k'),
+                                (x[visible], y[visible], 'y')], extent)
+    else:
+        m.plot(x[visible], y[visible], marker='o', linestyle='None', markersize=0.5,  color='y')
+        m.plot(x[~visible], y[~visible], marker='o', linestyle='None', markersize=0.5,  color='k')
     plt.title('Ground Tracks')
-    plt.show()
+    showPlot(outfile)
 
 
-def plotDifferences(data):
+def plotDifferences(data, mode='auto', outfile=None):
     """Plots the differences between two orbits
     
     Args:
         data:Array: A list of tuples contianing time then differences
         in 3 directions
+
+        mode: string: 'points', 'density' or 'auto' as for plotGroundTracks.
+
+        outfile: string: Save the figure here instead of showing it.
         
     Returns:
         None
     """
-    plt.scatter([x[0] for x in data], [x[1] for x in data], marker='.', color='k', s=1)
-    plt.scatter([x[0] for x in data], [x[2] for x in data], marker='.', color='b', s=1)
-    plt.scatter([x[0] for x in data], [x[3] for x in data], marker='.', color='r', s=1)
+    data = np.asarray(data, dtype=float).reshape(-1, 4)
+    colours = ('k', 'b', 'r')
+
+    if chooseMode(mode, 3*len(data)) == 'density':
+        ax = plt.gca()
+        values = data[:, 1:]
+        extent = (data[:, 0].min(), data[:, 0].max(), values.min(), values.max())
+        ax.set_xlim(extent[0], extent[1])
+        ax.set_ylim(extent[2], extent[3])
+        drawDensity(ax, [(data[:, 0], data[:, i + 1], c) for i, c in enumerate(colours)], extent)
+    else:
+        for i, c in enumerate(colours):
+            plt.scatter(data[:, 0], data[:, i + 1], marker='.', color=c, s=1)
 
     plt.title('Differences')
-    plt.show()
+    showPlot(outfile)
 
 
-def plotPassData(data):
+def plotPassData(data, projection='cyl', resolution='c', outfile=None):
     """Plots data about the total pass time for stations on a
     projection of Earth.
     
     Args:
         data: Array: A list of tuples containing lat lon and pass time.
+
+        projection: string: A Basemap projection name.
+
+        resolution: string: The Basemap boundary resolution.
+
+        outfile: string: Save the figure here instead of showing it.
         
     Returns:
         None.
     """
-    m = initMap()
+    m = initMap(projection, resolution)
 
     times = [x[2] for x in data]
-    x = [i[0] for i in data]
-    y = [i[1] for i in data]
+    lats = [i[0] for i in data]
+    lons = [i[1] for i in data]
 
-    lat, lon = m(x, y)
+    x, y = m(lons, lats)
 
-    m.scatter(lon, lat, marker='o', c=times, zorder=10, cmap='hot')
+    m.scatter(x, y, marker='o', c=times, zorder=10, cmap='hot')
     plt.colorbar()
 
-    plt.show()
+    showPlot(outfile)
+
+
+def decimation(timestep, speed, fps):
+    """Gets how many samples to advance per animation frame
+
+    Args:
+        timestep: float: The time between samples (seconds).
+
+        speed: float: Simulated seconds played per real second.
+
+        fps: float: Frames per second.
+
+    Returns:
+        int: The sample stride, at least 1.
+    """
+    return max(int(round(speed/(fps*timestep))), 1)
+
+
+def animateGroundTracks(data, timestep=10, speed=3600, fps=25, trail=3600,
+                        projection='cyl', resolution='c', outfile=None):
+    """Replays a ground track on a 2d projection of earth.
+
+    The sub satellite point is drawn yellow while visible from a station
+    and black otherwise, followed by a trail that fades out. Samples are
+    decimated to one per frame so long tracks play at a steady frame rate.
+    Only the moving artists are redrawn each frame, over the cached map.
+
+    Args:
+        data: Array: Ground track data as returned by readGrndTrckData, one
+        row per timestep.
+
+        timestep: float: The time between samples (seconds).
+
+        speed: float: Simulated seconds played per real second.
+
+        fps: float: Frames per second.
+
+        trail: float: The length of the trail (seconds).
+
+        projection: string: A Basemap projection name.
+
+        resolution: string: The Basemap boundary resolution.
+
+        outfile: string: Save the animation here instead of showing it. GIFs
+        are written with Pillow and other formats with a local ffmpeg. Saved
+        frames are blitted too, so only the moving artists are redrawn.
+
+    Returns:
+        The matplotlib animation when shown, otherwise None.
+    """
+    fig = plt.figure()
+    m = initMap(projection, resolution)
+    ax = plt.gca()
+    plt.title('Ground Tracks')
+
+    stride = decimation(timestep, speed, fps)
+    data = np.asarray(data, dtype=GRNDTRCK_DTYPE)[::stride]
+    x, y = m(data['lon'], data['lat'])
+    points = np.column_stack([np.asarray(x, dtype=float), np.asarray(y, dtype=float)])
+    colours = np.where(data['visible'][:, None],
+                       matplotlib.colors.to_rgba_array('y'),
+                       matplotlib.colors.to_rgba_array('k'))
+    trailLength = max(int(trail/(timestep*stride)), 1)
+    fade = np.linspace(0.05, 1, trailLength)
+
+    trailArtist = ax.scatter([], [], s=4, zorder=9, animated=True)
+    point, = ax.plot([], [], 'o', markersize=8, markeredgecolor='w', zorder=10, animated=True)
+    label = ax.text(0.01, 0.02, '', transform=ax.transAxes, color='w', zorder=11, animated=True)
+    artists = (trailArtist, point, label)
+
+    def init():
+        trailArtist.set_offsets(np.empty((0, 2)))
+        point.set_data([], [])
+        label.set_text('')
+        return artists
+
+    def update(i):
+        lo = max(i - trailLength + 1, 0)
+        trailColours = colours[lo:i + 1].copy()
+        trailColours[:, 3] = fade[trailLength - len(trailColours):]
+        trailArtist.set_offsets(points[lo:i + 1])
+        trailArtist.set_facecolor(trailColours)
+        trailArtist.set_edgecolor('none')
+        point.set_data(points[i:i + 1, 0], points[i:i + 1, 1])
+        point.set_markerfacecolor(colours[i])
+        seconds = int(i*stride*timestep)
+        label.set_text('T+{0:02d}:{1:02d}:{2:02d} {3}'.format(
+            seconds//3600, seconds//60 % 60, seconds % 60,
+            'visible' if data['visible'][i] else 'hidden'))
+        return artists
+
+    if outfile is None:
+        anim = animation.FuncAnimation(fig, update, frames=len(data), init_func=init,
+                                       interval=1000./fps, blit=True)
+        plt.show()
+        return anim
+
+    init()
+    saveFrames(blittedFrames(fig, update, len(data)), outfile, fps)
+    plt.close(fig)
+
+
+def blittedFrames(fig, update, nframes):
+    """Renders animation frames by blitting.
+
+    The static parts of the figure are drawn once. Each frame restores them
+    and draws only the artists returned by update, which must be animated.
+
+    Args:
+        fig: A matplotlib figure.
+
+        update: function: Called with the frame number and returns the
+        artists that changed.
+
+        nframes: int: The number of frames.
+
+    Returns:
+        Generator: An RGBA image for each frame.
+    """
+    canvas = FigureCanvasAgg(fig)
+    canvas.draw()  # animated artists are left out
+    background = canvas.copy_from_bbox(fig.bbox)
+    for i in range(nframes):
+        canvas.restore_region(background)
+        for artist in update(i):
+            fig.draw_artist(artist)
+        yield np.array(canvas.buffer_rgba())
+
+
+def saveFrames(frames, outfile, fps):
+    """Encodes animation frames with local encoders
+
+    Args:
+        frames: Iterable: RGBA images of the same size.
+
+        outfile: string: GIFs are written with Pillow and other formats by
+        piping raw frames to ffmpeg.
+
+        fps: float: Frames per second.
+    """
+    if outfile.lower().endswith('.gif'):
+        # Pillow pulls the appended frames one at a time, so the RGBA and
+        # RGB copies are not all kept, but it still holds every palettised
+        # frame until it writes the file. Long animations are smaller as
+        # video, or with a higher speed so fewer frames are drawn
+        images = (Image.fromarray(frame).convert('RGB') for frame in frames)
+        first = next(images, None)
+        if first is not None:
+            first.save(outfile, save_all=True, append_images=images,
+                       duration=int(round(1000./fps)), loop=0)
+        return
+
+    ffmpeg = shutil.which(matplotlib.rcParams['animation.ffmpeg_path'])
+    if ffmpeg is None:
+        raise ValueError('ffmpeg is needed to write {0}, save a .gif instead'.format(outfile))
+    proc = None
+    try:
+        for frame in frames:
+            if proc is None:
+                height, width = frame.shape[:2]
+                proc = subprocess.Popen([ffmpeg, '-loglevel', 'error', '-y',
+                                         '-f', 'rawvideo', '-pix_fmt', 'rgba',
+                                         '-s', '{0}x{1}'.format(width, height),
+                                         '-r', str(fps), '-i', '-',
+                                         '-pix_fmt', 'yuv420p', outfile],
+                                        stdin=subprocess.PIPE)
+            proc.stdin.write(frame.tobytes())
+    finally:
+        if proc is not None:
+            proc.stdin.close()
+            if proc.wait() != 0:
+                raise RuntimeError('ffmpeg failed to write {0}'.format(outfile))
+
+
+def renderPlot(graph, infile, outfile=None, projection='cyl', resolution='c', mode='auto',
+               animationOptions=None):
+    """Reads a data file and plots it
+
+    Args:
+        graph: string: One of GRAPHS.
+
+        infile: A file handle with data written by the matching subcommand.
+
+        outfile: string: Save the figure here instead of showing it.
+
+        projection, resolution: string: The map to draw ground tracks and
+        pass times on.
+
+        mode: string: How to draw ground tracks and differences.
+
+        animationOptions: Dict: Keyword arguments for animateGroundTracks.
+    """
+    if graph == 'grndtrck':
+        plotGroundTracks(readGrndTrckData(infile), projection, resolution, mode, outfile)
+    elif graph == 'diffs':
+        plotDifferences(readData(infile), mode, outfile)
+    elif graph == 'passTimes':
+        plotPassData(readData(infile), projection, resolution, outfile)
+    elif graph == 'eci':
+        plotECI(readData(infile), outfile)
+    elif graph == 'animate':
+        animateGroundTracks(readGrndTrckData(infile), projection=projection,
+                            resolution=resolution, outfile=outfile,
+                            **(animationOptions or {}))
+    else:
+        raise ValueError('unknown graph {0!r}'.format(graph))
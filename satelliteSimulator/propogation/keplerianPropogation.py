@@ -39,14 +39,37 @@ def propogateOrbit(R, V, δt, steps, baseTime):
         Array: A list of tuples containing the R and V ECI vectors (km)
         and the time (seconds).
     """
+    return list(propogateOrbitSteps(R, V, δt, steps, baseTime))
 
-    results = [(R, V, baseTime)]
+
+def propogateOrbitSteps(R, V, δt, steps, baseTime, start=0):
+    """Propogates an orbit using the keplerian propogation algorithm,
+    yielding each step as soon as it is calculated.
+
+    Args:
+        R: Array (float): The position vector at time basetime.(km)
+
+        V: Array (float): The velocity vector at time basetime.(km)
+
+        δt: int: The time step in seconds.
+
+        steps: int: The number of steps to calculate.
+
+        baseTime: float: The start time in seconds.
+
+        start: int: The number of steps R and V are after baseTime, to
+        continue an earlier run. See propogation.resume.
+
+    Returns:
+        Generator: Tuples containing the R and V ECI vectors (km)
+        and the time (seconds), starting with the initial state.
+    """
+    yield (R, V, baseTime + δt*start)
     newR = R
     newV = V
-    for step in range(steps):
+    for step in range(start, start + steps):
         newR, newV = calculateOrbitStep(newR, newV, δt)
-        results.append((newR, newV, baseTime + δt*(step+1)))
-    return results
+        yield (newR, newV, baseTime + δt*(step+1))
 
 
 def calculateOrbitStep(R, V, δt):
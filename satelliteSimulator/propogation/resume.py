@@ -0,0 +1,231 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: resume
+    :platform: Unix
+    :synopsis: Continues a propagation from the end of an earlier run
+
+.. moduleauthor:: Henry Mortimer <henry@morti.net>
+
+The propagators are fixed step, so the state after n steps depends only on
+the state after n - 1 steps, and the time of step n is always calculated as
+``baseTime + timestep*n``. Continuing from the final state of a run with the
+same step number therefore gives exactly the same samples as propagating
+from the epoch again. The final state can be read from the trajectory the
+run wrote, as long as it was written at full precision (as CSV without
+``-p``, or as an archive), or from a checkpoint saved at the end of the run.
+A checkpoint beside the trajectory, with the same name and a ``.json``
+extension, is used in preference when it is for the trajectory's last step.
+"""
+
+from ..utils import readECIData
+from ..storage.archive import binaryHandle, ArchiveReader, MAGIC
+import json
+import os
+import warnings
+
+CHECKPOINTEXT = '.json'
+TAILBYTES = 4096  # enough for the last line of a csv trajectory
+
+
+def lastLine(fileobj):
+    """Gets the last line of a CSV trajectory, reading only its tail when
+    the file can seek
+
+    Args:
+        fileobj: A text file handle.
+
+    Returns:
+        string: The last line that is not blank, or None.
+    """
+    buffer = getattr(fileobj, 'buffer', None)
+    if buffer is not None and buffer.seekable():
+        size = buffer.seek(0, os.SEEK_END)
+        offset = max(size - TAILBYTES, 0)
+        buffer.seek(offset)
+        lines = buffer.read().decode('ascii').splitlines()
+        if offset:
+            lines = lines[1:]  # the first line read may be partial
+    else:
+        lines = fileobj
+    last = None
+    for line in lines:
+        if line.strip():
+            last = line
+    return last
+
+
+def reducedPrecision(line):
+    """Checks whether a CSV sample was written with -p
+
+    Floats written in full have the 16 or 17 significant figures needed to
+    read back exactly, and at least one of the six components of R and V
+    almost always needs that many. A sample written with -p N has at most N
+    in every component.
+
+    Args:
+        line: string: A line of ECI data.
+
+    Returns:
+        bool: True when no component of R or V has 16 significant figures.
+    """
+    digits = [len(field.strip().lower().split('e')[0].replace('-', '').replace('.', '').lstrip('0'))
+              for field in line.split(',')[:6]]
+    return max(digits) < 16
+
+
+def lastState(fileobj):
+    """Reads the final sample of a trajectory without parsing all of it
+
+    Args:
+        fileobj: A file handle for a CSV trajectory or an archive.
+
+    Returns:
+        Tuple: The final ECI record, and whether it was written with reduced
+        precision.
+    """
+    raw = binaryHandle(fileobj)
+    if raw is not None:
+        reader = ArchiveReader(raw)
+        return reader.read(reader.span()[1])[-1], False
+
+    line = lastLine(fileobj)
+    if line is None:
+        raise ValueError('cannot resume from an empty trajectory')
+    return readECIData([line])[-1], reducedPrecision(line)
+
+
+def stepNumber(time, timestep, baseTime, tolerance=0):
+    """Finds which step of a run a sample is
+
+    Args:
+        time: float: The time of the sample (seconds).
+
+        timestep: float: The step size of the run (seconds).
+
+        baseTime: float: The start time of the run (seconds).
+
+        tolerance: float: How far a rounded time may be from the step
+        (seconds).
+
+    Returns:
+        int: The step number.
+
+    Raises:
+        ValueError: The time is not one of the run's steps.
+    """
+    step = int(round((time - baseTime)/timestep))
+    if step < 0 or abs(baseTime + timestep*step - time) > tolerance:
+        raise ValueError('{0} is not a step of a {1} s run starting at {2}'.format(time, timestep, baseTime))
+    return step
+
+
+def writeCheckpoint(fileobj, algorithm, R, V, timestep, step, baseTime):
+    """Saves the state of a run so it can be continued
+
+    Args:
+        fileobj: A text file handle.
+
+        algorithm: string: The propagator.
+
+        R, V: Array (float): The position and velocity after step steps.
+
+        timestep: float: The step size (seconds).
+
+        step: int: The number of steps taken.
+
+        baseTime: float: The start time of the run (seconds).
+    """
+    # json writes the shortest repr of each float, which reads back exactly
+    json.dump({'algorithm': algorithm, 'R': [float(x) for x in R], 'V': [float(x) for x in V],
+               'timestep': float(timestep), 'step': int(step), 'baseTime': float(baseTime)},
+              fileobj, indent=2)
+    fileobj.write('\n')
+
+
+def readCheckpoint(fileobj):
+    """Loads a checkpoint saved by writeCheckpoint
+
+    Args:
+        fileobj: A text file handle.
+
+    Returns:
+        Dict: algorithm, R, V, timestep, step and baseTime.
+    """
+    return json.load(fileobj)
+
+
+def resumeState(path, algorithm, timestep, baseTime):
+    """Gets the state to continue a run from
+
+    Args:
+        path: string: A trajectory written by the run or a checkpoint.
+
+        algorithm: string: The propagator the run must have used.
+
+        timestep: float: The step size the run must have used (seconds).
+
+        baseTime: float: The start time the run must have had (seconds).
+
+    Returns:
+        Tuple: The position and velocity and the number of steps they are
+        after baseTime.
+    """
+    if path.endswith(CHECKPOINTEXT):
+        with open(path) as f:
+            checkpoint = readCheckpoint(f)
+        checkRun(checkpoint, algorithm, timestep, baseTime)
+        return (checkpoint['R'], checkpoint['V'], checkpoint['step'])
+
+    # trajectories do not record how they were made, so only the time grid
+    # can be checked
+    with open(path, 'rb') as f:
+        isArchive = f.read(len(MAGIC)) == MAGIC
+    with open(path, 'rb' if isArchive else 'r') as f:
+        state, reduced = lastState(f)
+    # with -p the time is rounded too, so take the nearest step
+    step = stepNumber(state['time'], timestep, baseTime, timestep/2 if reduced else 0)
+
+    # a checkpoint saved beside the trajectory at the same step holds the
+    # exact state, which a CSV written with -p does not
+    checkpoint = None
+    if os.path.exists(checkpointPath(path)):
+        with open(checkpointPath(path)) as f:
+            checkpoint = readCheckpoint(f)
+    if checkpoint is not None and checkpoint['step'] == step:
+        checkRun(checkpoint, algorithm, timestep, baseTime)
+        return (checkpoint['R'], checkpoint['V'], step)
+    if reduced:
+        warnings.warn('the last sample of {0} was written with reduced precision, so the resumed run '
+                      'will not match an uninterrupted one; resume from a checkpoint '
+                      'instead'.format(path))
+    return ([float(x) for x in state['R']], [float(x) for x in state['V']], step)
+
+
+def checkpointPath(path):
+    """Gets where a checkpoint for a trajectory is looked for
+
+    Args:
+        path: string: The trajectory.
+
+    Returns:
+        string: The trajectory's path with the extension CHECKPOINTEXT.
+    """
+    return os.path.splitext(path)[0] + CHECKPOINTEXT
+
+
+def checkRun(checkpoint, algorithm, timestep, baseTime):
+    """Checks that a checkpoint is from the same kind of run
+
+    Args:
+        checkpoint: Dict: As returned by readCheckpoint.
+
+        algorithm, timestep, baseTime: See resumeState.
+
+    Raises:
+        ValueError: The algorithm, step size or start time differ.
+    """
+    for key, value in (('algorithm', algorithm), ('timestep', timestep), ('baseTime', baseTime)):
+        if checkpoint[key] != value:
+            raise ValueError('checkpoint has {0} {1}, not {2}'.format(key, checkpoint[key], value))
@@ -189,13 +189,44 @@ def rk4MonoPropogation(R, V, timestep, steps, baseTime):
     Returns:
         Array: An array of steps of the algorithm.
     """
-    results = [(R, V, baseTime)]
+    return list(rk4PropogationSteps(R, V, timestep, steps, baseTime, monopoleK))
+
+
+def rk4PropogationSteps(R, V, timestep, steps, baseTime, k, start=0):
+    """Runs the RK4 algorithm yielding each step as soon as it is
+    calculated.
+
+    Args:
+        R: Array (float): The psoition vector in ECI Space.
+
+        V: Array (float): The velocity vector in ECI space.
+
+        timestep: int: The timestep in seconds.
+
+        steps: int: The number of steps to calculate.
+
+        baseTime: float: The start time in seconds.
+
+        k: function: The k function to use (monopole or J2)
+
+        start: int: The number of steps R and V are after baseTime, to
+        continue an earlier run. See propogation.resume.
+
+    Returns:
+        Generator: Tuples of the position and velocity vectors and the time,
+        starting with the initial state.
+    """
+    yield (R, V, baseTime + timestep*start)
     newR = R
     newV = V
-    for step in range(steps):
-        newR, newV = rk4PropogationStep(newR, newV, timestep, monopoleK)
-        results.append((newR, newV, baseTime + timestep*(step+1)))
-    return results
+    for step in range(start, start + steps):
+        newR, newV = rk4PropogationStep(newR, newV, timestep, k)
+        yield (newR, newV, baseTime + timestep*(step+1))
+
+
+def rk4MonoPropogationSteps(R, V, timestep, steps, baseTime, start=0):
+    """Generator version of rk4MonoPropogation."""
+    return rk4PropogationSteps(R, V, timestep, steps, baseTime, monopoleK, start)
 
 # ==========================RK4-J2 functions=============================#
 
@@ -291,10 +322,9 @@ def rk4j2Propogation(R, V, timestep, steps, baseTime):
     Returns:
         Array: An array of steps of the algorithm.
     """
-    results = [(R, V, baseTime)]
-    newR = R
-    newV = V
-    for step in range(steps):
-        newR, newV = rk4PropogationStep(newR, newV, timestep, j2k)
-        results.append((newR, newV, baseTime + timestep*(step+1)))
-    return results
+    return list(rk4PropogationSteps(R, V, timestep, steps, baseTime, j2k))
+
+
+def rk4j2PropogationSteps(R, V, timestep, steps, baseTime, start=0):
+    """Generator version of rk4j2Propogation."""
+    return rk4PropogationSteps(R, V, timestep, steps, baseTime, j2k, start)
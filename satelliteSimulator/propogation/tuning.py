@@ -0,0 +1,262 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: tuning
+    :platform: Unix
+    :synopsis: Measures the accuracy and cost of the propagators over a
+        range of step sizes
+
+.. moduleauthor:: Henry Mortimer <henry@morti.net>
+
+Each propagator is run for a scenario at every step size in a sweep. The
+positions are compared every COMPAREINTERVAL seconds with a reference for
+the same force model: the two body propagators (kep and rk4) against the
+closed form keplerian solution from the epoch, and the J2 propagator against
+itself with a 1 second step. The cost of a run is its wall time and the
+number of force model evaluations (four per RK4 step, one Kepler solve per
+keplerian step).
+"""
+
+from .keplerianPropogation import propogateOrbitSteps, calculateOrbitStep
+from .rk4 import rk4PropogationSteps, monopoleK, j2k
+from ..data import AEGMA96, BASETIME
+import numpy as np
+import time
+
+STEPSIZES = (1, 2, 5, 10, 15, 20, 30, 60, 120, 300, 600)  # seconds
+COMPAREINTERVAL = 600  # seconds, every step size divides it
+REFSTEP = 1  # seconds, for the J2 reference run
+ALGORITHMS = ('kep', 'rk4', 'j2')
+LEOALTITUDE = 2000  # km, upper limit of low earth orbit
+GEOALTITUDE = (35000, 37000)  # km
+
+RESULT_DTYPE = np.dtype([('satellite', 'U16'),
+                         ('class', 'U3'),
+                         ('algorithm', 'U3'),
+                         ('step', np.float64),
+                         ('evaluations', np.int64),
+                         ('wall', np.float64),
+                         ('maxError', np.float64),
+                         ('rmsError', np.float64),
+                         ('pareto', np.bool_)])
+
+RECOMMEND_DTYPE = np.dtype([('class', 'U3'),
+                            ('algorithm', 'U3'),
+                            ('step', np.float64),
+                            ('evaluations', np.int64),
+                            ('maxError', np.float64)])
+
+
+def orbitClass(satellite):
+    """Classifies an orbit by its altitude
+
+    Args:
+        satellite: Dict: A satellite from data.py.
+
+    Returns:
+        string: 'LEO', 'MEO' or 'GEO'.
+    """
+    altitude = satellite['keplerian']['a'] - AEGMA96
+    if altitude < LEOALTITUDE:
+        return 'LEO'
+    if GEOALTITUDE[0] <= altitude <= GEOALTITUDE[1]:
+        return 'GEO'
+    return 'MEO'
+
+
+def checkDuration(duration, steps):
+    """Checks every step size fits a whole number of times into the duration
+    and the comparison interval
+
+    Args:
+        duration: float: The length of the run (seconds).
+
+        steps: Array (float): The step sizes (seconds).
+    """
+    if duration <= 0 or duration % COMPAREINTERVAL:
+        raise ValueError('duration must be a multiple of {0} seconds'.format(COMPAREINTERVAL))
+    for step in steps:
+        if COMPAREINTERVAL % step:
+            raise ValueError('step sizes must divide {0} seconds, not {1}'.format(COMPAREINTERVAL, step))
+
+
+def countingK(k, counter):
+    """Wraps a k function to count how often it is evaluated"""
+    def counted(R, h):
+        counter[0] += 1
+        return k(R, h)
+    return counted
+
+
+def runPropogator(algorithm, satellite, step, duration):
+    """Propagates a satellite and samples it every COMPAREINTERVAL seconds
+
+    Args:
+        algorithm: string: One of ALGORITHMS.
+
+        satellite: Dict: A satellite from data.py.
+
+        step: float: The step size (seconds).
+
+        duration: float: The length of the run (seconds).
+
+    Returns:
+        Tuple: The positions at each comparison time (km), the wall time
+        (seconds) and the number of force model evaluations.
+    """
+    R, V = satellite['R'], satellite['V']
+    baseTime = satellite.get('time', BASETIME)
+    nsteps = int(round(duration/step))
+    counter = [0]
+    if algorithm == 'kep':
+        steps = propogateOrbitSteps(R, V, step, nsteps, baseTime)
+    elif algorithm == 'rk4':
+        steps = rk4PropogationSteps(R, V, step, nsteps, baseTime, countingK(monopoleK, counter))
+    elif algorithm == 'j2':
+        steps = rk4PropogationSteps(R, V, step, nsteps, baseTime, countingK(j2k, counter))
+    else:
+        raise ValueError('unknown algorithm {0!r}'.format(algorithm))
+
+    start = time.perf_counter()
+    states = list(steps)
+    wall = time.perf_counter() - start
+
+    every = int(round(COMPAREINTERVAL/step))
+    positions = np.array([s[0] for s in states[::every]], dtype=float)
+    evaluations = nsteps if algorithm == 'kep' else counter[0]
+    return positions, wall, evaluations
+
+
+def referencePositions(algorithm, satellite, duration):
+    """Gets accurate positions every COMPAREINTERVAL seconds for the force
+    model of a propagator
+
+    Args:
+        algorithm: string: One of ALGORITHMS.
+
+        satellite: Dict: A satellite from data.py.
+
+        duration: float: The length of the run (seconds).
+
+    Returns:
+        Array: The positions (km).
+    """
+    if algorithm == 'j2':
+        return runPropogator('j2', satellite, REFSTEP, duration)[0]
+    # two body motion has a closed form, so solve straight from the epoch
+    R, V = satellite['R'], satellite['V']
+    times = np.arange(0, duration + COMPAREINTERVAL/2, COMPAREINTERVAL)
+    return np.array([R] + [calculateOrbitStep(R, V, t)[0] for t in times[1:]], dtype=float)
+
+
+def sweep(algorithm, name, satellite, duration, steps=STEPSIZES):
+    """Runs a propagator at each step size and measures its error
+
+    Args:
+        algorithm: string: One of ALGORITHMS.
+
+        name: string: The satellite name.
+
+        satellite: Dict: A satellite from data.py.
+
+        duration: float: The length of each run (seconds).
+
+        steps: Array (float): The step sizes (seconds).
+
+    Returns:
+        Array: A RESULT_DTYPE record for each step size.
+    """
+    checkDuration(duration, steps)
+    runs = [runPropogator(algorithm, satellite, step, duration) for step in steps]
+    if algorithm == 'j2' and REFSTEP in steps:
+        # the reference is one of the runs
+        reference = runs[list(steps).index(REFSTEP)][0]
+    else:
+        reference = referencePositions(algorithm, satellite, duration)
+
+    results = np.zeros(len(steps), dtype=RESULT_DTYPE)
+    for result, step, (positions, wall, evaluations) in zip(results, steps, runs):
+        error = np.linalg.norm(positions - reference, axis=1)
+        result['satellite'] = name
+        result['class'] = orbitClass(satellite)
+        result['algorithm'] = algorithm
+        result['step'] = step
+        result['evaluations'] = evaluations
+        result['wall'] = wall
+        result['maxError'] = error.max()
+        result['rmsError'] = np.sqrt(np.mean(error**2))
+    results['pareto'] = paretoFront(results['evaluations'], results['maxError'])
+    return results
+
+
+def paretoFront(cost, error):
+    """Finds the configurations that no other beats on both cost and error
+
+    Args:
+        cost, error: Array (float): One value per configuration.
+
+    Returns:
+        Array (bool): True for configurations on the front.
+    """
+    cost = np.asarray(cost, dtype=float)
+    error = np.asarray(error, dtype=float)
+    front = np.ones(len(cost), dtype=bool)
+    for i in range(len(cost)):
+        dominated = (cost <= cost[i]) & (error <= error[i]) & ((cost < cost[i]) | (error < error[i]))
+        front[i] = not dominated.any()
+    return front
+
+
+def tune(satellites, algorithms=ALGORITHMS, duration=86400, steps=STEPSIZES):
+    """Sweeps step sizes for every propagator and satellite
+
+    Args:
+        satellites: Array: (name, satellite dict) pairs.
+
+        algorithms: Array (string): The propagators to tune.
+
+        duration: float: The length of each run (seconds).
+
+        steps: Array (float): The step sizes (seconds).
+
+    Returns:
+        Array: RESULT_DTYPE records, with the pareto front marked per
+        satellite and propagator.
+    """
+    return np.concatenate([sweep(algorithm, name, satellite, duration, steps)
+                           for name, satellite in satellites
+                           for algorithm in algorithms])
+
+
+def recommend(results, target):
+    """Picks the cheapest step size for each orbit class and propagator that
+    keeps every satellite in the class within a target error
+
+    Args:
+        results: Array: Records from tune.
+
+        target: float: The largest acceptable position error (km).
+
+    Returns:
+        Array: RECOMMEND_DTYPE records for the combinations that can meet
+        the target, cheapest first within each class. The evaluations and
+        error are the totals and worst case over the class.
+    """
+    recommendations = []
+    for cls in np.unique(results['class']):
+        for algorithm in np.unique(results['algorithm']):
+            group = results[(results['class'] == cls) & (results['algorithm'] == algorithm)]
+            best = None
+            for step in np.unique(group['step']):
+                runs = group[group['step'] == step]
+                if runs['maxError'].max() > target:
+                    continue
+                candidate = (str(cls), str(algorithm), float(step),
+                             int(runs['evaluations'].sum()), float(runs['maxError'].max()))
+                if best is None or candidate[3] < best[3]:
+                    best = candidate
+            if best is not None:
+                recommendations.append(best)
+    recommendations.sort(key=lambda r: (r[0], r[3]))
+    return np.array(recommendations, dtype=RECOMMEND_DTYPE)
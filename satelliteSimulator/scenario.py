@@ -0,0 +1,422 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: scenario
+    :platform: Unix
+    :synopsis: Runs a whole study declared in a scenario file
+
+.. moduleauthor:: Henry Mortimer <henry@morti.net>
+
+A scenario file (JSON, or TOML on python 3.11 and later) declares the
+satellites, force models, stations and analyses of a study::
+
+    {
+        "output": "galileo-study",
+        "days": 1,
+        "step": 10,
+        "satellites": ["Galileo", "Jason"],
+        "models": ["kep", "j2"],
+        "stations": [[45, -100, 5], [51.5, -0.13, 5]],
+        "analyses": {
+            "difference": {"reference": "j2", "frame": "hcl"},
+            "groundTrack": {},
+            "passTimes": {},
+            "plot": ["grndtrck", "diffs", "passTimes"]
+        }
+    }
+
+``satellites`` may also map each name to its own ``models``, ``days`` and
+``step``. ``frame`` is ``"hcl"`` or ``[lat, lon]`` for ENU differences.
+
+The scenario is expanded into tasks, each of which is a command line for
+one of the subcommands in main.py writing a file in the output directory.
+Tasks run as soon as the tasks they read from have finished, several at
+once in a pool of processes. Like make, a task is skipped when its output
+exists and was made from the same command line, the same inputs and the
+same code, which is recorded in a manifest in the output directory.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from collections import OrderedDict
+import hashlib
+import inspect
+import io
+import json
+import os
+import sys
+import time
+
+try:
+    import tomllib
+except ImportError:  # python < 3.11
+    tomllib = None
+
+MANIFEST = '.scenario.json'
+ANALYSES = ('difference', 'groundTrack', 'passTimes', 'plot')
+PLOTINPUTS = {'grndtrck': 'groundTrack', 'animate': 'groundTrack', 'diffs': 'difference',
+              'passTimes': 'passTimes', 'eci': 'propogate'}
+
+
+class Artifact(str):
+    """A file name relative to the scenario's output directory"""
+
+
+class Task(object):
+    """A single subcommand run.
+
+    Args:
+        name: string: Unique within the scenario.
+
+        argv: Array (string): The subcommand's arguments. Artifacts are
+        resolved against the output directory when the task is run.
+
+        inputs: Array (string): The names of the tasks whose outputs it reads.
+
+        output: Artifact: The file it writes.
+    """
+
+    def __init__(self, name, argv, inputs, output):
+        self.name = name
+        self.argv = argv
+        self.inputs = inputs
+        self.output = output
+
+    def resolve(self, outdir):
+        """Gets the argv with every artifact as a path in outdir"""
+        return [os.path.join(outdir, a) if isinstance(a, Artifact) else a for a in self.argv]
+
+    def __repr__(self):
+        return 'Task({0!r}, {1!r})'.format(self.name, list(self.argv))
+
+
+def loadScenario(path):
+    """Reads a scenario file
+
+    Args:
+        path: string: A .json or .toml file.
+
+    Returns:
+        Dict: The scenario.
+    """
+    if path.endswith('.toml'):
+        if tomllib is None:
+            raise ValueError('TOML scenarios need python 3.11 or later, use JSON instead')
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    with open(path) as f:
+        return json.load(f)
+
+
+def satelliteRuns(scenario):
+    """Gets the propagations a scenario asks for
+
+    Args:
+        scenario: Dict: As returned by loadScenario.
+
+    Returns:
+        Array: (satellite, model, days, step) for every propagation.
+    """
+    satellites = scenario.get('satellites', [])
+    if not isinstance(satellites, dict):
+        satellites = OrderedDict((name, {}) for name in satellites)
+    runs = []
+    for name, options in satellites.items():
+        for model in options.get('models', scenario.get('models', ['j2'])):
+            runs.append((name, model, options.get('days', scenario.get('days', 1)),
+                         options.get('step', scenario.get('step', 10))))
+    return runs
+
+
+def buildTasks(scenario):
+    """Expands a scenario into tasks
+
+    Args:
+        scenario: Dict: As returned by loadScenario.
+
+    Returns:
+        OrderedDict: name: Task, every task after the tasks it reads from.
+    """
+    analyses = scenario.get('analyses', {})
+    for analysis in analyses:
+        if analysis not in ANALYSES:
+            raise ValueError('unknown analysis {0!r}, choose from {1}'.format(analysis, ', '.join(ANALYSES)))
+    stations = [str(x) for station in scenario.get('stations', []) for x in station]
+    precision = scenario.get('precision')
+    precisionArgs = [] if precision is None else ['-p', str(precision)]
+
+    tasks = OrderedDict()
+
+    def add(name, argv, inputs, output):
+        if name in tasks:
+            raise ValueError('{0} is declared twice'.format(name))
+        tasks[name] = Task(name, argv, inputs, output)
+
+    runs = satelliteRuns(scenario)
+    for sat, model, days, step in runs:
+        output = Artifact('{0}-{1}.csv'.format(sat, model))
+        add('propogate:{0}:{1}'.format(sat, model),
+            ['propogate', sat, model, str(days), '-s', str(step), '-o', output] + precisionArgs,
+            [], output)
+
+    if 'difference' in analyses:
+        options = analyses['difference'] or {}
+        frame = options.get('frame', 'hcl')
+        frameArgs = ['--hcl'] if frame == 'hcl' else ['--enu', str(frame[0]), str(frame[1])]
+        for sat, model, days, step in runs:
+            reference = options.get('reference', 'j2')
+            if model == reference:
+                continue
+            if 'propogate:{0}:{1}'.format(sat, reference) not in tasks:
+                raise ValueError('{0} is not propogated with the {1} reference model'.format(sat, reference))
+            output = Artifact('{0}-diff-{1}-{2}.csv'.format(sat, model, reference))
+            inputs = ['propogate:{0}:{1}'.format(sat, model), 'propogate:{0}:{1}'.format(sat, reference)]
+            add('difference:{0}:{1}'.format(sat, model),
+                ['difference'] + frameArgs + ['-i1', tasks[inputs[0]].output,
+                                              '-i2', tasks[inputs[1]].output, '-o', output] + precisionArgs,
+                inputs, output)
+
+    for analysis, suffix in (('groundTrack', 'grndtrck'), ('passTimes', 'passes')):
+        if analysis not in analyses:
+            continue
+        for sat, model, days, step in runs:
+            source = 'propogate:{0}:{1}'.format(sat, model)
+            output = Artifact('{0}-{1}-{2}.csv'.format(sat, model, suffix))
+            add('{0}:{1}:{2}'.format(analysis, sat, model),
+                [analysis, '-i', tasks[source].output, '-o', output] + precisionArgs + stations,
+                [source], output)
+
+    if 'plot' in analyses:
+        options = analyses['plot']
+        graphs = options if isinstance(options, list) else options.get('graphs', [])
+        plotArgs = [] if isinstance(options, list) else \
+            [arg for key in ('projection', 'resolution', 'mode') if key in options
+             for arg in ('--' + key, str(options[key]))]
+        for graph in graphs:
+            if graph not in PLOTINPUTS:
+                raise ValueError('unknown graph {0!r}'.format(graph))
+            ext = 'gif' if graph == 'animate' else 'png'
+            for source in [name for name in tasks if name.split(':')[0] == PLOTINPUTS[graph]]:
+                cmd, sat, model = source.split(':')
+                output = Artifact('{0}-{1}-{2}.{3}'.format(sat, model, graph, ext))
+                add('plot:{0}:{1}:{2}'.format(graph, sat, model),
+                    ['plot', graph, '-i', tasks[source].output, '-o', output] + plotArgs,
+                    [source], output)
+
+    return tasks
+
+
+_packageDigest = None
+
+
+def packageDigest():
+    """Hashes the source of the package, once per process
+
+    Returns:
+        hashlib object: A sha256 of every .py file in the package.
+    """
+    global _packageDigest
+    if _packageDigest is None:
+        package = os.path.dirname(os.path.abspath(__file__))
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(package):
+            dirs.sort()
+            for fname in sorted(files):
+                if fname.endswith('.py'):
+                    path = os.path.join(root, fname)
+                    with open(path, 'rb') as f:
+                        digest.update(os.path.relpath(path, package).encode('utf-8') + b'\0' + f.read())
+        _packageDigest = digest
+    return _packageDigest
+
+
+def sourceHash(scripts=()):
+    """Gets a hash of the package source, so tasks rerun when the code
+    changes
+
+    Args:
+        scripts: Array (string): Paths of other source files that decide
+        the outputs, such as main.py with the subcommands and their
+        defaults.
+
+    Returns:
+        string: A hex digest.
+    """
+    digest = packageDigest().copy()
+    for path in sorted(set(scripts)):
+        with open(path, 'rb') as f:
+            digest.update(b'\0' + os.path.basename(path).encode('utf-8') + b'\0' + f.read())
+    return digest.hexdigest()
+
+
+def signatures(tasks, scripts=()):
+    """Hashes everything that decides each task's output: its arguments,
+    the signatures of its inputs and the source code
+
+    Args:
+        tasks: OrderedDict: As returned by buildTasks.
+
+        scripts: Array (string): Source files outside the package, see
+        sourceHash.
+
+    Returns:
+        Dict: name: hex digest.
+    """
+    source = sourceHash(scripts)
+    result = {}
+    for name, task in tasks.items():
+        inputs = [result[i] for i in task.inputs]
+        text = json.dumps([list(task.argv), inputs, source])
+        result[name] = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    return result
+
+
+def readManifest(outdir):
+    try:
+        with open(os.path.join(outdir, MANIFEST)) as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {}
+
+
+def writeManifest(outdir, manifest):
+    path = os.path.join(outdir, MANIFEST)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def closeFiles(args):
+    """Closes the files argparse opened for a subcommand"""
+    for value in vars(args).values():
+        if isinstance(value, io.IOBase) and value not in (sys.stdin, sys.stdout, sys.stderr):
+            value.close()
+
+
+def runTask(parseArgs, runCommand, argv):
+    """Runs a subcommand
+
+    Args:
+        parseArgs: Function: Parses a subcommand's argv.
+
+        runCommand: Function: Runs parsed arguments.
+
+        argv: Array (string): The arguments.
+
+    Returns:
+        Tuple: The time taken (seconds) and an error message or None.
+    """
+    start = time.time()
+    args = None
+    try:
+        args = parseArgs(argv)
+        runCommand(args)
+    except (Exception, SystemExit) as e:
+        return (time.time() - start, '{0}: {1}'.format(type(e).__name__, e))
+    finally:
+        if args is not None:
+            closeFiles(args)
+    return (time.time() - start, None)
+
+
+def runScenario(tasks, outdir, parseArgs, runCommand, processes=None, force=False, dryRun=False):
+    """Runs the tasks that are out of date, in parallel where they do not
+    depend on each other
+
+    Args:
+        tasks: OrderedDict: As returned by buildTasks.
+
+        outdir: string: The directory for the outputs and manifest.
+
+        parseArgs: Function: Parses a subcommand's argv into arguments.
+
+        runCommand: Function: Runs parsed arguments. Both functions must be
+        importable by the worker processes.
+
+        processes: int: The number of workers. Defaults to the number of
+        cpus. With 1 the tasks are run in this process.
+
+        force: bool: Rerun every task.
+
+        dryRun: bool: Report what would run without running it.
+
+    Returns:
+        Generator: (task name, status, seconds, error) for each task as it
+        finishes. The status is 'reused', 'ran', 'failed', 'skipped' when an
+        input failed, or 'pending' for a dry run.
+    """
+    if not os.path.isdir(outdir):
+        os.makedirs(outdir)
+    manifest = readManifest(outdir)
+    # the module holding the subcommands decides the outputs as much as the
+    # package does
+    sigs = signatures(tasks, [inspect.getsourcefile(f) for f in (parseArgs, runCommand)])
+
+    stale = set()
+    for name, task in tasks.items():
+        if (force or manifest.get(name) != sigs[name] or any(i in stale for i in task.inputs)
+                or not os.path.exists(os.path.join(outdir, task.output))):
+            stale.add(name)
+        else:
+            yield (name, 'reused', 0.0, None)
+
+    if dryRun:
+        for name in tasks:
+            if name in stale:
+                yield (name, 'pending', 0.0, None)
+        return
+
+    for name in stale:
+        # a task interrupted half way must not look up to date
+        manifest.pop(name, None)
+    writeManifest(outdir, manifest)
+
+    waiting = OrderedDict((name, task) for name, task in tasks.items() if name in stale)
+    succeeded = set(name for name in tasks if name not in stale)
+    failed = set()
+
+    def finish(name, seconds, error):
+        if error is None:
+            succeeded.add(name)
+            manifest[name] = sigs[name]
+            writeManifest(outdir, manifest)
+            return (name, 'ran', seconds, None)
+        failed.add(name)
+        return (name, 'failed', seconds, error)
+
+    def ready():
+        # tasks whose inputs have all been made, and those that never can be
+        runnable, skipped = [], []
+        for name, task in list(waiting.items()):
+            if any(i in failed for i in task.inputs):
+                del waiting[name]
+                failed.add(name)
+                skipped.append(name)
+            elif all(i in succeeded for i in task.inputs):
+                del waiting[name]
+                runnable.append(name)
+        return runnable, skipped
+
+    if processes == 1:
+        while waiting:
+            runnable, skipped = ready()
+            for name in skipped:
+                yield (name, 'skipped', 0.0, None)
+            for name in runnable:
+                yield finish(name, *runTask(parseArgs, runCommand, tasks[name].resolve(outdir)))
+        return
+
+    running = {}
+    with ProcessPoolExecutor(processes) as pool:
+        while waiting or running:
+            runnable, skipped = ready()
+            for name in skipped:
+                yield (name, 'skipped', 0.0, None)
+            for name in runnable:
+                future = pool.submit(runTask, parseArgs, runCommand, tasks[name].resolve(outdir))
+                running[future] = name
+            if not running:
+                continue
+            done, pending = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield finish(running.pop(future), *future.result())
@@ -0,0 +1,451 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: archive
+    :platform: Unix
+    :synopsis: Compressed trajectory archives with random access by time
+
+.. moduleauthor:: Henry Mortimer <henry@morti.net>
+
+An archive is a single file laid out as::
+
+    MAGIC | header | frame | frame | ... | index frame | footer
+
+Samples are grouped into chunks covering a fixed span of time measured from
+the first sample. Each chunk is delta encoded (the float bits of every column
+are differenced twice down the rows, which is lossless), byte shuffled so that
+bytes of equal significance sit together, then compressed with zlib or lzma. The index holds
+the offset, size and time bounds of every chunk so a reader only decompresses
+the chunks overlapping the window it is asked for. The index is written last
+and every chunk is framed with its kind, length and row count, so archives can
+be written to and decoded from pipes one chunk at a time.
+"""
+
+from ..utils import ECI_DTYPE
+import numpy as np
+import struct
+import zlib
+import lzma
+import io
+
+MAGIC = b'PYSPTRZ1'
+ARCHIVEEXT = '.trz'
+CHUNKSECONDS = 3600
+COMPRESSORS = {'zlib': 0, 'lzma': 1}
+HEADER = struct.Struct('<BBd')  # compression, level, chunk seconds
+FOOTER = struct.Struct('<QQ')  # index offset, number of chunks
+FRAME = struct.Struct('<cQI')  # kind, length, rows
+CHUNKFRAME = b'C'
+INDEXFRAME = b'I'
+INDEX_DTYPE = np.dtype([('offset', '<u8'),
+                        ('length', '<u8'),
+                        ('rows', '<u4'),
+                        ('start', '<f8'),
+                        ('end', '<f8')])
+NCOLS = 7
+DELTAORDER = 2  # smooth orbits compress best as differences of differences
+
+
+def encodeChunk(data, compression, level):
+    """Delta encodes, shuffles and compresses a chunk of ECI data
+
+    Args:
+        data: Array: ECI data.
+
+        compression: int: The compressor id from COMPRESSORS.
+
+        level: int: The compression level.
+
+    Returns:
+        bytes.
+    """
+    bits = np.ascontiguousarray(data).view(np.float64).reshape(-1, NCOLS).view(np.int64)
+    deltas = bits.copy()
+    for order in range(DELTAORDER):
+        deltas[1:] = deltas[1:] - deltas[:-1]
+    shuffled = deltas.view(np.uint8).reshape(len(bits), NCOLS, 8).transpose(1, 2, 0)
+    raw = np.ascontiguousarray(shuffled).tobytes()
+    if compression == COMPRESSORS['lzma']:
+        return lzma.compress(raw, preset=level)
+    return zlib.compress(raw, level)
+
+
+def decodeChunk(blob, rows, compression):
+    """Reverses encodeChunk
+
+    Args:
+        blob: bytes: The compressed chunk.
+
+        rows: int: The number of samples in the chunk.
+
+        compression: int: The compressor id from COMPRESSORS.
+
+    Returns:
+        Array: ECI data.
+    """
+    if compression == COMPRESSORS['lzma']:
+        raw = lzma.decompress(blob)
+    else:
+        raw = zlib.decompress(blob)
+    shuffled = np.frombuffer(raw, dtype=np.uint8).reshape(NCOLS, 8, rows)
+    deltas = np.ascontiguousarray(shuffled.transpose(2, 0, 1)).view(np.int64).reshape(rows, NCOLS)
+    bits = deltas
+    for order in range(DELTAORDER):
+        bits = np.cumsum(bits, axis=0, dtype=np.int64)
+    return bits.view(np.float64).reshape(-1).view(ECI_DTYPE)
+
+
+class ArchiveWriter(object):
+    """Writes ECI data to an archive as it arrives.
+
+    Args:
+        fileobj: A binary file handle. It does not need to be seekable.
+
+        chunkSeconds: float: The span of time covered by each chunk.
+
+        compression: string: 'zlib' or 'lzma'.
+
+        level: int: The compression level.
+    """
+
+    def __init__(self, fileobj, chunkSeconds=CHUNKSECONDS, compression='zlib', level=6):
+        self.fileobj = fileobj
+        self.chunkSeconds = chunkSeconds
+        self.compression = COMPRESSORS[compression]
+        self.level = level
+        self._offset = 0
+        self._index = []
+        self._pending = []
+        self._base = None
+        self._bucket = None
+        self._last = None
+        self._write(MAGIC + HEADER.pack(self.compression, level, chunkSeconds))
+
+    @classmethod
+    def extend(cls, fileobj):
+        """Reopens an archive to add samples after the ones it holds
+
+        The index and footer are cut off, and the last chunk is decoded and
+        kept pending, so the samples added end up in the same chunks, and the
+        same bytes, as if the archive had been written in one go.
+
+        Args:
+            fileobj: A binary file handle that can seek and be written,
+            e.g. opened with 'r+b'. An empty file is started as a new
+            archive.
+
+        Returns:
+            ArchiveWriter.
+        """
+        if not fileobj.seekable():
+            raise ValueError('only an archive file can be extended, not a pipe')
+        if fileobj.seek(0, io.SEEK_END) == 0:
+            return cls(fileobj)
+        reader = ArchiveReader(fileobj)
+        self = cls.__new__(cls)
+        self.fileobj = fileobj
+        self.chunkSeconds = reader.chunkSeconds
+        self.compression = reader.compression
+        self.level = reader.level
+        self._pending = []
+        self._base = self._bucket = self._last = None
+        self._index = [tuple(entry) for entry in reader.index.tolist()]
+        self._offset = len(MAGIC) + HEADER.size
+        if self._index:
+            last = self._index.pop()
+            self._offset = int(last[0])
+            chunk = next(reader.chunks(last[3]))
+            self._pending = [chunk]
+            self._base = reader.index['start'][0]
+            self._bucket = int(np.floor((chunk['time'][0] - self._base)/self.chunkSeconds))
+            self._last = chunk['time'][-1]
+        fileobj.seek(self._offset)
+        fileobj.truncate()
+        return self
+
+    def write(self, data):
+        """Adds samples to the archive
+
+        Args:
+            data: Array: ECI data with increasing times.
+        """
+        data = np.asarray(data, dtype=ECI_DTYPE)
+        if len(data) == 0:
+            return
+        times = data['time']
+        if np.any(np.diff(times) <= 0) or (self._last is not None and times[0] <= self._last):
+            raise ValueError('archive times must be strictly increasing')
+        self._last = times[-1]
+
+        if self._base is None:
+            self._base = times[0]
+            self._bucket = 0
+        buckets = np.floor((times - self._base)/self.chunkSeconds).astype(np.int64)
+
+        edges = np.flatnonzero(np.diff(buckets)) + 1
+        for part, bucket in zip(np.split(data, edges), buckets[np.r_[0, edges]]):
+            if bucket != self._bucket:
+                self._flush()
+                self._bucket = bucket
+            self._pending.append(part)
+
+    def close(self):
+        """Writes the last chunk and the index. The file handle is flushed
+        but not closed."""
+        self._flush()
+        index = np.array(self._index, dtype=INDEX_DTYPE)
+        indexOffset = self._offset
+        self._write(FRAME.pack(INDEXFRAME, index.nbytes, len(index)) + index.tobytes())
+        self._write(FOOTER.pack(indexOffset, len(index)) + MAGIC)
+        self.fileobj.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self.close()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        chunk = np.concatenate(self._pending)
+        self._pending = []
+        blob = encodeChunk(chunk, self.compression, self.level)
+        self._index.append((self._offset, len(blob), len(chunk),
+                            chunk['time'][0], chunk['time'][-1]))
+        self._write(FRAME.pack(CHUNKFRAME, len(blob), len(chunk)) + blob)
+
+    def _write(self, data):
+        self.fileobj.write(data)
+        self._offset += len(data)
+
+
+class ArchiveReader(object):
+    """Reads windows of ECI data from an archive.
+
+    Args:
+        fileobj: A binary file handle. Handles that cannot seek (e.g. stdin)
+        are read into memory first.
+    """
+
+    def __init__(self, fileobj):
+        if not fileobj.seekable():
+            fileobj = io.BytesIO(fileobj.read())
+        self.fileobj = fileobj
+
+        fileobj.seek(0)
+        head = fileobj.read(len(MAGIC) + HEADER.size)
+        if head[:len(MAGIC)] != MAGIC:
+            raise ValueError('not a trajectory archive')
+        self.compression, self.level, self.chunkSeconds = HEADER.unpack(head[len(MAGIC):])
+
+        fileobj.seek(-(FOOTER.size + len(MAGIC)), io.SEEK_END)
+        tail = fileobj.read()
+        if tail[FOOTER.size:] != MAGIC:
+            raise ValueError('truncated trajectory archive')
+        indexOffset, nChunks = FOOTER.unpack(tail[:FOOTER.size])
+        fileobj.seek(indexOffset + FRAME.size)
+        self.index = np.frombuffer(fileobj.read(nChunks*INDEX_DTYPE.itemsize), dtype=INDEX_DTYPE)
+
+    def __len__(self):
+        return int(self.index['rows'].sum())
+
+    def span(self):
+        """Gets the first and last sample times
+
+        Returns:
+            Tuple: The first and last times (seconds).
+        """
+        return (self.index['start'][0], self.index['end'][-1])
+
+    def chunks(self, start=None, end=None):
+        """Iterates over the decoded chunks overlapping a window
+
+        Args:
+            start, end: float: The window, inclusive. None means unbounded.
+
+        Returns:
+            Generator: ECI data for each chunk, trimmed to the window.
+        """
+        first = 0 if start is None else np.searchsorted(self.index['end'], start, 'left')
+        last = len(self.index) if end is None else np.searchsorted(self.index['start'], end, 'right')
+
+        for entry in self.index[first:last]:
+            self.fileobj.seek(int(entry['offset']) + FRAME.size)
+            chunk = decodeChunk(self.fileobj.read(int(entry['length'])), int(entry['rows']),
+                                self.compression)
+            lo = 0 if start is None else np.searchsorted(chunk['time'], start, 'left')
+            hi = len(chunk) if end is None else np.searchsorted(chunk['time'], end, 'right')
+            yield chunk[lo:hi]
+
+    def read(self, start=None, end=None):
+        """Reads the samples in a window
+
+        Args:
+            start, end: float: The window, inclusive. None means unbounded.
+
+        Returns:
+            Array: ECI data.
+        """
+        parts = list(self.chunks(start, end))
+        if not parts:
+            return np.empty(0, dtype=ECI_DTYPE)
+        return np.concatenate(parts)
+
+
+def writeArchive(data, fileobj, chunkSeconds=CHUNKSECONDS, compression='zlib', level=6):
+    """Writes ECI data to an archive
+
+    Args:
+        data: Array: ECI data.
+
+        fileobj: A binary file handle.
+
+        chunkSeconds: float: The span of time covered by each chunk.
+
+        compression: string: 'zlib' or 'lzma'.
+
+        level: int: The compression level.
+    """
+    with ArchiveWriter(fileobj, chunkSeconds, compression, level) as writer:
+        writer.write(data)
+
+
+def readArchive(fileobj, start=None, end=None):
+    """Reads the samples in a window from an archive
+
+    Args:
+        fileobj: A binary file handle.
+
+        start, end: float: The window, inclusive. None means unbounded.
+
+    Returns:
+        Array: ECI data.
+    """
+    return ArchiveReader(fileobj).read(start, end)
+
+
+def iterArchive(fileobj, start=None, end=None):
+    """Decodes an archive one chunk at a time
+
+    Seekable files use the index to skip straight to the window. Pipes are
+    read frame by frame so that only one chunk is held in memory.
+
+    Args:
+        fileobj: A binary file handle.
+
+        start, end: float: The window, inclusive. None means unbounded.
+
+    Returns:
+        Generator: ECI data for each chunk, trimmed to the window.
+    """
+    if fileobj.seekable():
+        for chunk in ArchiveReader(fileobj).chunks(start, end):
+            yield chunk
+        return
+
+    head = fileobj.read(len(MAGIC) + HEADER.size)
+    if head[:len(MAGIC)] != MAGIC:
+        raise ValueError('not a trajectory archive')
+    compression = HEADER.unpack(head[len(MAGIC):])[0]
+
+    while True:
+        frame = fileobj.read(FRAME.size)
+        if len(frame) < FRAME.size:
+            raise ValueError('truncated trajectory archive')
+        kind, length, rows = FRAME.unpack(frame)
+        blob = fileobj.read(length)
+        if kind == INDEXFRAME:
+            fileobj.read()
+            return
+        chunk = decodeChunk(blob, rows, compression)
+        times = chunk['time']
+        if end is not None and times[0] > end:
+            fileobj.read()
+            return
+        if start is not None and times[-1] < start:
+            continue
+        lo = 0 if start is None else np.searchsorted(times, start, 'left')
+        hi = len(chunk) if end is None else np.searchsorted(times, end, 'right')
+        yield chunk[lo:hi]
+
+
+def isBinaryFile(fileobj):
+    """Checks if a file handle reads or writes bytes
+
+    Args:
+        fileobj: A file handle.
+
+    Returns:
+        Bool.
+    """
+    if isinstance(fileobj, (io.RawIOBase, io.BufferedIOBase)):
+        return True
+    return 'b' in getattr(fileobj, 'mode', '')
+
+
+class PrefixedStream(io.RawIOBase):
+    """Reads some bytes already taken from a stream, then the rest of it.
+
+    Args:
+        prefix: bytes: The bytes taken from the start.
+
+        fileobj: A binary file handle for the rest.
+    """
+
+    def __init__(self, prefix, fileobj):
+        self.prefix = prefix
+        self.fileobj = fileobj
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if self.prefix:
+            data, self.prefix = self.prefix[:len(b)], self.prefix[len(b):]
+        else:
+            data = self.fileobj.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+
+def binaryHandle(fileobj):
+    """Gets the binary handle underneath a file handle if it starts with an
+    archive, so that archives can be piped through stdin.
+
+    Args:
+        fileobj: A text or binary file handle.
+
+    Returns:
+        The binary handle or None if the file is not an archive.
+    """
+    if isBinaryFile(fileobj):
+        raw = fileobj
+    elif hasattr(fileobj, 'buffer') and hasattr(fileobj.buffer, 'peek'):
+        raw = fileobj.buffer
+    else:
+        return None
+
+    if hasattr(raw, 'peek'):
+        head = raw.peek(len(MAGIC))[:len(MAGIC)]
+        if 0 < len(head) < len(MAGIC) and MAGIC.startswith(head):
+            # a pipe may have fewer bytes buffered than asked for, and peek
+            # will not read more, so read the rest and put them back in front
+            head = b''
+            while len(head) < len(MAGIC):
+                more = raw.read(len(MAGIC) - len(head))
+                if not more:
+                    break
+                head += more
+            if head != MAGIC:
+                raise ValueError('not a trajectory archive or ECI data')
+            return io.BufferedReader(PrefixedStream(head, raw))
+    elif raw.seekable():
+        pos = raw.tell()
+        head = raw.read(len(MAGIC))
+        raw.seek(pos)
+    else:
+        return raw
+    return raw if head == MAGIC else None
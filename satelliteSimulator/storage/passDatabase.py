@@ -0,0 +1,301 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: passDatabase
+    :platform: Unix
+    :synopsis: Indexes station passes by time for fast lookups
+
+.. moduleauthor:: Henry Mortimer <henry@morti.net>
+
+A database holds the passes found by the passTimes command for many
+satellites and stations. Passes are closed intervals from rise to set, kept
+in a centred interval tree: each node holds the passes containing its
+centre time, sorted by rise and by set, and the passes entirely before or
+after the centre go to its children. Finding the passes in progress at a
+time visits one node per level and reads only the matching passes, so
+queries take O(log n + k) for k results. Passes overlapping a window are
+those in progress at its start plus those rising inside it, found with a
+binary search of the rise times.
+
+A tree is built for all the passes and, when first queried, for each
+station. Databases are saved as ``.npz`` files holding just the passes; the
+trees are rebuilt when loaded.
+"""
+
+from ..utils import readData
+import numpy as np
+
+PASS_DTYPE = np.dtype([('satellite', 'U32'),
+                       ('lat', np.float64),
+                       ('lon', np.float64),
+                       ('rise', np.float64),
+                       ('set', np.float64),
+                       ('duration', np.float64),
+                       ('riseElevation', np.float64),
+                       ('riseAzimuth', np.float64)])
+
+LEAFSIZE = 16  # nodes with at most this many passes are not split
+
+
+class IntervalTree(object):
+    """A static centred interval tree over closed intervals.
+
+    Args:
+        starts, ends: Array (float): The interval bounds.
+    """
+
+    def __init__(self, starts, ends):
+        self.starts = np.asarray(starts, dtype=float)
+        self.ends = np.asarray(ends, dtype=float)
+        # node arrays: centre, child indices, and the intervals containing
+        # the centre sorted by start and by end
+        self.centres = []
+        self.children = []
+        self.byStart = []
+        self.byEnd = []
+        self.root = self._build(np.arange(len(self.starts)))
+
+    def _build(self, idx):
+        if len(idx) == 0:
+            return -1
+        node = len(self.centres)
+        self.centres.append(0.0)
+        self.children.append((-1, -1))
+        self.byStart.append(None)
+        self.byEnd.append(None)
+
+        if len(idx) <= LEAFSIZE:
+            # small enough to check every interval
+            self.centres[node] = np.nan
+            self.byStart[node] = idx
+            return node
+
+        starts, ends = self.starts[idx], self.ends[idx]
+        centre = np.median(np.concatenate([starts, ends]))
+        here = (starts <= centre) & (ends >= centre)
+        left = self._build(idx[ends < centre])
+        right = self._build(idx[starts > centre])
+
+        held = idx[here]
+        self.centres[node] = centre
+        self.children[node] = (left, right)
+        self.byStart[node] = held[np.argsort(self.starts[held], kind='stable')]
+        self.byEnd[node] = held[np.argsort(-self.ends[held], kind='stable')]
+        return node
+
+    def stab(self, t):
+        """Finds the intervals containing a time
+
+        Args:
+            t: float: The time.
+
+        Returns:
+            Array (int): The interval indices, in no particular order.
+        """
+        found = []
+        node = self.root
+        while node != -1:
+            centre = self.centres[node]
+            if np.isnan(centre):
+                held = self.byStart[node]
+                found.append(held[(self.starts[held] <= t) & (self.ends[held] >= t)])
+                break
+            if t <= centre:
+                held = self.byStart[node]
+                # every interval here ends after t, so keep those started
+                count = np.searchsorted(self.starts[held], t, 'right')
+                found.append(held[:count])
+                node = self.children[node][0]
+            else:
+                held = self.byEnd[node]
+                count = np.searchsorted(-self.ends[held], -t, 'right')
+                found.append(held[:count])
+                node = self.children[node][1]
+        if not found:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate(found)
+
+
+class PassDatabase(object):
+    """Station passes for many satellites, indexed by time.
+
+    Args:
+        passes: Array: PASS_DTYPE records.
+    """
+
+    def __init__(self, passes=None):
+        if passes is None:
+            passes = np.empty(0, dtype=PASS_DTYPE)
+        passes = np.asarray(passes, dtype=PASS_DTYPE)
+        order = np.lexsort((passes['satellite'], passes['set'], passes['rise']))
+        self.passes = passes[order]
+        self._indices = {None: self._buildIndex(np.arange(len(self.passes)))}
+
+    def __len__(self):
+        return len(self.passes)
+
+    def add(self, satellite, passes):
+        """Gets a database with more passes added
+
+        Args:
+            satellite: string: The satellite name.
+
+            passes: Array: Rows written by the passTimes command: station
+            lat and lon, rise time, set time, duration and rise elevation
+            and azimuth.
+
+        Returns:
+            PassDatabase: A new database.
+        """
+        return PassDatabase(np.concatenate([self.passes, passRecords(satellite, passes)]))
+
+    def satellites(self):
+        """Lists the satellites with passes
+
+        Returns:
+            Array (string): The names.
+        """
+        return sorted(set(self.passes['satellite']))
+
+    def stations(self):
+        """Lists the stations with passes
+
+        Returns:
+            Array (tuple): The station latitudes and longitudes.
+        """
+        return sorted(set(zip(self.passes['lat'].tolist(), self.passes['lon'].tolist())))
+
+    def at(self, t, station=None):
+        """Finds the passes in progress at a time
+
+        Args:
+            t: float: The time (seconds).
+
+            station: Tuple: Only passes over this station latitude and
+            longitude.
+
+        Returns:
+            Array: PASS_DTYPE records ordered by rise time.
+        """
+        rows, rises, tree = self._index(station)
+        return self.passes[rows[np.sort(tree.stab(t))]]
+
+    def visible(self, t, station):
+        """Lists the satellites a station can see at a time
+
+        Args:
+            t: float: The time (seconds).
+
+            station: Tuple: The station latitude and longitude.
+
+        Returns:
+            Array (string): The satellite names.
+        """
+        return sorted(set(self.at(t, station)['satellite']))
+
+    def overlapping(self, start, end, station=None):
+        """Finds the passes overlapping a window
+
+        Args:
+            start, end: float: The window, inclusive (seconds).
+
+            station: Tuple: Only passes over this station.
+
+        Returns:
+            Array: PASS_DTYPE records ordered by rise time.
+        """
+        rows, rises, tree = self._index(station)
+        # in progress at the start, or rising during the window
+        first = np.searchsorted(rises, start, 'right')
+        last = np.searchsorted(rises, end, 'right')
+        found = np.concatenate([np.sort(tree.stab(start)), np.arange(first, last)])
+        return self.passes[rows[found]]
+
+    def nextPass(self, t, station=None, satellite=None):
+        """Finds the first pass to rise after a time
+
+        Args:
+            t: float: The time (seconds).
+
+            station: Tuple: Only passes over this station.
+
+            satellite: string: Only passes of this satellite.
+
+        Returns:
+            Array: The PASS_DTYPE record, or None if there are no more
+            passes.
+        """
+        rows, rises, tree = self._index(station)
+        first = np.searchsorted(rises, t, 'right')
+        for row in rows[first:]:
+            if satellite is None or self.passes['satellite'][row] == satellite:
+                return self.passes[row]
+        return None
+
+    def save(self, fileobj):
+        """Saves the passes
+
+        Args:
+            fileobj: A binary file handle or path.
+        """
+        np.savez_compressed(fileobj, passes=self.passes)
+
+    @classmethod
+    def load(cls, fileobj):
+        """Loads passes saved by save
+
+        Args:
+            fileobj: A binary file handle or path.
+
+        Returns:
+            PassDatabase.
+        """
+        with np.load(fileobj) as data:
+            return cls(data['passes'])
+
+    def _index(self, station):
+        # rows of self.passes in rise order, their rise times and a tree
+        # over them
+        key = None if station is None else (float(station[0]), float(station[1]))
+        if key not in self._indices:
+            rows = np.flatnonzero((self.passes['lat'] == key[0]) & (self.passes['lon'] == key[1]))
+            self._indices[key] = self._buildIndex(rows)
+        return self._indices[key]
+
+    def _buildIndex(self, rows):
+        passes = self.passes[rows]
+        return (rows, passes['rise'], IntervalTree(passes['rise'], passes['set']))
+
+
+def passRecords(satellite, passes):
+    """Labels pass rows with a satellite
+
+    Args:
+        satellite: string: The satellite name.
+
+        passes: Array: Rows written by the passTimes command.
+
+    Returns:
+        Array: PASS_DTYPE records.
+    """
+    table = np.asarray(passes, dtype=float).reshape(-1, 7)
+    records = np.zeros(len(table), dtype=PASS_DTYPE)
+    records['satellite'] = satellite
+    for i, name in enumerate(PASS_DTYPE.names[1:]):
+        records[name] = table[:, i]
+    return records
+
+
+def readPasses(satellites):
+    """Builds a database from pass files
+
+    Args:
+        satellites: Array: (satellite name, file handle) pairs, each file
+        written by the passTimes command.
+
+    Returns:
+        PassDatabase.
+    """
+    records = [passRecords(name, readData(f)) for name, f in satellites]
+    return PassDatabase(np.concatenate(records) if records else None)
@@ -0,0 +1,299 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: propogationCache
+    :platform: Unix
+    :synopsis: Caches propagation results on disk
+
+.. moduleauthor:: Henry Mortimer <henry@morti.net>
+
+Results are keyed by a hash of everything that determines them: the initial
+state, the algorithm, the step size and count, and the source of the code
+that computes them. Each result is a trajectory store in its own directory
+named after the key, so a hit memory maps the saved chunks rather than
+propagating again.
+
+Entries are written to a temporary directory and renamed into place when
+complete, so a half written result is never served and several processes
+can share a cache. The modification time of an entry records when it was
+last used, and the least recently used entries are deleted whenever the
+cache grows past its size limit.
+"""
+
+from .trajectoryStore import TrajectoryStore
+from ..propogation.keplerianPropogation import propogateOrbitSteps
+from ..propogation.rk4 import rk4MonoPropogationSteps, rk4j2PropogationSteps
+from ..utils import getCacheDir, chunked, normaliseAngle, normalisedAtan2, ECI_DTYPE
+from .. import data
+import numpy as np
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import time
+
+PROPOGATORS = {'kep': propogateOrbitSteps,
+               'rk4': rk4MonoPropogationSteps,
+               'j2': rk4j2PropogationSteps}
+MAXBYTES = 1 << 30  # 1 GiB
+TRAJECTORY = 'trajectory'
+METAFILE = 'meta.json'
+
+# the modules whose source decides the propagated values, relative to the
+# package directory
+SOURCES = ('propogation/keplerianPropogation.py', 'propogation/rk4.py', 'solveKepler.py',
+           'converters/cart2kep.py', 'converters/kep2cart.py')
+# the constants and helpers they use from data and utils, which hold much
+# else that does not change the results
+CONSTANTS = ('GM', 'AEGMA96', 'C20')
+HELPERS = (normaliseAngle, normalisedAtan2)
+
+_codeVersion = None
+
+
+def codeVersion():
+    """Gets a hash of the source of the propagation code
+
+    Returns:
+        string: A hex digest.
+    """
+    global _codeVersion
+    if _codeVersion is None:
+        package = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        digest = hashlib.sha256()
+        for source in SOURCES:
+            with open(os.path.join(package, source), 'rb') as f:
+                digest.update(source.encode('utf-8') + b'\0' + f.read())
+        for name in CONSTANTS:
+            digest.update('{0}={1!r}\0'.format(name, getattr(data, name)).encode('utf-8'))
+        for helper in HELPERS:
+            digest.update(inspect.getsource(helper).encode('utf-8'))
+        _codeVersion = digest.hexdigest()
+    return _codeVersion
+
+
+def cacheKey(algorithm, R, V, timestep, steps, baseTime, start=0):
+    """Hashes the inputs of a propagation
+
+    Args:
+        algorithm: string: One of PROPOGATORS.
+
+        R, V: Array (float): The initial position and velocity.
+
+        timestep: float: The step size in seconds.
+
+        steps: int: The number of steps.
+
+        baseTime: float: The start time in seconds.
+
+        start: int: The step R and V are at.
+
+    Returns:
+        string: A hex digest.
+    """
+    # repr round trips floats exactly
+    inputs = [algorithm, [repr(float(x)) for x in R], [repr(float(x)) for x in V],
+              repr(float(timestep)), int(steps), repr(float(baseTime)), int(start), codeVersion()]
+    return hashlib.sha256(json.dumps(inputs).encode('utf-8')).hexdigest()
+
+
+class PropogationCache(object):
+    """An on disk cache of propagated trajectories.
+
+    Args:
+        path: string: The cache directory, by default propogation in the
+        pySpace cache directory.
+
+        maxBytes: int: The size the cache is trimmed to.
+    """
+
+    def __init__(self, path=None, maxBytes=MAXBYTES):
+        self.path = path or getCacheDir('propogation')
+        self.maxBytes = maxBytes
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+
+    def __contains__(self, key):
+        return os.path.isdir(os.path.join(self.path, key))
+
+    def chunks(self, key):
+        """Gets a cached trajectory as memory mapped chunks
+
+        Args:
+            key: string: The key from cacheKey.
+
+        Returns:
+            Generator: ECI data for each chunk.
+
+        Raises:
+            KeyError: The key is not cached.
+        """
+        directory = os.path.join(self.path, key)
+        try:
+            # mark it as recently used
+            os.utime(directory)
+        except FileNotFoundError:
+            raise KeyError(key)
+        return TrajectoryStore(directory).chunks(TRAJECTORY)
+
+    def get(self, key):
+        """Gets a cached trajectory
+
+        Args:
+            key: string: The key from cacheKey.
+
+        Returns:
+            Array: ECI data.
+
+        Raises:
+            KeyError: The key is not cached.
+        """
+        parts = list(self.chunks(key))
+        if not parts:
+            return np.empty(0, dtype=ECI_DTYPE)
+        return np.concatenate(parts)
+
+    def put(self, key, blocks, meta=None):
+        """Saves a trajectory as it is produced
+
+        Args:
+            key: string: The key from cacheKey.
+
+            blocks: Iterable: Blocks of ECI data.
+
+            meta: Dict: Information saved with the entry for reference.
+
+        Returns:
+            Generator: The blocks, each yielded once it has been saved. The
+            entry is only added once the generator is exhausted.
+        """
+        tmp = os.path.join(self.path, '.{0}.{1}.tmp'.format(key, os.getpid()))
+        store = TrajectoryStore(tmp)
+        try:
+            for block in blocks:
+                store.append(TRAJECTORY, block)
+                yield block
+            with open(os.path.join(tmp, METAFILE), 'w') as f:
+                json.dump(dict(meta or {}, key=key, created=time.time()), f)
+            try:
+                os.rename(tmp, os.path.join(self.path, key))
+            except OSError:
+                # another process saved the same entry first
+                pass
+        finally:
+            if os.path.isdir(tmp):
+                shutil.rmtree(tmp)
+        self.evict()
+
+    def entries(self):
+        """Lists the cached entries
+
+        Returns:
+            Array: (last used time, bytes, key) for each entry, least
+            recently used first.
+        """
+        entries = []
+        for key in os.listdir(self.path):
+            directory = os.path.join(self.path, key)
+            if key.startswith('.') or not os.path.isdir(directory):
+                continue
+            size = 0
+            for root, dirs, files in os.walk(directory):
+                size += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+            entries.append((os.path.getmtime(directory), size, key))
+        return sorted(entries)
+
+    def evict(self):
+        """Deletes the least recently used entries until the cache fits in
+        maxBytes"""
+        entries = self.entries()
+        total = sum(e[1] for e in entries)
+        for used, size, key in entries:
+            if total <= self.maxBytes:
+                break
+            shutil.rmtree(os.path.join(self.path, key), ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        """Deletes every entry"""
+        for used, size, key in self.entries():
+            shutil.rmtree(os.path.join(self.path, key), ignore_errors=True)
+
+
+def propogationBlocks(algorithm, R, V, timestep, steps, baseTime, cache=None, start=0):
+    """Propagates an orbit in blocks, using the cache when possible
+
+    Args:
+        algorithm: string: One of PROPOGATORS.
+
+        R, V: Array (float): The initial position and velocity.
+
+        timestep: float: The step size in seconds.
+
+        steps: int: The number of steps.
+
+        baseTime: float: The start time in seconds.
+
+        cache: PropogationCache: The cache to use, or None to always
+        propagate.
+
+        start: int: The number of steps R and V are after baseTime, when
+        continuing an earlier run.
+
+    Returns:
+        Generator: Blocks of ECI data, starting with the initial state.
+    """
+    if algorithm not in PROPOGATORS:
+        raise ValueError('unknown algorithm {0!r}'.format(algorithm))
+
+    if cache is not None:
+        key = cacheKey(algorithm, R, V, timestep, steps, baseTime, start)
+        if key in cache:
+            # map every chunk before yielding any, so that an entry evicted by
+            # another process falls back to propagating rather than repeating
+            # the samples already sent. Mapped chunks stay readable if their
+            # files are deleted afterwards.
+            try:
+                chunks = list(cache.chunks(key))
+            except (KeyError, OSError):
+                chunks = None
+            if chunks is not None:
+                for chunk in chunks:
+                    yield chunk
+                return
+
+    states = PROPOGATORS[algorithm](R, V, timestep, steps, baseTime, start)
+    blocks = (np.array(block, dtype=ECI_DTYPE) for block in chunked(states))
+    if cache is not None:
+        blocks = cache.put(key, blocks, {'algorithm': algorithm, 'timestep': timestep,
+                                         'steps': steps, 'baseTime': baseTime, 'start': start})
+    for block in blocks:
+        yield block
+
+
+def cachedPropogation(algorithm, R, V, timestep, steps, baseTime, cache=True):
+    """Propagates an orbit, returning the cached result if there is one
+
+    Args:
+        algorithm: string: 'kep', 'rk4' or 'j2'.
+
+        R, V: Array (float): The initial position and velocity.
+
+        timestep: float: The step size in seconds.
+
+        steps: int: The number of steps.
+
+        baseTime: float: The start time in seconds.
+
+        cache: True for the default cache, a PropogationCache, or False to
+        always propagate.
+
+    Returns:
+        Array: ECI data.
+    """
+    if cache is True:
+        cache = PropogationCache()
+    parts = list(propogationBlocks(algorithm, R, V, timestep, steps, baseTime, cache or None))
+    return np.concatenate(parts)
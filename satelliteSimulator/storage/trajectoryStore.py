@@ -0,0 +1,271 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: trajectoryStore
+    :platform: Unix
+    :synopsis: Stores many trajectories on disk indexed by time
+
+.. moduleauthor:: Henry Mortimer <henry@morti.net>
+
+A store is a directory holding one sub directory per satellite. Each
+trajectory is split into chunks of a fixed number of samples saved as
+``.npy`` files, and ``index.json`` records the first and last time of every
+chunk. Queries binary search the chunk bounds and then the sample times
+inside the chunks they touch, so only those chunks are ever read.
+"""
+
+from collections import OrderedDict
+from ..interpolation import hermite
+from ..utils import ECI_DTYPE, BLOCKSIZE
+import numpy as np
+import json
+import os
+import re
+
+INDEXFILE = 'index.json'
+MAXCHUNKS = 16  # chunks kept open at once
+NAMEPATTERN = re.compile(r'^[A-Za-z0-9_.\-]+$')
+
+
+class TrajectoryStore(object):
+    """A time indexed store of satellite trajectories.
+
+    Args:
+        path: string: The directory of the store. It is created if it does
+        not exist.
+
+        chunkSize: int: The number of samples in each chunk file.
+
+        maxChunks: int: The number of chunks kept resident in memory. The
+        least recently used chunk is dropped when more are touched.
+    """
+
+    def __init__(self, path, chunkSize=BLOCKSIZE, maxChunks=MAXCHUNKS):
+        self.path = path
+        self.chunkSize = chunkSize
+        self.maxChunks = maxChunks
+        self._chunks = OrderedDict()
+        self._bounds = {}
+
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        indexPath = os.path.join(path, INDEXFILE)
+        if os.path.exists(indexPath):
+            with open(indexPath) as f:
+                self._index = json.load(f)
+        else:
+            self._index = {}
+
+    def satellites(self):
+        """Lists the trajectories in the store
+
+        Returns:
+            Array (string): The satellite names.
+        """
+        return sorted(self._index)
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def span(self, name):
+        """Gets the first and last time of a trajectory
+
+        Args:
+            name: string: The satellite name.
+
+        Returns:
+            Tuple: The first and last sample times (seconds).
+        """
+        starts, ends = self._chunkBounds(name)
+        return (starts[0], ends[-1])
+
+    def write(self, name, data):
+        """Replaces a trajectory with new data
+
+        Args:
+            name: string: The satellite name.
+
+            data: Array: ECI data as returned by readECIData.
+        """
+        self.remove(name)
+        self.append(name, data)
+
+    def append(self, name, data):
+        """Appends samples to the end of a trajectory, creating it if needed
+
+        Args:
+            name: string: The satellite name.
+
+            data: Array: ECI data as returned by readECIData. The times must
+            be increasing and after the current end of the trajectory.
+        """
+        if not NAMEPATTERN.match(name):
+            raise ValueError('invalid satellite name {0!r}'.format(name))
+        data = np.asarray(data, dtype=ECI_DTYPE)
+        if len(data) == 0:
+            return
+        if np.any(np.diff(data['time']) <= 0):
+            raise ValueError('trajectory times must be strictly increasing')
+
+        chunks = self._index.setdefault(name, {'chunks': []})['chunks']
+        if chunks and data['time'][0] <= chunks[-1][2]:
+            raise ValueError('appended data must start after {0}'.format(chunks[-1][2]))
+
+        directory = os.path.join(self.path, name)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        if chunks and chunks[-1][3] < self.chunkSize:
+            # top up the last chunk before starting new ones
+            last = len(chunks) - 1
+            free = self.chunkSize - chunks[-1][3]
+            chunk = np.concatenate([self._chunk(name, last), data[:free]])
+            self._saveChunk(name, last, chunk)
+            data = data[free:]
+
+        for start in range(0, len(data), self.chunkSize):
+            self._saveChunk(name, len(chunks), data[start:start + self.chunkSize])
+
+        self._saveIndex()
+
+    def remove(self, name):
+        """Deletes a trajectory from the store
+
+        Args:
+            name: string: The satellite name.
+        """
+        if name not in self._index:
+            return
+        for chunk in self._index[name]['chunks']:
+            os.remove(os.path.join(self.path, name, chunk[0]))
+        del self._index[name]
+        self._forget(name)
+        os.rmdir(os.path.join(self.path, name))
+        self._saveIndex()
+
+    def range(self, name, start, end):
+        """Gets all samples between two times
+
+        Args:
+            name: string: The satellite name.
+
+            start, end: float: The window to return, inclusive (seconds).
+
+        Returns:
+            Array: ECI data for the samples in the window.
+        """
+        starts, ends = self._chunkBounds(name)
+        first = np.searchsorted(ends, start, 'left')
+        last = np.searchsorted(starts, end, 'right')
+
+        parts = []
+        for i in range(first, last):
+            chunk = self._chunk(name, i)
+            lo = np.searchsorted(chunk['time'], start, 'left')
+            hi = np.searchsorted(chunk['time'], end, 'right')
+            parts.append(chunk[lo:hi])
+        if not parts:
+            return np.empty(0, dtype=ECI_DTYPE)
+        return np.concatenate(parts)
+
+    def chunks(self, name):
+        """Iterates over a whole trajectory one chunk at a time
+
+        Args:
+            name: string: The satellite name.
+
+        Returns:
+            Generator: Memory mapped ECI data for each chunk.
+        """
+        for i in range(len(self._chunkBounds(name)[0])):
+            yield self._chunk(name, i)
+
+    def at(self, name, times):
+        """Gets the state of a satellite at arbitrary times.
+
+        Times that fall between samples are interpolated with a cubic hermite
+        spline through the neighbouring positions and velocities.
+
+        Args:
+            name: string: The satellite name.
+
+            times: Array (float): The times to evaluate (seconds).
+
+        Returns:
+            Array: ECI data with one record per time, in the order given.
+        """
+        times = np.atleast_1d(np.asarray(times, dtype=float))
+        starts, ends = self._chunkBounds(name)
+        if len(times) and (times.min() < starts[0] or times.max() > ends[-1]):
+            raise ValueError('times outside of trajectory span {0} - {1}'.format(starts[0], ends[-1]))
+
+        result = np.empty(len(times), dtype=ECI_DTYPE)
+        result['time'] = times
+        chunkIdx = np.searchsorted(starts, times, 'right') - 1
+
+        for i in np.unique(chunkIdx):
+            chunk = self._chunk(name, i)
+            if i + 1 < len(starts):
+                # include the next sample so queries in the gap between
+                # chunks have a right hand neighbour
+                chunk = np.concatenate([chunk, self._chunk(name, i + 1)[:1]])
+            mask = chunkIdx == i
+            t = times[mask]
+            if len(chunk) == 1:
+                result[mask] = chunk[0]
+                continue
+            j = np.searchsorted(chunk['time'], t, 'right') - 1
+            j = np.clip(j, 0, len(chunk) - 2)
+            left = chunk[j]
+            right = chunk[j + 1]
+            R, V = hermite(left['time'], left['R'], left['V'],
+                           right['time'], right['R'], right['V'], t)
+            result['R'][mask] = R
+            result['V'][mask] = V
+
+        return result
+
+    def _chunkBounds(self, name):
+        if name not in self._index:
+            raise KeyError(name)
+        if name not in self._bounds:
+            chunks = self._index[name]['chunks']
+            self._bounds[name] = (np.array([c[1] for c in chunks]),
+                                  np.array([c[2] for c in chunks]))
+        return self._bounds[name]
+
+    def _chunk(self, name, i):
+        key = (name, i)
+        if key in self._chunks:
+            self._chunks.move_to_end(key)
+            return self._chunks[key]
+        fname = self._index[name]['chunks'][i][0]
+        chunk = np.load(os.path.join(self.path, name, fname), mmap_mode='r')
+        self._chunks[key] = chunk
+        while len(self._chunks) > self.maxChunks:
+            self._chunks.popitem(last=False)
+        return chunk
+
+    def _saveChunk(self, name, i, data):
+        chunks = self._index[name]['chunks']
+        fname = '{0:08d}.npy'.format(i)
+        self._chunks.pop((name, i), None)
+        np.save(os.path.join(self.path, name, fname), np.ascontiguousarray(data))
+        entry = [fname, float(data['time'][0]), float(data['time'][-1]), len(data)]
+        if i < len(chunks):
+            chunks[i] = entry
+        else:
+            chunks.append(entry)
+        self._bounds.pop(name, None)
+
+    def _forget(self, name):
+        for key in [k for k in self._chunks if k[0] == name]:
+            del self._chunks[key]
+        self._bounds.pop(name, None)
+
+    def _saveIndex(self):
+        indexPath = os.path.join(self.path, INDEXFILE)
+        with open(indexPath + '.tmp', 'w') as f:
+            json.dump(self._index, f)
+        os.replace(indexPath + '.tmp', indexPath)
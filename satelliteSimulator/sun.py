@@ -0,0 +1,37 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: sun
+    :platform: Unix
+    :synopsis: A low precision analytic Sun ephemeris
+
+.. moduleauthor:: Henry Mortimer <henry@morti.net>
+
+The series from the Astronomical Almanac, good to about 0.01 degrees
+between 1950 and 2050. That is far better than shadow boundaries need: the
+Sun moves 0.01 degrees in 36 seconds, but a satellite crosses the edge of
+the Earth's shadow in a few seconds.
+"""
+
+from .data import AU, BASETIME
+import numpy as np
+
+
+def sunPosition(time):
+    """Finds the position of the Sun in ECI coordinates
+
+    Args:
+        time: Array (float): Times (seconds since the Unix epoch).
+
+    Returns:
+        Array (float): The positions (km), with shape (..., 3).
+    """
+    n = (np.asarray(time, dtype=float) - BASETIME)/86400  # days since J2000
+    L = np.radians(280.460 + 0.9856474*n)  # mean longitude
+    g = np.radians(357.528 + 0.9856003*n)  # mean anomaly
+    λ = L + np.radians(1.915*np.sin(g) + 0.020*np.sin(2*g))  # ecliptic longitude
+    ε = np.radians(23.439 - 0.0000004*n)  # obliquity of the ecliptic
+    r = (1.00014 - 0.01671*np.cos(g) - 0.00014*np.cos(2*g))*AU
+
+    return np.stack([r*np.cos(λ), r*np.cos(ε)*np.sin(λ), r*np.sin(ε)*np.sin(λ)], axis=-1)
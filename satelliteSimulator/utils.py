@@ -11,8 +11,43 @@
 """
 
 import math
-import csv
-from distutils.util import strtobool
+import os
+from itertools import islice
+import numpy as np
+
+BLOCKSIZE = 8640  # one day of 10 second steps
+
+ECI_DTYPE = np.dtype([('R', np.float64, (3,)),
+                      ('V', np.float64, (3,)),
+                      ('time', np.float64)])
+
+GRNDTRCK_DTYPE = np.dtype([('lat', np.float64),
+                           ('lon', np.float64),
+                           ('height', np.float64),
+                           ('visible', np.bool_)])
+
+TRUTHY = ('true', '1', '1.0', 'yes', 'y', 't', 'on')
+FALSY = ('false', '0', '0.0', 'no', 'n', 'f', 'off')
+
+CACHEDIR_ENV = 'PYSPACE_CACHE_DIR'
+
+
+def getCacheDir(name):
+    """Gets a directory for cached files, creating it if needed.
+
+    The cache lives in ~/.cache/pySpace unless the PYSPACE_CACHE_DIR
+    environment variable points somewhere else.
+
+    Args:
+        name: string: The sub directory for one kind of cached file.
+
+    Returns:
+        string: The directory path.
+    """
+    root = os.environ.get(CACHEDIR_ENV) or os.path.join(os.path.expanduser('~'), '.cache', 'pySpace')
+    path = os.path.join(root, name)
+    os.makedirs(path, exist_ok=True)
+    return path
 
 
 def normaliseAngle(angle):
@@ -45,20 +80,158 @@ def normalisedAtan2(numerator, denominator):
     return result
 
 
-def writeData(data, csvfile):
+def writeData(data, csvfile, precision=None):
     """Writes data to a file as CSV
-    
+
+    Whole blocks of rows are formatted with a single string operation rather
+    than one ``csv.writer.writerow`` call per row.
+
     Args:
-        data: Array: The data to be written.
-        
-        csvfile: File handle.
-        
+        data: Array: The data to be written. Either a numpy array (plain 2d or
+        one of the structured trajectory dtypes) or a list of rows.
+
+        csvfile: File handle. If it is a binary handle the data is written as
+        a compressed trajectory archive instead.
+
+        precision: int: Number of significant figures to write floats with.
+        Defaults to None which writes the shortest representation that reads
+        back to the same float.
+
     Returns:
         None
     """
-    writer = csv.writer(csvfile)
-    for row in data:
-        writer.writerow(flattenTuple(row))
+    writer = DataWriter(csvfile, precision)
+    writer.write(data)
+    writer.close()
+
+
+class DataWriter(object):
+    """Writes blocks of data to a file as they are produced, so that the
+    next command in a pipeline can start on them straight away.
+
+    Args:
+        csvfile: File handle. If it is a binary handle the data is written as
+        a compressed trajectory archive instead of CSV.
+
+        precision: int: Number of significant figures to write floats with,
+        see writeData.
+
+        append: bool: Add to the end of an existing archive rather than
+        starting a new one. CSV is appended to by opening the file with 'a'.
+    """
+
+    def __init__(self, csvfile, precision=None, append=False):
+        # imported here as the archive module depends on this one
+        from .storage.archive import isBinaryFile, ArchiveWriter
+        self.csvfile = csvfile
+        self.precision = precision
+        self._archive = None
+        if isBinaryFile(csvfile):
+            self._archive = ArchiveWriter.extend(csvfile) if append else ArchiveWriter(csvfile)
+
+    def write(self, data):
+        """Writes a block of rows
+
+        Args:
+            data: Array: The data to be written, see writeData.
+        """
+        if self._archive is not None:
+            if getattr(data, 'dtype', None) != ECI_DTYPE:
+                data = toECIArray(toTable(data))
+            self._archive.write(data)
+        else:
+            writeTable(toTable(data), self.csvfile, self.precision)
+        self.csvfile.flush()
+
+    def close(self):
+        """Finishes the file. The file handle is flushed but not closed."""
+        if self._archive is not None:
+            self._archive.close()
+        self.csvfile.flush()
+
+
+def writeTable(table, csvfile, precision=None):
+    """Formats a 2d table as CSV
+
+    Args:
+        table: Array: A 2d numpy array as returned by toTable.
+
+        csvfile: File handle.
+
+        precision: int: Number of significant figures, see writeData.
+    """
+    if table.shape[0] == 0:
+        return
+
+    fmt = ','.join(columnFormat(table[:, i], precision)
+                   for i in range(table.shape[1])) + '\n'
+    for start in range(0, table.shape[0], BLOCKSIZE):
+        block = table[start:start + BLOCKSIZE]
+        csvfile.write((fmt * block.shape[0]) % tuple(block.ravel().tolist()))
+
+
+def toTable(data):
+    """Converts data into a 2d array with one column per csv field.
+
+    Structured arrays are split into their fields, with vector fields taking
+    one column per component. Lists of nested rows (e.g. the (R, V, time)
+    tuples returned by the propogators) are flattened with flattenTuple.
+
+    Args:
+        data: Array: A numpy array or a list of rows.
+
+    Returns:
+        Array: A 2d numpy array. Numeric data keeps its dtype, mixed data is
+        stored as objects.
+    """
+    if not isinstance(data, np.ndarray):
+        try:
+            arr = np.asarray(data)
+        except ValueError:
+            arr = None
+        if arr is None or arr.ndim != 2 or arr.dtype.kind not in 'biuf':
+            rows = [flattenTuple(row) for row in data]
+            if not rows:
+                return np.empty((0, 0), dtype=object)
+            return np.array(rows, dtype=object).reshape(len(rows), -1)
+        data = arr
+
+    if data.dtype.names is None:
+        return data.reshape(data.shape[0], -1) if data.ndim != 2 else data
+
+    if len(data) == 0:
+        return np.empty((0, 0), dtype=object)
+    columns = [data[name].reshape(data.shape[0], -1) for name in data.dtype.names]
+    if len(set(c.dtype for c in columns)) == 1:
+        return np.hstack(columns)
+    table = np.empty((data.shape[0], sum(c.shape[1] for c in columns)), dtype=object)
+    i = 0
+    for c in columns:
+        table[:, i:i + c.shape[1]] = c
+        i += c.shape[1]
+    return table
+
+
+def columnFormat(column, precision):
+    """Picks the printf style format for a column of a table
+
+    Args:
+        column: Array: The column of data.
+
+        precision: int: Significant figures for floats or None.
+
+    Returns:
+        String: The format specifier.
+    """
+    if precision is None:
+        return '%s'
+    if column.dtype.kind in 'bUS' or (column.dtype.kind == 'O' and len(column)
+                                      and isinstance(column[0], (bool, np.bool_, str))):
+        return '%s'
+    if column.dtype.kind in 'iu' or (column.dtype.kind == 'O' and len(column)
+                                     and isinstance(column[0], (int, np.integer))):
+        return '%d'
+    return '%.{0}g'.format(precision)
 
 
 def flattenTuple(tpl):
@@ -81,6 +254,79 @@ def flattenTuple(tpl):
     return res
 
 
+def chunked(iterable, size=BLOCKSIZE):
+    """Splits an iterable into lists of a fixed size
+
+    Args:
+        iterable: The items to split.
+
+        size: int: The maximum number of items per list.
+
+    Returns:
+        Generator: Lists of at most size items.
+    """
+    iterator = iter(iterable)
+    while True:
+        block = list(islice(iterator, size))
+        if not block:
+            return
+        yield block
+
+
+def readBlocks(csvfile, blockSize=BLOCKSIZE):
+    """Reads lines from a file in fixed size blocks
+
+    Args:
+        csvfile: File handle
+
+        blockSize: int: The maximum number of lines per block.
+
+    Returns:
+        Generator: Lists of at most blockSize lines.
+    """
+    return chunked(csvfile, blockSize)
+
+
+def alignBlocks(*streams):
+    """Zips streams of blocks, splitting blocks so that the blocks yielded
+    together always have the same length. Stops at the end of the shortest
+    stream like zip.
+
+    Args:
+        streams: Generators of arrays.
+
+    Returns:
+        Generator: Tuples with one block from each stream.
+    """
+    iterators = [iter(s) for s in streams]
+    pending = [None]*len(iterators)
+    while True:
+        for i, iterator in enumerate(iterators):
+            while pending[i] is None or len(pending[i]) == 0:
+                try:
+                    pending[i] = next(iterator)
+                except StopIteration:
+                    return
+        size = min(len(p) for p in pending)
+        yield tuple(p[:size] for p in pending)
+        pending = [p[size:] for p in pending]
+
+
+def parseBlock(lines, ncols=None):
+    """Parses a block of csv lines into a 2d float array
+
+    Args:
+        lines: Array (string): Lines of comma separated numbers.
+
+        ncols: int: Only parse the first ncols columns.
+
+    Returns:
+        Array: A 2d numpy array of floats.
+    """
+    usecols = None if ncols is None else range(ncols)
+    return np.loadtxt(lines, delimiter=',', ndmin=2, usecols=usecols)
+
+
 def readData(csvfile):
     """Reads data from a csv file and parses all data as floats
     
@@ -88,36 +334,103 @@ def readData(csvfile):
         csvfile: File handle
         
     Returns:
-        Array: List of parsed lines
+        Array: 2d numpy array with one row per line
     """
-    result = []
-    reader = csv.reader(csvfile)
-    for row in reader:
-        parsedData = []
-        for item in row:
-            parsedData.append(float(item))
-        result.append(parsedData)
-    return result
+    blocks = [parseBlock(lines) for lines in readBlocks(csvfile)]
+    if not blocks:
+        return np.empty((0, 0))
+    return np.concatenate(blocks)
+
 
+def toECIArray(table):
+    """Views a 2d float array with 7 columns as ECI records
 
-def readECIData(csvfile):
-    """Parses ECI data from a CVS file
+    Args:
+        table: Array: Rows of x, y, z, u, v, w, time.
+
+    Returns:
+        Array: A structured array with dtype ECI_DTYPE.
+    """
+    table = np.ascontiguousarray(table, dtype=np.float64)
+    return table.reshape(-1, 7).view(ECI_DTYPE).reshape(-1)
+
+
+def readECIData(csvfile, start=None, end=None):
+    """Parses ECI data from a CVS file or trajectory archive
     
     Args:
         csvfile: File handle
+
+        start, end: float: Only return samples in this window of time
+        (inclusive). None means unbounded. Archives only decompress the chunks
+        overlapping the window.
         
     Returns:
-        Array: List containing position vector, velocity vector 
-        and time.
+        Array: Structured array with the position vector, velocity vector
+        and time in the fields R, V and time. Each record can still be
+        indexed as (R, V, time).
     """
-    result = []
-    reader = csv.reader(csvfile)
-    for row in reader:
-        R = [float(row[0]), float(row[1]), float(row[2])]
-        V = [float(row[3]), float(row[4]), float(row[5])]
-        time = float(row[6])
-        result.append((R, V, time))
-    return result
+    blocks = list(iterECIData(csvfile, start, end))
+    if not blocks:
+        return np.empty(0, dtype=ECI_DTYPE)
+    return np.concatenate(blocks)
+
+
+def iterECIData(csvfile, start=None, end=None, blockSize=BLOCKSIZE):
+    """Parses ECI data from a CVS file or trajectory archive one block at a
+    time, so that pipelines run in bounded memory.
+
+    Args:
+        csvfile: File handle
+
+        start, end: float: Only return samples in this window of time
+        (inclusive), see readECIData.
+
+        blockSize: int: The number of csv lines per block. Archives are read
+        a chunk at a time.
+
+    Returns:
+        Generator: ECI data as returned by readECIData.
+    """
+    # imported here as the archive module depends on this one
+    from .storage.archive import binaryHandle, iterArchive
+    raw = binaryHandle(csvfile)
+    if raw is not None:
+        for chunk in iterArchive(raw, start, end):
+            yield chunk
+        return
+
+    finished = False
+    for lines in readBlocks(csvfile, blockSize):
+        if finished:
+            continue  # drain the rest of a pipe without parsing it
+        data = toECIArray(parseBlock(lines, 7))
+        if start is not None:
+            data = data[data['time'] >= start]
+        if end is not None:
+            finished = len(data) > 0 and data['time'][-1] > end
+            data = data[data['time'] <= end]
+        if len(data):
+            yield data
+
+
+def parseFlags(flags):
+    """Parses an array of boolean strings as written by writeData
+
+    Args:
+        flags: Array (string): Values such as True, False, 1 or 0.
+
+    Returns:
+        Array (bool).
+    """
+    values, inverse = np.unique(flags, return_inverse=True)
+    truth = []
+    for value in values:
+        value = value.strip().lower()
+        if value not in TRUTHY + FALSY:
+            raise ValueError('invalid truth value {0!r}'.format(value))
+        truth.append(value in TRUTHY)
+    return np.array(truth, dtype=bool)[inverse.reshape(-1)]
 
 
 def readGrndTrckData(csvfile):
@@ -127,11 +440,19 @@ def readGrndTrckData(csvfile):
         csvfile: File handle.
         
     Returns:
-        Array: List of lat lon height and if its visible 
+        Array: Structured array of lat lon height and if its visible
         from a tracking station.
     """
-    results = []
-    reader = csv.reader(csvfile)
-    for row in reader:
-        results.append((float(row[0]), float(row[1]), float(row[2]), strtobool(row[3])))
-    return results
+    blocks = []
+    for lines in readBlocks(csvfile):
+        values = parseBlock(lines, 3)
+        block = np.empty(len(values), dtype=GRNDTRCK_DTYPE)
+        block['lat'] = values[:, 0]
+        block['lon'] = values[:, 1]
+        block['height'] = values[:, 2]
+        block['visible'] = parseFlags([line.split(',')[3] for line in lines
+                                       if line.strip()])
+        blocks.append(block)
+    if not blocks:
+        return np.empty(0, dtype=GRNDTRCK_DTYPE)
+    return np.concatenate(blocks)
@@ -0,0 +1,106 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from context import satelliteSimulator #gets all of my local packages
+from satelliteSimulator.storage.archive import ArchiveReader, ArchiveWriter,\
+                                              writeArchive, readArchive, iterArchive,\
+                                              binaryHandle
+from satelliteSimulator.utils import readECIData, writeData
+import numpy as np
+import io
+import os
+
+DATADIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+def loadGalileo():
+    with open(os.path.join(DATADIR, 'galileo-rk4-j2-24.csv')) as f:
+        return readECIData(f)
+
+
+def test_roundtrip():
+    data = loadGalileo()
+    for compression in ['zlib', 'lzma']:
+        f = io.BytesIO()
+        writeArchive(data, f, compression=compression)
+        assert len(f.getvalue()) < data.nbytes/2
+        f.seek(0)
+        assert np.array_equal(readArchive(f), data)
+
+
+def test_window_reads_only_overlapping_chunks():
+    data = loadGalileo()
+    f = io.BytesIO()
+    with ArchiveWriter(f, chunkSeconds=3600) as writer:
+        writer.write(data[:1000])
+        writer.write(data[1000:])
+
+    reader = ArchiveReader(io.BytesIO(f.getvalue()))
+    assert len(reader.index) == 25
+    start = data['time'][0] + 5*3600 + 100
+    end = start + 3600
+    assert len(list(reader.chunks(start, end))) == 2
+    window = reader.read(start, end)
+    assert np.array_equal(window, data[(data['time'] >= start) & (data['time'] <= end)])
+
+
+def test_io_layer():
+    data = loadGalileo()[:500]
+    f = io.BytesIO()
+    writeData(data, f)
+    f.seek(0)
+    assert np.array_equal(readECIData(f), data)
+    f.seek(0)
+    assert np.array_equal(readECIData(f, data['time'][10], data['time'][20]), data[10:21])
+
+
+class Pipe(io.BytesIO):
+    def seekable(self):
+        return False
+
+
+def test_stream_from_pipe():
+    data = loadGalileo()
+    f = io.BytesIO()
+    writeArchive(data, f)
+    chunks = list(iterArchive(Pipe(f.getvalue())))
+    assert len(chunks) == 25
+    assert np.array_equal(np.concatenate(chunks), data)
+    window = np.concatenate(list(iterArchive(Pipe(f.getvalue()), data['time'][400], data['time'][800])))
+    assert np.array_equal(window, data[400:801])
+
+
+class Trickle(io.RawIOBase):
+    # like a pipe the writer has only just started on, a few bytes at a time
+    def __init__(self, data):
+        self.data = data
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = min(len(b), 3, len(self.data))
+        b[:n], self.data = self.data[:n], self.data[n:]
+        return n
+
+
+def test_short_peek():
+    data = loadGalileo()[:500]
+    f = io.BytesIO()
+    writeArchive(data, f)
+    raw = io.BufferedReader(Trickle(f.getvalue()))
+    assert len(raw.peek(8)) < 8
+    assert np.array_equal(readECIData(io.TextIOWrapper(raw)), data)
+    assert binaryHandle(io.TextIOWrapper(io.BufferedReader(Trickle(b'1.0,2.0')))) is None
+
+
+def test_extend():
+    data = loadGalileo()
+    f = io.BytesIO()
+    writeArchive(data, f)
+    g = io.BytesIO()
+    with ArchiveWriter(g) as writer:
+        writer.write(data[:1234])
+    with ArchiveWriter.extend(g) as writer:
+        writer.write(data[1234:])
+    assert g.getvalue() == f.getvalue()
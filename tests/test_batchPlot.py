@@ -0,0 +1,32 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from context import satelliteSimulator #gets all of my local packages
+from satelliteSimulator.batchPlot import readJobs, renderBatch
+import pytest
+import io
+import os
+
+pytest.importorskip('mpl_toolkits.basemap')
+
+DATADIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+def test_readJobs():
+    jobs = readJobs(io.StringIO('# graph,input,output\n\ndiffs, a.csv ,a.png\n'))
+    assert jobs == [('diffs', 'a.csv', 'a.png')]
+
+
+def test_renderBatch(tmpdir, monkeypatch):
+    monkeypatch.setenv('PYSPACE_CACHE_DIR', str(tmpdir))
+    out = str(tmpdir)
+    jobs = [('diffs', os.path.join(DATADIR, 'galileo-diff-rk4-j2.csv'), os.path.join(out, 'd.png')),
+            ('passTimes', os.path.join(DATADIR, 'galileo-pass-grid.csv'), os.path.join(out, 'p.png')),
+            ('eci', os.path.join(out, 'missing.csv'), os.path.join(out, 'e.png'))]
+    results = {r[0]: r[2] for r in renderBatch(jobs, processes=2)}
+    assert results[jobs[0][2]] is None
+    assert results[jobs[1][2]] is None
+    assert 'missing.csv' in results[jobs[2][2]]
+    assert os.path.getsize(jobs[0][2]) > 0
+    assert os.path.getsize(jobs[1][2]) > 0
+    assert not os.path.exists(jobs[2][2])
@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 
 from context import satelliteSimulator #gets all of my local packages
-from satelliteSimulator.cart2kep import cart2kep
+from satelliteSimulator.converters.cart2kep import cart2kep
 from satelliteSimulator.data import *
 from math import pi
 import pytest
@@ -22,7 +22,7 @@ def nearlyEqual(a, b):
 #     assert normaliseAngle(-pi) == 3.141592653589793
 
 def test_cart2kep():
-    satellites = [jason, GPSIIR, Galileo, Intelsat]
+    satellites = [Jason, GPSIIR, Galileo, Intelsat]
     for satellite in satellites:
         result = cart2kep(satellite['R'], satellite['V'])
         for key in satellite['keplerian']:
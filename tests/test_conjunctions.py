@@ -0,0 +1,72 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from context import satelliteSimulator #gets all of my local packages
+from satelliteSimulator.analysis.conjunctions import neighbourPairs, overlappingShells,\
+                                                     refineApproaches, screenConjunctions
+from satelliteSimulator.data import GM
+import numpy as np
+
+
+def circularOrbits(radius, inclination, raan, phase, times):
+    # positions and velocities of circular orbits, shape (objects, epochs, 3)
+    n = np.sqrt(GM/radius**3)
+    angle = n[:, None]*times + phase[:, None]
+    ci, si, cr, sr = np.cos(inclination), np.sin(inclination), np.cos(raan), np.sin(raan)
+    u = np.stack([cr, sr, np.zeros_like(cr)], axis=1)[:, None]
+    w = np.stack([-sr*ci, cr*ci, si], axis=1)[:, None]
+    c, s = np.cos(angle)[..., None], np.sin(angle)[..., None]
+    R = radius[:, None, None]*(c*u + s*w)
+    V = (radius*n)[:, None, None]*(-s*u + c*w)
+    return R, V
+
+
+def test_neighbour_pairs_find_close_pairs():
+    rng = np.random.RandomState(0)
+    R = rng.rand(400, 3)*1000
+    first, second = neighbourPairs(R, 50)
+    found = set(zip(first.tolist(), second.tolist()))
+    assert len(found) == len(first)
+    distance = np.linalg.norm(R[:, None] - R[None], axis=2)
+    i, j = np.nonzero(np.triu(distance <= 50, 1))
+    assert set(zip(i.tolist(), j.tolist())) <= found
+
+
+def test_overlapping_shells():
+    low = np.array([7000, 7100, 7003, 8000, 9000, 8500.0])
+    high = np.array([7001, 7200, 7004, 8100, 9100, 8600.0])
+    assert overlappingShells(low, high, 5).tolist() == [True, False, True, False, False, False]
+
+
+def test_screen_matches_all_pairs():
+    rng = np.random.RandomState(2)
+    count = 40
+    times = np.arange(0, 3*3600, 10.0)
+    radius = 7000 + rng.rand(count)*60
+    inclination = rng.rand(count)*np.pi
+    raan = rng.rand(count)*2*np.pi
+    phase = rng.rand(count)*2*np.pi
+    # two objects 1 km apart in radius that cross the same node together
+    radius[:2] = 7100, 7101
+    inclination[:2] = 0.5, 1.5
+    raan[:2] = 0
+    meet = 1234.5
+    phase[:2] = -np.sqrt(GM/radius[:2]**3)*meet
+    R, V = circularOrbits(radius, inclination, raan, phase, times)
+
+    threshold = 40
+    found = screenConjunctions(R, V, times, threshold)
+    pair = found[(found['first'] == 0) & (found['second'] == 1)]
+    assert len(pair) >= 1
+    assert abs(pair['time'][0] - meet) < 0.5 and abs(pair['distance'][0] - 1) < 0.05
+
+    # every step of every pair
+    i, j = np.triu_indices(count, 1)
+    dR, dV = R[j] - R[i], V[j] - V[i]
+    rate = np.einsum('...i,...i->...', dR, dV)
+    p, k = np.nonzero((rate[:, :-1] < 0) & (rate[:, 1:] >= 0))
+    t, distance, speed = refineApproaches(times[k], dR[p, k], dV[p, k], times[k + 1], dR[p, k + 1], dV[p, k + 1])
+    close = distance <= threshold
+    expected = sorted(zip(t[close].tolist(), i[p][close].tolist(), j[p][close].tolist()))
+    assert len(expected) > 1
+    assert sorted(zip(found['time'].tolist(), found['first'].tolist(), found['second'].tolist())) == expected
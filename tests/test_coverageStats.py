@@ -0,0 +1,67 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from context import satelliteSimulator #gets all of my local packages
+from satelliteSimulator.analysis.coverageStats import CoverageTracker, coverageStatistics,\
+                                                      constellationSummary
+from satelliteSimulator.analysis.visibility import visibilityMatrix
+from satelliteSimulator.analysis.visibilityBits import runs
+from satelliteSimulator.converters.eci2ecef import ECI2ECEFArray
+from satelliteSimulator.utils import readECIData
+import numpy as np
+import os
+
+DATADIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+STATIONS = [(45, -100, 5), (-60, 150, 5), (-30, 20, 5), (0, 0, 5)]
+
+
+def expectedStatistics(times, vis):
+    rows = []
+    for s, flags in enumerate(vis.T):
+        starts, ends = runs(flags)
+        end = times[np.minimum(ends, len(times) - 1)]
+        covered = (end - times[starts]).sum()
+        gapStarts, gapEnds = runs(~flags)
+        gaps = times[np.minimum(gapEnds, len(times) - 1)] - times[gapStarts]
+        revisits = np.diff(times[starts])
+        rows.append((covered/(times[-1] - times[0]),
+                     revisits.mean() if len(revisits) else np.nan,
+                     revisits.max() if len(revisits) else np.nan,
+                     gaps.max() if len(gaps) else 0.0))
+    return np.array(rows)
+
+
+def test_blocks_match_whole_trajectory():
+    rng = np.random.RandomState(0)
+    times = np.arange(500.0)*10
+    vis = rng.rand(500, 6) < np.array([0.0, 1.0, 0.2, 0.5, 0.9, 0.05])
+    vis[0, 2] = True
+    vis[-1, 3] = True
+
+    tracker = CoverageTracker([(0, 0, 5)]*6)
+    for start in range(0, 500, 37):
+        tracker.update(times[start:start + 37], vis[start:start + 37])
+    stats = np.array(tracker.statistics())[:, 2:]
+    assert np.allclose(stats, expectedStatistics(times, vis), equal_nan=True)
+
+
+def test_constellation_merges_satellites():
+    with open(os.path.join(DATADIR, 'galileo-rk4-j2-24.csv')) as f:
+        eci = readECIData(f)
+    # the same orbit half a day later stands in for a second satellite
+    shifted = eci.copy()
+    half = len(eci)//2
+    shifted['R'] = np.roll(eci['R'], half, axis=0)
+    shifted['V'] = np.roll(eci['V'], half, axis=0)
+
+    blocksA = [eci[i:i + 1000] for i in range(0, len(eci), 1000)]
+    blocksB = [shifted[i:i + 731] for i in range(0, len(eci), 731)]
+    visA = visibilityMatrix(ECI2ECEFArray(eci)['R'], STATIONS)
+    visB = visibilityMatrix(ECI2ECEFArray(shifted)['R'], STATIONS)
+    for fold, vis in ((1, visA | visB), (2, visA & visB)):
+        stats = coverageStatistics([blocksA, blocksB], STATIONS, fold)
+        assert np.allclose(np.array(stats)[:, 2:], expectedStatistics(eci['time'], vis), equal_nan=True)
+
+    summary = constellationSummary(coverageStatistics([blocksA, blocksB], STATIONS))
+    assert 0 < summary['coverage'] < 1
+    assert summary['maxGap'] > 0
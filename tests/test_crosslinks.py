@@ -0,0 +1,50 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from context import satelliteSimulator #gets all of my local packages
+from satelliteSimulator.analysis.crosslinks import lineOfSight, linkIntervals, stackPositions
+from satelliteSimulator.data import EARTHRADIUS
+from satelliteSimulator.utils import readECIData
+import numpy as np
+import os
+
+DATADIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+def test_line_of_sight_matches_sampling():
+    rng = np.random.RandomState(0)
+    first = rng.randn(500, 3)*(EARTHRADIUS*2)
+    second = rng.randn(500, 3)*(EARTHRADIUS*2)
+    steps = np.linspace(0, 1, 2001)[:, None, None]
+    points = first + steps*(second - first)
+    clear = (np.linalg.norm(points, axis=2) > EARTHRADIUS + 100).all(axis=0)
+    assert (lineOfSight(first, second) == clear).mean() > 0.99
+    # the line between opposite points goes through the centre
+    assert not lineOfSight(first, -first).any()
+
+
+def test_intervals_match_epochs():
+    with open(os.path.join(DATADIR, 'galileo-rk4-j2-24.csv')) as f:
+        eci = readECIData(f)[::5]
+    # rotate the orbit about the pole and tilt it to make a constellation
+    satellites = []
+    for angle in (0, 1, 2, 3.5, 5):
+        c, s = np.cos(angle), np.sin(angle)
+        rotation = np.array([[c, -s, 0], [s, c, 0], [0, 0, 1]]) @ np.array([[1, 0, 0], [0, c, -s], [0, s, c]])
+        rotated = eci.copy()
+        rotated['R'] = eci['R'] @ rotation.T
+        satellites.append(rotated)
+    R, times = stackPositions(satellites)
+
+    maxRange = 50000
+    links = linkIntervals(R, times, maxRange, chunk=3)
+    assert len(links)
+    for i in range(len(R)):
+        for j in range(i + 1, len(R)):
+            expected = lineOfSight(R[i], R[j]) & (np.linalg.norm(R[i] - R[j], axis=1) <= maxRange)
+            inLink = np.zeros(len(times), dtype=bool)
+            pair = links[(links['first'] == i) & (links['second'] == j)]
+            for start, end in zip(pair['start'], pair['end']):
+                inLink |= (times >= start) & (times < end)
+            inLink[-1] |= len(pair) > 0 and pair['end'][-1] == times[-1] and expected[-1]
+            assert np.array_equal(inLink, expected)
@@ -0,0 +1,62 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from context import satelliteSimulator #gets all of my local packages
+from satelliteSimulator.analysis.eclipse import EclipseTracker, shadowState, PENUMBRA, UMBRA,\
+                                                SUNLIGHT
+from satelliteSimulator.data import GM, BASETIME
+from satelliteSimulator.sun import sunPosition
+from satelliteSimulator.utils import ECI_DTYPE
+import numpy as np
+
+RADIUS = 7000.0
+
+
+def orbit(times):
+    # a circular orbit in the plane of the Sun and the celestial pole, so
+    # that it passes through the middle of the shadow
+    sun = sunPosition(BASETIME)
+    u = sun/np.linalg.norm(sun)
+    w = np.cross(np.cross(u, [0, 0, 1]), u)
+    w /= np.linalg.norm(w)
+    n = np.sqrt(GM/RADIUS**3)
+    angle = n*(times - BASETIME)
+    R = RADIUS*(np.cos(angle)[:, None]*u + np.sin(angle)[:, None]*w)
+    V = RADIUS*n*(-np.sin(angle)[:, None]*u + np.cos(angle)[:, None]*w)
+    data = np.zeros(len(times), dtype=ECI_DTYPE)
+    data['R'], data['V'], data['time'] = R, V, times
+    return data
+
+
+def test_states():
+    sun = sunPosition(np.full(3, BASETIME))
+    u = sun/np.linalg.norm(sun, axis=1)[:, None]
+    R = u*[[RADIUS], [-RADIUS], [0]]
+    # just inside the edge of the cylinder, 7000 km behind the Earth
+    across = np.cross(u[2], [0, 0, 1])
+    R[2] = across*6360/np.linalg.norm(across) - u[2]*7000
+    assert shadowState(R, sun).tolist() == [SUNLIGHT, UMBRA, PENUMBRA]
+    assert shadowState(R, sun, 'cylindrical').tolist() == [SUNLIGHT, UMBRA, UMBRA]
+
+
+def test_crossings_match_dense_sampling():
+    times = BASETIME + np.arange(0, 6*3600, 10.0)
+    data = orbit(times)
+    whole = EclipseTracker()
+    expected = np.concatenate([whole.update(data), whole.close()])
+    assert set(expected['shadow']) == {PENUMBRA, UMBRA}
+
+    tracker = EclipseTracker()
+    found = [tracker.update(data[i:i + 333]) for i in range(0, len(data), 333)] + [tracker.close()]
+    found = np.concatenate(found)
+    assert np.array_equal(np.sort(found, order=['shadow', 'start']), np.sort(expected, order=['shadow', 'start']))
+
+    dense = BASETIME + np.arange(0, 6*3600, 0.01)
+    states = shadowState(orbit(dense)['R'], sunPosition(dense))
+    for shadow in (PENUMBRA, UMBRA):
+        inside = states >= shadow
+        change = dense[np.flatnonzero(inside[1:] != inside[:-1]) + 1]
+        edges = np.sort(np.concatenate([found['start'][found['shadow'] == shadow],
+                                        found['end'][found['shadow'] == shadow]]))
+        assert len(change) == len(edges)
+        assert np.abs(change - edges).max() < 0.02
@@ -0,0 +1,68 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from context import satelliteSimulator #gets all of my local packages
+import subprocess
+import sys
+import os
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+MAIN = os.path.join(ROOT, 'main.py')
+DATA = os.path.join(ROOT, 'data', 'galileo-rk4-j2-24.csv')
+
+# runs main.py in a fresh interpreter then prints the heavy modules it loaded
+CHECK_IMPORTS = """
+import runpy, sys
+sys.argv = {0!r}
+runpy.run_path({1!r}, run_name='__main__')
+heavy = ('matplotlib', 'mpl_toolkits', 'progressbar')
+sys.stderr.write(repr(sorted(m for m in sys.modules if m.split('.')[0] in heavy)))
+"""
+
+
+def cacheEnv(tmpdir):
+    # keep the propagation cache out of the user's home directory
+    return dict(os.environ, PYSPACE_CACHE_DIR=str(tmpdir))
+
+
+def loadedModules(tmpdir, *args):
+    argv = [MAIN] + list(args)
+    result = subprocess.run([sys.executable, '-c', CHECK_IMPORTS.format(argv, MAIN)],
+                            cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            check=True, universal_newlines=True, env=cacheEnv(tmpdir))
+    return result.stderr.strip().splitlines()[-1]
+
+
+def test_no_plotting_imports(tmpdir):
+    end = '1396411351.184'
+    assert loadedModules(tmpdir, 'propogate', 'Jason', 'kep', '0') == '[]'
+    assert loadedModules(tmpdir, 'difference', '--hcl', '-i1', DATA, '-i2', DATA, '--end', end) == '[]'
+    assert loadedModules(tmpdir, 'groundTrack', '-i', DATA, '--end', end, '0', '0', '5') == '[]'
+    assert loadedModules(tmpdir, 'passTimes', '-i', DATA, '--end', end, '0', '0', '5') == '[]'
+
+
+def test_pipeline(tmpdir):
+    prop = subprocess.Popen([sys.executable, MAIN, 'propogate', 'Galileo', 'j2', '1'],
+                            cwd=ROOT, stdout=subprocess.PIPE, env=cacheEnv(tmpdir))
+    passes = subprocess.run([sys.executable, MAIN, 'passTimes', '45', '-100', '5'],
+                            cwd=ROOT, stdin=prop.stdout, stdout=subprocess.PIPE,
+                            check=True, universal_newlines=True)
+    prop.stdout.close()
+    assert prop.wait() == 0
+    rows = [line.split(',') for line in passes.stdout.splitlines()]
+    assert [(row[2], row[3]) for row in rows] == [('1396415441.184', '1396445641.184'),
+                                                  ('1396469551.184', '1396480201.184')]
+
+
+def test_resume_in_place(tmpdir):
+    def propogate(*args):
+        subprocess.run([sys.executable, MAIN, 'propogate', 'Galileo', 'j2'] + list(args),
+                       cwd=ROOT, check=True, env=cacheEnv(tmpdir))
+
+    for ext in ('.csv', '.trz'):
+        full, part = str(tmpdir.join('full' + ext)), str(tmpdir.join('part' + ext))
+        propogate('0.2', '-o', full)
+        propogate('0.1', '-o', part)
+        propogate('0.2', '--resume', part, '-o', part)
+        with open(full, 'rb') as f, open(part, 'rb') as g:
+            assert f.read() == g.read()
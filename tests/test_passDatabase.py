@@ -0,0 +1,51 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from context import satelliteSimulator #gets all of my local packages
+from satelliteSimulator.storage.passDatabase import PassDatabase, passRecords
+import numpy as np
+
+STATIONS = [(45.0, -100.0), (51.5, -0.13)]
+
+
+def randomDatabase(count=2000, seed=0):
+    rng = np.random.RandomState(seed)
+    records = []
+    for name in ('Jason', 'Galileo', 'Intelsat'):
+        rise = rng.uniform(0, 1e6, count)
+        duration = rng.exponential(3000, count)
+        duration[::200] = 5e5  # a few very long passes, like a GEO satellite
+        station = np.array(STATIONS)[rng.randint(0, 2, count)]
+        rows = np.column_stack([station, rise, rise + duration, duration,
+                                rng.uniform(5, 90, count), rng.uniform(0, 360, count)])
+        records.append(passRecords(name, rows))
+    return PassDatabase(np.concatenate(records))
+
+
+def test_queries_match_brute_force():
+    db = randomDatabase()
+    passes = db.passes
+    for t in np.random.RandomState(1).uniform(-1e4, 1.1e6, 50):
+        for station in [None] + STATIONS:
+            mask = np.ones(len(passes), dtype=bool)
+            if station is not None:
+                mask = (passes['lat'] == station[0]) & (passes['lon'] == station[1])
+            at = mask & (passes['rise'] <= t) & (passes['set'] >= t)
+            assert np.array_equal(db.at(t, station), passes[at])
+
+            window = mask & (passes['rise'] <= t + 5000) & (passes['set'] >= t)
+            assert np.array_equal(db.overlapping(t, t + 5000, station), passes[window])
+
+            later = np.flatnonzero(mask & (passes['rise'] > t) & (passes['satellite'] == 'Jason'))
+            found = db.nextPass(t, station, 'Jason')
+            assert (found is None) if len(later) == 0 else found == passes[later[0]]
+
+
+def test_save_load(tmpdir):
+    db = randomDatabase(100)
+    path = str(tmpdir.join('passes.npz'))
+    db.save(path)
+    loaded = PassDatabase.load(path)
+    assert np.array_equal(loaded.passes, db.passes)
+    assert loaded.visible(5e5, STATIONS[0]) == db.visible(5e5, STATIONS[0])
+    assert loaded.satellites() == ['Galileo', 'Intelsat', 'Jason']
@@ -0,0 +1,58 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from context import satelliteSimulator #gets all of my local packages
+from satelliteSimulator.analysis.passProfiles import PassProfiler, passProfile
+from satelliteSimulator.analysis.visibility import PassTracker, latLon2ecef, lookAngles
+from satelliteSimulator.converters.eci2ecef import ECI2ECEFArray
+from satelliteSimulator.data import SPEEDOFLIGHT
+from satelliteSimulator.utils import readECIData
+import numpy as np
+import os
+
+DATADIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+STATIONS = [(45, -100, 5), (-60, 150, 5), (-30, 20, 5)]
+
+
+def loadECEF():
+    with open(os.path.join(DATADIR, 'galileo-rk4-j2-24.csv')) as f:
+        return ECI2ECEFArray(readECIData(f))
+
+
+def test_profile_matches_geometry():
+    ecef = loadECEF()[::40]
+    station = STATIONS[0]
+    profile = passProfile(ecef, station, 1.5e9)
+    r = ecef['R'] - latLon2ecef(station[0], station[1])
+    distance = np.linalg.norm(r, axis=1)
+    assert np.allclose(profile['range'], distance)
+    # the range rate is the derivative of the range
+    rate = np.gradient(distance, ecef['time'])
+    assert np.allclose(profile['rangeRate'][1:-1], rate[1:-1], atol=0.01)
+    assert np.allclose(profile['doppler'], -1.5e9*profile['rangeRate']/SPEEDOFLIGHT)
+    θ, α = lookAngles(ecef['R'], [station])
+    assert np.allclose(profile['elevation'], θ[:, 0])
+    assert np.allclose(profile['azimuth'], α[:, 0])
+
+
+def test_passes_match_tracker():
+    ecef = loadECEF()
+    expected = PassTracker(STATIONS).update(ecef)
+
+    profiler = PassProfiler(STATIONS, 1e9)
+    passes = []
+    for start in range(0, len(ecef), 97):
+        passes += profiler.update(ecef[start:start + 97])
+    assert len(passes) == len(expected)
+    # passes still up at the end are only given by close
+    assert all(profile['time'][-1] == ecef['time'][-1] for s, profile in profiler.close())
+    for s, profile in passes:
+        lat, lon, angle = STATIONS[s]
+        rise = profile['time'][0]
+        match = [p for p in expected if (p[0], p[1], p[2]) == (lat, lon, rise)]
+        assert len(match) == 1
+        # the last sample of a pass is the one before it sets
+        assert match[0][3] == ecef['time'][np.searchsorted(ecef['time'], profile['time'][-1]) + 1]
+        assert (profile['elevation'] > angle).all()
+        assert np.allclose(profile['elevation'][0], match[0][5])
+        assert np.all(np.diff(profile['time']) == 10)
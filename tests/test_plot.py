@@ -0,0 +1,76 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from context import satelliteSimulator #gets all of my local packages
+import pytest
+import numpy as np
+import os
+
+pytest.importorskip('mpl_toolkits.basemap')
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from satelliteSimulator import plot
+
+
+def test_initMap_cache(tmpdir, monkeypatch):
+    monkeypatch.setenv('PYSPACE_CACHE_DIR', str(tmpdir))
+    plt.figure()
+    m = plot.initMap('robin', 'c')
+    plt.close('all')
+    files = sorted(os.listdir(os.path.join(str(tmpdir), 'maps')))
+    assert [os.path.splitext(f)[1] for f in files] == ['.json', '.png']
+
+    def fail(m):
+        raise AssertionError('background drawn again')
+    monkeypatch.setattr(plot, 'drawBackground', fail)
+    plt.figure()
+    cached = plot.initMap('robin', 'c')
+    plt.close('all')
+    assert cached(10, 20) == m(10, 20)
+    assert cached.resolution is None
+
+
+def test_binPoints():
+    x = np.array([0.0, 0.5, 9.99, 10.0, 11.0, 5.0])
+    y = np.array([0.0, 0.5, 4.99, 5.0, 1.0, -1.0])
+    counts = plot.binPoints(x, y, (0, 10, 0, 5), (10, 5))
+    assert counts.shape == (5, 10)
+    assert counts[0, 0] == 2
+    assert counts[4, 9] == 2
+    assert counts.sum() == 4
+
+
+def test_plotDifferences_density():
+    t = np.linspace(0, 100, 200000)
+    data = np.column_stack([t, np.sin(t), np.cos(t), t/100])
+    plt.figure()
+    plot.plotDifferences(data, mode='auto')
+    ax = plt.gca()
+    assert len(ax.images) == 3
+    assert not ax.collections
+    assert ax.images[0].get_array().shape[:2] == plot.axesPixels(ax)[::-1]
+    plt.close('all')
+
+
+def test_decimation():
+    assert plot.decimation(10, 3600, 25) == 14
+    assert plot.decimation(60, 60, 25) == 1
+
+
+def test_animateGroundTracks(tmpdir, monkeypatch):
+    from PIL import Image
+    from satelliteSimulator.utils import GRNDTRCK_DTYPE
+    monkeypatch.setenv('PYSPACE_CACHE_DIR', str(tmpdir))
+    data = np.zeros(100, dtype=GRNDTRCK_DTYPE)
+    data['lon'] = np.linspace(-170, 170, 100)
+    data['lat'] = np.linspace(-60, 60, 100)
+    data['visible'][50:] = True
+    outfile = os.path.join(str(tmpdir), 'track.gif')
+    plot.animateGroundTracks(data, timestep=10, speed=100, fps=5, outfile=outfile)
+    gif = Image.open(outfile)
+    assert gif.n_frames == 50
+    first = np.asarray(gif.convert('RGB'))
+    gif.seek(49)
+    assert (np.asarray(gif.convert('RGB')) != first).any()
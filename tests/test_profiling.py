@@ -0,0 +1,40 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from context import satelliteSimulator #gets all of my local packages
+from satelliteSimulator.profiling import Profiler
+import numpy as np
+import io
+import json
+import tracemalloc
+
+
+def test_disabled():
+    profiler = Profiler()
+    blocks = [np.zeros(3)]
+    assert profiler.iterate('read', blocks) is blocks
+    with profiler.stage('compute', 3):
+        pass
+    assert profiler.report()['stages'] == {}
+
+
+def test_stages():
+    profiler = Profiler()
+    profiler.start(memory=True)
+    for block in profiler.iterate('read', (np.zeros(n) for n in (10, 20))):
+        with profiler.stage('compute', len(block)):
+            np.ones(100000)
+    profiler.count('compute', 5)
+
+    out = io.StringIO()
+    profiler.write(out, 'test')
+    tracemalloc.stop()
+    report = json.loads(out.getvalue())
+    assert report['command'] == 'test'
+    assert list(report['stages']) == ['read', 'compute']
+    assert report['stages']['read']['calls'] == 3
+    assert report['stages']['read']['rows'] == 30
+    assert report['stages']['compute']['calls'] == 2
+    assert report['stages']['compute']['rows'] == 35
+    assert report['stages']['compute']['peakMemory'] >= 800000
+    assert report['total']['wall'] >= report['stages']['compute']['wall']
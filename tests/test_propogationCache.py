@@ -0,0 +1,63 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from context import satelliteSimulator #gets all of my local packages
+from satelliteSimulator.storage.propogationCache import PropogationCache, cachedPropogation,\
+                                                        propogationBlocks, cacheKey
+from satelliteSimulator.propogation.rk4 import rk4j2Propogation
+from satelliteSimulator.data import Jason, Galileo
+from satelliteSimulator.utils import ECI_DTYPE
+import numpy as np
+import os
+
+
+def test_hit_matches_propogation(tmpdir):
+    cache = PropogationCache(str(tmpdir))
+    expected = np.array(rk4j2Propogation(Jason['R'], Jason['V'], 10, 100, Jason['time']),
+                        dtype=ECI_DTYPE)
+    miss = cachedPropogation('j2', Jason['R'], Jason['V'], 10, 100, Jason['time'], cache)
+    key = cacheKey('j2', Jason['R'], Jason['V'], 10, 100, Jason['time'])
+    assert key in cache
+    hit = cachedPropogation('j2', Jason['R'], Jason['V'], 10, 100, Jason['time'], cache)
+    assert np.array_equal(miss, expected)
+    assert np.array_equal(hit, expected)
+    assert cacheKey('j2', Jason['R'], Jason['V'], 20, 100, Jason['time']) != key
+    assert cacheKey('rk4', Jason['R'], Jason['V'], 10, 100, Jason['time']) != key
+
+
+def test_interrupted_put(tmpdir):
+    cache = PropogationCache(str(tmpdir))
+    blocks = propogationBlocks('kep', Jason['R'], Jason['V'], 10, 20000, Jason['time'], cache)
+    next(blocks)
+    blocks.close()
+    assert cache.entries() == []
+    assert os.listdir(str(tmpdir)) == []
+
+
+def test_missing_chunk_propogates(tmpdir):
+    cache = PropogationCache(str(tmpdir))
+    expected = cachedPropogation('kep', Jason['R'], Jason['V'], 10, 20000, Jason['time'], cache)
+    key = cacheKey('kep', Jason['R'], Jason['V'], 10, 20000, Jason['time'])
+    chunks = []
+    for root, dirs, files in os.walk(os.path.join(str(tmpdir), key)):
+        chunks += [os.path.join(root, f) for f in files if f.endswith('.npy')]
+    assert len(chunks) > 1
+    os.remove(sorted(chunks)[-1])
+
+    # the whole trajectory once, with no chunks repeated
+    blocks = propogationBlocks('kep', Jason['R'], Jason['V'], 10, 20000, Jason['time'], cache)
+    assert np.array_equal(np.concatenate(list(blocks)), expected)
+
+
+def test_evict(tmpdir):
+    cache = PropogationCache(str(tmpdir))
+    cachedPropogation('kep', Jason['R'], Jason['V'], 10, 500, Jason['time'], cache)
+    size = cache.entries()[0][1]
+    cachedPropogation('kep', Galileo['R'], Galileo['V'], 10, 500, Galileo['time'], cache)
+    old = cacheKey('kep', Jason['R'], Jason['V'], 10, 500, Jason['time'])
+    os.utime(os.path.join(str(tmpdir), old), (0, 0))
+
+    cache.maxBytes = int(size*1.5)
+    cache.evict()
+    assert old not in cache
+    assert len(cache.entries()) == 1
@@ -0,0 +1,65 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from context import satelliteSimulator #gets all of my local packages
+from satelliteSimulator.propogation.resume import resumeState, stepNumber, writeCheckpoint
+from satelliteSimulator.propogation.rk4 import rk4j2Propogation, rk4j2PropogationSteps
+from satelliteSimulator.propogation.keplerianPropogation import propogateOrbit, propogateOrbitSteps
+from satelliteSimulator.utils import writeData, ECI_DTYPE
+from satelliteSimulator.data import Galileo
+import numpy as np
+import warnings
+import pytest
+
+
+def test_resume_from_trajectory(tmpdir):
+    full = np.array(rk4j2Propogation(Galileo['R'], Galileo['V'], 10, 200, Galileo['time']),
+                    dtype=ECI_DTYPE)
+    path = str(tmpdir.join('part.csv'))
+    with open(path, 'w') as f:
+        writeData(full[:121], f)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        R, V, start = resumeState(path, 'j2', 10, Galileo['time'])
+    assert start == 120
+    rest = np.array(list(rk4j2PropogationSteps(R, V, 10, 80, Galileo['time'], start)), dtype=ECI_DTYPE)
+    assert rest.tobytes() == full[120:].tobytes()
+
+
+def test_resume_from_checkpoint(tmpdir):
+    full = propogateOrbit(Galileo['R'], Galileo['V'], 10, 100, Galileo['time'])
+    path = str(tmpdir.join('ck.json'))
+    with open(path, 'w') as f:
+        writeCheckpoint(f, 'kep', full[60][0], full[60][1], 10, 60, Galileo['time'])
+
+    R, V, start = resumeState(path, 'kep', 10, Galileo['time'])
+    assert list(propogateOrbitSteps(R, V, 10, 40, Galileo['time'], start))[1:] == full[61:]
+    with pytest.raises(ValueError):
+        resumeState(path, 'kep', 20, Galileo['time'])
+
+
+def test_resume_from_rounded_trajectory(tmpdir):
+    full = np.array(rk4j2Propogation(Galileo['R'], Galileo['V'], 10, 200, Galileo['time']),
+                    dtype=ECI_DTYPE)
+    path = str(tmpdir.join('part.csv'))
+    with open(path, 'w') as f:
+        writeData(full[:121], f, 12)
+    with pytest.warns(UserWarning):
+        assert resumeState(path, 'j2', 10, Galileo['time'])[2] == 120
+
+    # the checkpoint beside the trajectory has the exact state
+    with open(str(tmpdir.join('part.json')), 'w') as f:
+        writeCheckpoint(f, 'j2', full[120]['R'], full[120]['V'], 10, 120, Galileo['time'])
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        R, V, start = resumeState(path, 'j2', 10, Galileo['time'])
+    assert start == 120
+    rest = np.array(list(rk4j2PropogationSteps(R, V, 10, 80, Galileo['time'], start)), dtype=ECI_DTYPE)
+    assert rest.tobytes() == full[120:].tobytes()
+
+
+def test_step_number():
+    assert stepNumber(1000.0 + 10*86400, 10, 1000.0) == 86400
+    with pytest.raises(ValueError):
+        stepNumber(1005.0, 10, 1000.0)
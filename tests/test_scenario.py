@@ -0,0 +1,82 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from context import satelliteSimulator #gets all of my local packages
+from satelliteSimulator.scenario import buildTasks, runScenario, signatures
+import argparse
+
+SCENARIO = {'satellites': ['Galileo'],
+            'models': ['kep', 'j2'],
+            'stations': [[45, -100, 5]],
+            'analyses': {'difference': {'reference': 'j2'}, 'passTimes': {}, 'plot': ['diffs']}}
+
+ran = []
+
+
+def parseArgs(argv):
+    return argparse.Namespace(argv=argv)
+
+
+def runCommand(args):
+    # writes the output named after -o, or fails for bad commands
+    ran.append(args.argv[0])
+    if 'fail' in args.argv:
+        raise RuntimeError('failed')
+    with open(args.argv[args.argv.index('-o') + 1], 'w') as f:
+        f.write(' '.join(args.argv))
+
+
+def run(tasks, outdir, **kwargs):
+    del ran[:]
+    return {name: status for name, status, seconds, error in
+            runScenario(tasks, str(outdir), parseArgs, runCommand, 1, **kwargs)}
+
+
+def test_build_tasks():
+    tasks = buildTasks(SCENARIO)
+    assert list(tasks) == ['propogate:Galileo:kep', 'propogate:Galileo:j2',
+                           'difference:Galileo:kep', 'passTimes:Galileo:kep',
+                           'passTimes:Galileo:j2', 'plot:diffs:Galileo:kep']
+    assert tasks['difference:Galileo:kep'].inputs == ['propogate:Galileo:kep', 'propogate:Galileo:j2']
+    assert tasks['passTimes:Galileo:j2'].resolve('out') == \
+        ['passTimes', '-i', 'out/Galileo-j2.csv', '-o', 'out/Galileo-j2-passes.csv', '45', '-100', '5']
+
+
+def test_reuse(tmpdir):
+    tasks = buildTasks(SCENARIO)
+    assert set(run(tasks, tmpdir).values()) == {'ran'}
+    assert set(run(tasks, tmpdir).values()) == {'reused'}
+    assert ran == []
+
+    # only the tasks downstream of a change run again
+    tasks['propogate:Galileo:j2'].argv.append('--no-cache')
+    statuses = run(tasks, tmpdir)
+    assert sorted(name for name in statuses if statuses[name] == 'ran') == \
+        ['difference:Galileo:kep', 'passTimes:Galileo:j2', 'plot:diffs:Galileo:kep',
+         'propogate:Galileo:j2']
+
+    tmpdir.join('Galileo-kep-passes.csv').remove()
+    assert run(tasks, tmpdir, dryRun=True)['passTimes:Galileo:kep'] == 'pending'
+    assert run(tasks, tmpdir)['passTimes:Galileo:kep'] == 'ran'
+    assert ran == ['passTimes']
+
+
+def test_failure(tmpdir):
+    tasks = buildTasks(SCENARIO)
+    tasks['propogate:Galileo:j2'].argv.append('fail')
+    statuses = run(tasks, tmpdir)
+    assert statuses['propogate:Galileo:j2'] == 'failed'
+    assert statuses['difference:Galileo:kep'] == 'skipped'
+    assert statuses['plot:diffs:Galileo:kep'] == 'skipped'
+    assert statuses['passTimes:Galileo:kep'] == 'ran'
+
+
+def test_scripts_are_hashed(tmpdir):
+    tasks = buildTasks(SCENARIO)
+    script = tmpdir.join('main.py')
+    script.write('steps = 1\n')
+    before = signatures(tasks, [str(script)])
+    assert signatures(tasks, [str(script)]) == before
+    script.write('steps = 2\n')
+    after = signatures(tasks, [str(script)])
+    assert all(after[name] != before[name] for name in tasks)
@@ -0,0 +1,91 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from context import satelliteSimulator #gets all of my local packages
+from satelliteSimulator.analysis.scheduling import conflictGraph, greedySchedule, exactSchedule,\
+                                                   passWeights, maxWeightIndependentSet, MAXCOMPONENT
+from satelliteSimulator.storage.passDatabase import passRecords
+from itertools import combinations
+import numpy as np
+import time
+
+SLEW = 120
+
+
+def randomPasses(count, seed, stations=3, satellites=4, span=20000):
+    rng = np.random.RandomState(seed)
+    records = []
+    for sat in range(satellites):
+        rise = rng.uniform(0, span, count)
+        duration = rng.uniform(300, 1500, count)
+        station = rng.randint(0, stations, count)
+        rows = np.column_stack([station, -station, rise, rise + duration, duration,
+                                np.zeros(count), np.zeros(count)])
+        records.append(passRecords('sat{0}'.format(sat), rows))
+    return np.concatenate(records)
+
+
+def clash(a, b):
+    if (a['lat'], a['lon']) == (b['lat'], b['lon']):
+        if a['rise'] < b['set'] + SLEW and b['rise'] < a['set'] + SLEW:
+            return True
+    return a['satellite'] == b['satellite'] and a['rise'] < b['set'] and b['rise'] < a['set']
+
+
+def feasible(passes, chosen):
+    return not any(clash(a, b) for a, b in combinations(passes[chosen], 2))
+
+
+def test_conflict_graph():
+    passes = randomPasses(30, 0)
+    indptr, indices = conflictGraph(passes, SLEW)
+    for i in range(len(passes)):
+        expected = [j for j in range(len(passes)) if j != i and clash(passes[i], passes[j])]
+        assert indices[indptr[i]:indptr[i + 1]].tolist() == expected
+
+
+def test_greedy_is_feasible():
+    passes = randomPasses(200, 1)
+    chosen = greedySchedule(passes, SLEW)
+    assert chosen.sum() > 0
+    assert feasible(passes, chosen)
+
+
+def test_exact_beats_greedy():
+    for seed in range(5):
+        passes = randomPasses(4, seed, stations=2, satellites=3, span=5000)
+        for weight in ('count', 'duration'):
+            chosen, greedy = exactSchedule(passes, SLEW, weight)
+            assert greedy == 0
+            assert feasible(passes, chosen)
+            weights = passWeights(passes, weight)
+
+            # compare with every feasible subset
+            best = 0
+            for mask in range(1 << len(passes)):
+                subset = np.array([bool(mask >> i & 1) for i in range(len(passes))])
+                if weights[subset].sum() > best and feasible(passes, subset):
+                    best = weights[subset].sum()
+            assert np.isclose(weights[chosen].sum(), best)
+            assert weights[chosen].sum() >= weights[greedySchedule(passes, SLEW)].sum() - 1e-9
+
+
+def test_chain():
+    # each pass overlaps the next, all one component
+    rise = np.arange(MAXCOMPONENT)*600.0
+    rows = np.column_stack([np.zeros(MAXCOMPONENT), np.zeros(MAXCOMPONENT), rise, rise + 900,
+                            np.full(MAXCOMPONENT, 900.0), np.zeros(MAXCOMPONENT), np.zeros(MAXCOMPONENT)])
+    passes = passRecords('sat0', rows)
+    chosen, greedy = exactSchedule(passes, SLEW)
+    assert greedy == 0
+    assert chosen.sum() == MAXCOMPONENT//2
+    assert feasible(passes, chosen)
+
+    # the branch and bound alone, as for a component across stations
+    indptr, indices = conflictGraph(passes, SLEW)
+    neighbours = [sum(1 << j for j in indices[indptr[i]:indptr[i + 1]].tolist())
+                  for i in range(len(passes))]
+    start = time.time()
+    mask = maxWeightIndependentSet([1.0]*len(passes), neighbours)
+    assert time.time() - start < 1
+    assert bin(mask).count('1') == MAXCOMPONENT//2
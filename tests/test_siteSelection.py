@@ -0,0 +1,58 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from context import satelliteSimulator #gets all of my local packages
+from satelliteSimulator.analysis.siteSelection import candidateVisibility, lazyGreedyCoverage,\
+                                                      longestRuns, selectSites
+from satelliteSimulator.analysis.visibilityBits import VisibilityBits, packBits, runs
+from satelliteSimulator.analysis.visibility import gridStations
+from satelliteSimulator.utils import readECIData
+import numpy as np
+import os
+
+DATADIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+def test_lazy_greedy_matches_greedy():
+    rng = np.random.RandomState(0)
+    flags = rng.rand(60, 700) < rng.rand(60, 1)*0.3
+    bits = VisibilityBits(packBits(flags), np.arange(700.0), [(0, 0, 5)]*60)
+
+    covered = np.zeros(700, dtype=bool)
+    expected = []
+    for step in range(8):
+        gains = (flags & ~covered).sum(axis=1)
+        site = int(np.argmax(gains))
+        expected.append((site, int(gains[site])))
+        covered |= flags[site]
+    assert lazyGreedyCoverage(bits, 8) == expected
+
+
+def test_longest_runs():
+    rng = np.random.RandomState(1)
+    flags = rng.rand(20, 90) < 0.7
+    flags[3] = False
+    flags[4] = True
+    starts, lengths = longestRuns(flags)
+    for row, start, length in zip(flags, starts, lengths):
+        first, ends = runs(~row)
+        if len(first):
+            best = np.argmax(ends - first)
+            assert (start, length) == (first[best], ends[best] - first[best])
+        else:
+            assert length == 0
+
+
+def test_sites_improve_coverage():
+    with open(os.path.join(DATADIR, 'galileo-rk4-j2-24.csv')) as f:
+        eci = readECIData(f)
+    blocks = [eci[i:i + 2000] for i in range(0, len(eci), 2000)]
+    bits = candidateVisibility([blocks], gridStations()[::7])
+    for objective in ('coverage', 'gap'):
+        sites = selectSites(bits, 4, objective)
+        assert 1 <= len(sites) <= 4
+        coverage = [site[3] for site in sites]
+        gaps = [site[4] for site in sites]
+        assert coverage == sorted(coverage) and gaps == sorted(gaps, reverse=True)
+    # three sites see a Galileo satellite all the time
+    assert selectSites(bits, 4, 'gap')[-1][3:] == (1.0, 0.0)
@@ -0,0 +1,54 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from context import satelliteSimulator #gets all of my local packages
+from satelliteSimulator.storage.trajectoryStore import TrajectoryStore
+from satelliteSimulator.propogation.keplerianPropogation import propogateOrbit
+from satelliteSimulator.utils import ECI_DTYPE
+from satelliteSimulator.data import Jason, Galileo
+import numpy as np
+import pytest
+
+
+def propogate(sat, δt, steps):
+    data = propogateOrbit(sat['R'], sat['V'], δt, steps, sat['time'])
+    return np.array(data, dtype=ECI_DTYPE)
+
+
+def test_range(tmpdir):
+    data = propogate(Galileo, 10, 500)
+    store = TrajectoryStore(str(tmpdir), chunkSize=64)
+    store.append('Galileo', data[:100])
+    store.append('Galileo', data[100:])
+
+    start, end = data['time'][60], data['time'][130]
+    assert np.array_equal(TrajectoryStore(str(tmpdir)).range('Galileo', start, end), data[60:131])
+    assert np.array_equal(store.range('Galileo', start - 5, start + 5), data[60:61])
+
+
+def test_at_interpolates(tmpdir):
+    data = propogate(Jason, 5, 400)
+    store = TrajectoryStore(str(tmpdir), chunkSize=50, maxChunks=2)
+    store.write('Jason', data[::2])
+
+    exact = store.at('Jason', data['time'][::2])
+    assert np.array_equal(exact, data[::2])
+
+    interp = store.at('Jason', data['time'][1::2])
+    assert abs(interp['R'] - data['R'][1::2]).max() < 1e-5
+    assert abs(interp['V'] - data['V'][1::2]).max() < 1e-5
+    assert len(store._chunks) <= 2
+
+    with pytest.raises(ValueError):
+        store.at('Jason', [data['time'][-1] + 1])
+
+
+def test_many_satellites(tmpdir):
+    store = TrajectoryStore(str(tmpdir))
+    store.write('Jason', propogate(Jason, 10, 10))
+    store.write('Galileo', propogate(Galileo, 10, 10))
+    assert store.satellites() == ['Galileo', 'Jason']
+    assert store.span('Galileo') == (Galileo['time'], Galileo['time'] + 100)
+
+    with pytest.raises(ValueError):
+        store.append('Jason', propogate(Jason, 10, 10))
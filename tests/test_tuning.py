@@ -0,0 +1,33 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from context import satelliteSimulator #gets all of my local packages
+from satelliteSimulator.propogation.tuning import tune, recommend, paretoFront, orbitClass
+from satelliteSimulator.data import Jason, GPSIIR, Intelsat
+import numpy as np
+import pytest
+
+
+def test_orbitClass():
+    assert [orbitClass(s) for s in (Jason, GPSIIR, Intelsat)] == ['LEO', 'MEO', 'GEO']
+
+
+def test_paretoFront():
+    front = paretoFront([1, 2, 3, 4], [10, 1, 5, 1])
+    assert list(front) == [True, True, False, False]
+
+
+def test_tune():
+    results = tune([('Jason', Jason)], ['rk4', 'j2'], 1200, (30, 60, 120))
+    rk4 = results[results['algorithm'] == 'rk4']
+    assert list(rk4['evaluations']) == [160, 80, 40]
+    assert np.all(np.diff(rk4['maxError']) > 0)
+    assert rk4['pareto'].all()
+
+    best = recommend(results, rk4['maxError'][1])
+    assert (best[0]['algorithm'], best[0]['step']) == ('rk4', 60)
+    assert best[0]['maxError'] <= rk4['maxError'][1]
+    assert list(best['algorithm']) == ['rk4', 'j2']
+
+    with pytest.raises(ValueError):
+        tune([('Jason', Jason)], ['rk4'], 1200, (7,))
@@ -0,0 +1,49 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from context import satelliteSimulator #gets all of my local packages
+from satelliteSimulator.utils import readData, readECIData, readGrndTrckData,\
+                                    writeData, ECI_DTYPE
+import numpy as np
+import io
+import os
+
+DATADIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+def test_readECIData():
+    f = io.StringIO('1.5,2,3,4,5,6,100.25\n-1,-2,-3,-4,-5,-6,110.25\n')
+    data = readECIData(f)
+    assert data.dtype == ECI_DTYPE
+    assert list(data[1][0]) == [-1, -2, -3]
+    assert list(data['V'][0]) == [4, 5, 6]
+    assert data[1][2] == 110.25
+
+
+def test_readGrndTrckData():
+    f = io.StringIO('1.0,2.0,3.0,True\n4.0,5.0,6.0,False\n')
+    data = readGrndTrckData(f)
+    assert list(data['visible']) == [True, False]
+    assert data[1][1] == 5.0
+
+
+def test_writeData_roundtrip():
+    with open(os.path.join(DATADIR, 'jason-rk4.csv')) as f:
+        text = f.read()
+    data = readECIData(io.StringIO(text))
+    out = io.StringIO()
+    writeData(data, out)
+    assert np.array_equal(readECIData(io.StringIO(out.getvalue())), data)
+
+
+def test_writeData_rows():
+    out = io.StringIO()
+    writeData([((1.5, 2.5, 3.0), True), ((1.0, 2.0, 3.0), False)], out)
+    assert out.getvalue() == '1.5,2.5,3.0,True\n1.0,2.0,3.0,False\n'
+
+
+def test_writeData_precision():
+    out = io.StringIO()
+    writeData(np.array([[1/3, 2/3]]), out, precision=3)
+    assert out.getvalue() == '0.333,0.667\n'
+    assert readData(io.StringIO(out.getvalue())).shape == (1, 2)
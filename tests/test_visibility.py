@@ -0,0 +1,62 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from context import satelliteSimulator #gets all of my local packages
+from satelliteSimulator.analysis.visibility import PassTracker, getStationPassTimes,\
+                                                   isVisible, lookAngles
+from satelliteSimulator.converters.eci2ecef import ECI2ECEFArray
+from satelliteSimulator.utils import readECIData
+import numpy as np
+import io
+import os
+
+DATADIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+STATIONS = [(45, -100, 5), (-60, 150, 5), (-30, 20, 5)]
+
+
+def loadECEF():
+    with open(os.path.join(DATADIR, 'galileo-rk4-j2-24.csv')) as f:
+        return ECI2ECEFArray(readECIData(f))
+
+
+def test_lookAngles_matches_isVisible():
+    ecef = loadECEF()[::50]
+    θ, α = lookAngles(ecef['R'], STATIONS)
+    for t, step in enumerate(ecef):
+        for s, station in enumerate(STATIONS):
+            assert isVisible(step[0], *station) == (θ[t, s] - station[2] > 0)
+
+
+def test_passes_span_blocks():
+    ecef = loadECEF()
+    expected = []
+    for station in STATIONS:
+        expected += getStationPassTimes(ecef, station)
+    assert len(expected) == 5
+
+    tracker = PassTracker(STATIONS)
+    passes = []
+    for start in range(0, len(ecef), 97):
+        passes += tracker.update(ecef[start:start + 97])
+    assert np.allclose(sorted(passes), sorted(expected))
+
+
+def test_resume_saved_state():
+    ecef = loadECEF()
+    tracker = PassTracker(STATIONS)
+    expected = tracker.update(ecef)
+
+    # split part way through a pass, then give the whole trajectory again
+    # as if it had been extended
+    split = int(np.searchsorted(ecef['time'], expected[0][2] + 600))
+    first = PassTracker(STATIONS)
+    passes = first.update(ecef[:split])
+    assert first.open.any()
+    state = io.StringIO()
+    first.saveState(state)
+    state.seek(0)
+
+    second = PassTracker.loadState(state)
+    passes += second.update(ecef)
+    assert sorted(passes) == sorted(expected)
+    assert second.totals() == tracker.totals(expected)
@@ -0,0 +1,70 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from context import satelliteSimulator #gets all of my local packages
+from satelliteSimulator.analysis.visibilityBits import VisibilityBits, combineSatellites,\
+                                                       packBits, unpackBits, popcount
+from satelliteSimulator.analysis.visibility import visibilityMatrix
+from satelliteSimulator.converters.eci2ecef import ECI2ECEFArray
+from satelliteSimulator.utils import readECIData
+import numpy as np
+import os
+
+DATADIR = os.path.join(os.path.dirname(__file__), '..', 'data')
+STATIONS = [(45, -100, 5), (-60, 150, 5), (-30, 20, 5), (0, 0, 5)]
+
+
+def test_word_operations_match_booleans():
+    rng = np.random.RandomState(0)
+    flags = rng.rand(5, 1000) < 0.3
+    bits = VisibilityBits(packBits(flags), np.arange(1000.0), [(0, 0, 5)]*5)
+    assert np.array_equal(unpackBits(bits.words, 1000), flags)
+    assert popcount(bits.words) == flags.sum()
+
+    count = flags.sum(axis=0)
+    assert np.array_equal(unpackBits(bits.anyStation(), 1000), count > 0)
+    assert np.array_equal(unpackBits(bits.allStations(), 1000), count == 5)
+    for n in range(7):
+        assert np.array_equal(unpackBits(bits.atLeast(n), 1000), count >= n)
+    assert bits.coverage() == (count > 0).mean()
+    assert np.allclose(bits.stationCoverage(), flags.mean(axis=1))
+
+
+def test_from_blocks():
+    with open(os.path.join(DATADIR, 'galileo-rk4-j2-24.csv')) as f:
+        eci = readECIData(f)
+    blocks = [eci[i:i + 1001] for i in range(0, len(eci), 1001)]
+    bits = VisibilityBits.fromBlocks(blocks, STATIONS)
+    vis = visibilityMatrix(ECI2ECEFArray(eci)['R'], STATIONS).T
+    assert np.array_equal(unpackBits(bits.words, len(eci)), vis)
+
+    starts, ends = bits.gaps()
+    inGap = np.zeros(len(eci), dtype=bool)
+    for start, end in zip(starts, ends):
+        inGap |= (eci['time'] >= start) & (eci['time'] < end)
+    covered = vis.any(axis=0)
+    inGap[-1] |= not covered[-1]  # a gap running to the end includes the last epoch
+    assert np.array_equal(inGap, ~covered)
+
+
+def test_combine_satellites():
+    rng = np.random.RandomState(1)
+    flags = rng.rand(4, 3, 200) < 0.5
+    satellites = [VisibilityBits(packBits(f), np.arange(200.0), [(0, 0, 5)]*3) for f in flags]
+    count = flags.sum(axis=0)
+    for n in range(1, 5):
+        combined = combineSatellites(satellites, n)
+        assert np.array_equal(unpackBits(combined.words, 200), count >= n)
+    assert np.array_equal(satellites[0].union(satellites[1]).words, packBits(flags[0] | flags[1]))
+
+
+def test_save_load(tmpdir):
+    flags = np.random.RandomState(2).rand(3, 130) < 0.5
+    bits = VisibilityBits(packBits(flags), np.arange(130.0), STATIONS[:3], 'abc123')
+    path = os.path.join(str(tmpdir), 'bits.npz')
+    bits.save(path)
+    loaded = VisibilityBits.load(path)
+    assert np.array_equal(loaded.words, bits.words)
+    assert np.array_equal(loaded.times, bits.times)
+    assert np.array_equal(loaded.stations, bits.stations)
+    assert loaded.source == 'abc123'